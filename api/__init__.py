@@ -1,11 +1,6 @@
 # This file makes the directory a Python package and exposes the Flask app
-from flask import Flask
-
-# Create Flask app instance
-app = Flask(__name__)
-
-# Import routes
-from . import index
+# The app itself is created in index.py, so re-export it instead of building a second one
+from .index import app
 
 # This allows Vercel to import the app
-# The app variable is what Vercel looks for when deploying
\ No newline at end of file
+# The app variable is what Vercel looks for when deploying
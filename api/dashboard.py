@@ -0,0 +1,192 @@
+"""
+Aggregated dashboard snapshot for the mirror display.
+Combines the time, weather, hardware sensor readings and what is playing into
+one JSON document with a strong ETag and a version counter that only moves
+when the content changes. Clients revalidate with If-None-Match (304 when
+nothing changed) or long-poll with ?since=<version>&wait=<seconds>.
+Versions start from the boot time in milliseconds, so a version from before a
+restart is always older than the current one. The snapshot is only rebuilt
+when the minute, the sensor readings or a source's version has moved.
+Sensor readings come from the hardware server's /sensors long-poll, and the
+collector only runs while dashboard clients have asked for a snapshot in the
+last DASHBOARD_IDLE_SECONDS.
+"""
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+HARDWARE_SERVER_URL = os.environ.get("HARDWARE_SERVER_URL", "http://localhost:5001")
+
+# How long each /sensors long-poll is held, and the pause after the hardware server failed
+SENSOR_WAIT_SECONDS = float(os.environ.get("DASHBOARD_SENSOR_WAIT_SECONDS", "25"))
+SENSOR_RETRY_SECONDS = float(os.environ.get("DASHBOARD_SENSOR_RETRY_SECONDS", "5"))
+
+# The collector stops this long after the last dashboard request and restarts with the next
+IDLE_SECONDS = float(os.environ.get("DASHBOARD_IDLE_SECONDS", "60"))
+
+# Distance is rounded to this many cm so sensor jitter doesn't invalidate the snapshot
+DISTANCE_STEP = float(os.environ.get("DASHBOARD_DISTANCE_STEP_CM", "10"))
+
+# Longest a long-poll request is held open
+MAX_WAIT = 30.0
+
+# Versions count up from here; also part of every ETag, since the body carries the version
+BOOT_VERSION = int(time.time() * 1000)
+
+_cond = threading.Condition()
+_snapshot = {"version": BOOT_VERSION, "etag": None, "body": "{}"}
+_sections = {"sensors": None}
+_sensors_version = 0
+# What the current snapshot was built from (see _fingerprint)
+_built_from = None
+# name -> (function, version)
+_sources = {}
+_thread = None
+_sensor_thread = None
+# Monotonic time until which the collector keeps running
+_active_until = 0.0
+stats = {"requests": 0, "not_modified": 0, "long_polls": 0, "bytes_sent": 0, "rebuilds": 0}
+
+def register_source(name, function, version=None):
+    """
+    Register a callable that returns the data for one snapshot section from memory.
+    `version()` returns a value that changes whenever that data does; a source
+    without one makes every snapshot request rebuild.
+    """
+    _sources[name] = (function, version)
+
+def fetch_sensors(since=None, wait=0.0):
+    """
+    Read the hardware server's /sensors, long-polling until its version moves past
+    `since`. Returns (sensor section, version); the version is None if it failed.
+    """
+    import requests
+    params = {"since": since, "wait": wait} if since is not None and wait > 0 else {}
+    try:
+        response = requests.get(f"{HARDWARE_SERVER_URL}/sensors", params=params, timeout=wait + 5)
+        response.raise_for_status()
+        readings = response.json()
+    except Exception as e:
+        print(f"Dashboard could not read the sensors: {e}")
+        return {"available": False}, None
+    sensors = {"temperature": readings.get("temperature"), "humidity": readings.get("humidity")}
+    if readings.get("distance") is not None:
+        sensors["distance"] = round(readings["distance"] / DISTANCE_STEP) * DISTANCE_STEP
+    sensors["available"] = any(value is not None for value in sensors.values())
+    return sensors, readings.get("version")
+
+def summarize_playback(summary):
+    """Keep only the now-playing fields that matter to the display (not the progress)."""
+    if not summary:
+        return None
+    return {key: summary.get(key) for key in ("is_playing", "name", "artist", "id")}
+
+def build():
+    """Assemble the current snapshot data (without the version)."""
+    now = datetime.datetime.now()
+    data = {
+        "date": now.strftime("%Y-%m-%d"),
+        "time": now.strftime("%H:%M"),
+        "sensors": _sections["sensors"],
+    }
+    now_playing_source = _sources.get("now_playing")
+    data["now_playing"] = summarize_playback(now_playing_source[0]()) if now_playing_source else None
+    weather_source = _sources.get("weather")
+    weather_data = weather_source[0]() if weather_source else None
+    if weather_data:
+        data["weather"] = f"{weather_data['condition']} {weather_data['temperature']}°C"
+        data["humidity"] = f"{weather_data['humidity']}%"
+        data["weather_stale"] = weather_data.get("stale", False)
+    return data
+
+def _fingerprint():
+    """Everything the snapshot depends on, cheaply; None if a source can't tell."""
+    versions = []
+    for name in sorted(_sources):
+        version = _sources[name][1]
+        if version is None:
+            return None
+        versions.append(version())
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M"), _sensors_version, tuple(versions)
+
+def rebuild():
+    """Rebuild the snapshot if a source changed, and bump the version if its content changed."""
+    global _built_from
+    fingerprint = _fingerprint()
+    with _cond:
+        if fingerprint is not None and fingerprint == _built_from:
+            return dict(_snapshot)
+    data = build()
+    content = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    etag = f"{BOOT_VERSION:x}-{hashlib.sha1(content.encode('utf-8')).hexdigest()[:20]}"
+    with _cond:
+        stats["rebuilds"] += 1
+        _built_from = fingerprint
+        if etag != _snapshot["etag"]:
+            version = _snapshot["version"] + 1
+            body = json.dumps({**data, "version": version}, sort_keys=True, separators=(",", ":"))
+            _snapshot.update(version=version, etag=etag, body=body)
+            _cond.notify_all()
+        return dict(_snapshot)
+
+def _keep_running(thread_name):
+    """False once no client has asked for a while; the thread then clears its handle and exits."""
+    global _thread, _sensor_thread
+    with _cond:
+        if time.monotonic() < _active_until:
+            return True
+        if thread_name == "collector":
+            _thread = None
+        else:
+            _sensor_thread = None
+        return False
+
+def _collect():
+    # Catches the minute changing and sources without a listener
+    while _keep_running("collector"):
+        rebuild()
+        time.sleep(1)
+
+def _follow_sensors():
+    global _sensors_version
+    version = None
+    while _keep_running("sensors"):
+        sensors, new_version = fetch_sensors(version, SENSOR_WAIT_SECONDS)
+        if sensors != _sections["sensors"]:
+            _sections["sensors"] = sensors
+            _sensors_version += 1
+            rebuild()
+        version = new_version
+        if new_version is None:
+            time.sleep(SENSOR_RETRY_SECONDS)
+
+def start():
+    """Keep the background collector running (starting it if needed) for IDLE_SECONDS from now."""
+    global _thread, _sensor_thread, _active_until
+    with _cond:
+        _active_until = time.monotonic() + IDLE_SECONDS
+        if _thread is None:
+            _thread = threading.Thread(target=_collect, name="dashboard-collector", daemon=True)
+            _thread.start()
+        if _sensor_thread is None:
+            _sensor_thread = threading.Thread(target=_follow_sensors, name="dashboard-sensors", daemon=True)
+            _sensor_thread.start()
+
+def get_snapshot():
+    """Return the current snapshot: {"version", "etag", "body"}."""
+    start()
+    return rebuild()
+
+def wait_for_change(since, timeout):
+    """Block until the version is newer than `since` or the timeout passes, then return the snapshot."""
+    start()
+    with _cond:
+        _cond.wait_for(lambda: _snapshot["version"] > since, timeout=min(timeout, MAX_WAIT))
+        return dict(_snapshot)
+
+def get_stats():
+    with _cond:
+        return {**stats, "version": _snapshot["version"], "collecting": _thread is not None}
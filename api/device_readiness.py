@@ -0,0 +1,202 @@
+"""
+Waiting for a Spotify device to become active after a playback transfer.
+Instead of sleeping a fixed 2-4 s, `wait_until_active` polls the device list at
+short, growing intervals until the device reports active or the wait times out.
+How long each device took to activate is recorded (and saved, so it survives
+restarts). The first poll lands just before the device is usually ready, and
+the poll interval follows how fast that device, or devices in general, come up.
+A wait that times out is recorded too, as a censored sample: the device took
+longer than that. A device that is known to be slow gets a longer timeout, up
+to its 90th percentile activation time.
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+try:
+    from . import resilience
+except ImportError:  # Running as a script or as a Vercel function
+    import resilience
+
+# Longest wait for a device that is expected to come up right away; no longer than
+# the fixed sleep this replaced, since some players (the web player) never report active
+TIMEOUT_SECONDS = float(os.environ.get("DEVICE_READY_TIMEOUT_SECONDS", "2"))
+
+# Longest a known slow device's timeout may stretch to, the top of the old 2-4 s sleep
+MAX_TIMEOUT_SECONDS = float(os.environ.get("DEVICE_READY_MAX_TIMEOUT_SECONDS", "4"))
+
+# Bounds on the time between polls; intervals grow by GROWTH after each poll
+MIN_INTERVAL = float(os.environ.get("DEVICE_READY_MIN_INTERVAL", "0.1"))
+MAX_INTERVAL = float(os.environ.get("DEVICE_READY_MAX_INTERVAL", "1.0"))
+GROWTH = 1.5
+
+# Assumed activation time until a device has been seen activating
+DEFAULT_ACTIVATION_SECONDS = float(os.environ.get("DEVICE_READY_DEFAULT_SECONDS", "0.5"))
+
+# Activation times kept per device (and across all devices)
+SAMPLES = 50
+
+# A timed-out wait counts as this many times the time waited; the device was slower
+CENSORED_FACTOR = GROWTH
+
+ACTIVATION_PATH = os.environ.get(
+    "DEVICE_ACTIVATION_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "device_activation.json")
+)
+
+_lock = threading.Lock()
+_loaded = False
+# device id -> recent activation times in seconds; "*" holds every device's.
+# Timed-out waits are kept per device as [seconds, True], meaning "longer than".
+activations = {}
+stats = {"waits": 0, "ready": 0, "timeouts": 0, "stretched": 0, "polls": 0, "errors": 0}
+
+def _load_locked():
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(ACTIVATION_PATH) as activation_file:
+            data = json.load(activation_file)
+        for device_id, samples in data.items():
+            activations[device_id] = deque(samples, maxlen=SAMPLES)
+    except (OSError, ValueError, TypeError):
+        pass
+
+def _save_locked():
+    data = {device_id: list(samples) for device_id, samples in activations.items()}
+    try:
+        os.makedirs(os.path.dirname(ACTIVATION_PATH), exist_ok=True)
+        temp_path = f"{ACTIVATION_PATH}.tmp"
+        with open(temp_path, "w") as activation_file:
+            json.dump(data, activation_file)
+        os.replace(temp_path, ACTIVATION_PATH)
+    except OSError as e:
+        print(f"Could not save device activation times: {e}")
+
+def record_activation(device_id, seconds):
+    """Remember how long a device took to become active."""
+    with _lock:
+        _load_locked()
+        for key in (device_id, "*"):
+            activations.setdefault(key, deque(maxlen=SAMPLES)).append(round(seconds, 3))
+        _save_locked()
+
+def record_timeout(device_id, seconds):
+    """Remember that a device was still idle after `seconds`. Kept for that device
+    only, so a player that never reports active doesn't slow down the others."""
+    with _lock:
+        _load_locked()
+        activations.setdefault(device_id, deque(maxlen=SAMPLES)).append([round(seconds, 3), True])
+        _save_locked()
+
+def _estimates(samples):
+    """Activation times with censored samples counted as a bit longer than the wait."""
+    return [sample[0] * CENSORED_FACTOR if isinstance(sample, list) else sample for sample in samples]
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def typical_activation(device_id):
+    """Median activation time for a device, else across all devices, else the default."""
+    with _lock:
+        _load_locked()
+        samples = activations.get(device_id) or activations.get("*")
+        return statistics.median(_estimates(samples)) if samples else DEFAULT_ACTIVATION_SECONDS
+
+def ready_timeout(device_id):
+    """
+    How long to wait for a device: TIMEOUT_SECONDS, stretched to the device's
+    90th percentile activation time (at most MAX_TIMEOUT_SECONDS) once it is
+    known to be slower. A device that has never activated and has already
+    timed out at the longest wait doesn't report active at all, and gets the
+    plain timeout.
+    """
+    with _lock:
+        _load_locked()
+        samples = activations.get(device_id)
+        if not samples:
+            return TIMEOUT_SECONDS
+        never_active = all(isinstance(sample, list) for sample in samples)
+        if never_active and max(sample[0] for sample in samples) >= MAX_TIMEOUT_SECONDS:
+            return TIMEOUT_SECONDS
+        p90 = _percentile(_estimates(samples), 0.9)
+        return min(max(TIMEOUT_SECONDS, p90), max(TIMEOUT_SECONDS, MAX_TIMEOUT_SECONDS))
+
+def schedule(device_id, timeout=TIMEOUT_SECONDS):
+    """(first_delay, first_interval): when to poll first, and the interval to grow from after that."""
+    typical = typical_activation(device_id)
+    first_delay = min(max(0.8 * typical, MIN_INTERVAL), timeout)
+    first_interval = min(max(0.25 * typical, MIN_INTERVAL), MAX_INTERVAL)
+    return first_delay, first_interval
+
+def _is_active(devices, device_id):
+    return any(device.get('id') == device_id and device.get('is_active') for device in devices.get('devices', []))
+
+def wait_until_active(device_id, get_devices, timeout=None, started=None, keep_waiting=None):
+    """
+    Poll get_devices() (sp.devices) until device_id reports active. Returns the
+    seconds it took, measured from `started` (a time.monotonic() value, default
+    now; pass the time of the transfer), or None if the wait timed out or
+    keep_waiting() returned False. Without a timeout, ready_timeout(device_id)
+    is used; either way the wait ends with the request's deadline.
+    """
+    started = time.monotonic() if started is None else started
+    if timeout is None:
+        timeout = ready_timeout(device_id)
+        if timeout > TIMEOUT_SECONDS:
+            with _lock:
+                stats["stretched"] += 1
+    time_left = resilience.remaining()
+    # A wait cut short by the deadline says little about the device
+    full_wait = time_left is None or timeout <= time_left
+    ends = time.monotonic() + (timeout if full_wait else time_left)
+    delay, interval = schedule(device_id, timeout)
+    # Time already spent since the transfer counts towards the first delay
+    delay = max(0.0, started + delay - time.monotonic())
+    with _lock:
+        stats["waits"] += 1
+
+    while True:
+        time.sleep(max(0.0, min(delay, ends - time.monotonic())))
+        if keep_waiting is not None and not keep_waiting():
+            return None
+        with _lock:
+            stats["polls"] += 1
+        try:
+            if _is_active(get_devices(), device_id):
+                elapsed = time.monotonic() - started
+                record_activation(device_id, elapsed)
+                with _lock:
+                    stats["ready"] += 1
+                print(f"Device {device_id} active after {elapsed:.2f}s")
+                return elapsed
+        except Exception as e:
+            with _lock:
+                stats["errors"] += 1
+            print(f"Error checking device readiness: {e}")
+        if time.monotonic() >= ends:
+            with _lock:
+                stats["timeouts"] += 1
+            if full_wait:
+                record_timeout(device_id, time.monotonic() - started)
+            return None
+        delay = interval
+        interval = min(interval * GROWTH, MAX_INTERVAL)
+
+def get_stats():
+    with _lock:
+        _load_locked()
+        samples = activations.get("*")
+        return {
+            **stats,
+            "devices": len([key for key in activations if key != "*"]),
+            "median_activation_seconds": statistics.median(samples) if samples else None,
+            "max_activation_seconds": max(samples) if samples else None,
+            "p90_activation_seconds": _percentile(samples, 0.9) if samples else None,
+        }
@@ -0,0 +1,73 @@
+"""
+Gemini client state management.
+The google.generativeai SDK takes most of a second to import, so it is only
+imported and configured the first time a model is actually needed. Each prompt
+type gets its own model carrying that type's system instruction (prompts.py),
+built once per process, so calls only send the variable part of the prompt.
+"""
+import os
+import threading
+
+try:
+    from . import resilience, prompts
+except ImportError:  # Running as a script or as a Vercel function
+    import resilience
+    import prompts
+
+# Model used for every prompt
+MODEL_NAME = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Fails fast while Gemini is erroring or stalling
+breaker = resilience.CircuitBreaker(
+    "Gemini",
+    failure_threshold=int(os.environ.get("GEMINI_BREAKER_FAILURES", "3")),
+    reset_timeout=float(os.environ.get("GEMINI_BREAKER_RESET_SECONDS", "30"))
+)
+
+# Lazily built GenerativeModel instances, keyed by prompt type (None: no system instruction)
+_models = {}
+_model_lock = threading.Lock()
+
+# Calls and prompt characters sent, per prompt type
+stats = {}
+
+def get_model(kind=None):
+    """Get the Gemini model for a prompt type, configuring the SDK on first use."""
+    model = _models.get(kind)
+    if model is None:
+        with _model_lock:
+            model = _models.get(kind)
+            if model is None:
+                import google.generativeai as genai
+                if not _models:
+                    genai.configure(api_key=os.environ.get("GOOGLE_API_KEY", ""))
+                model = _models[kind] = genai.GenerativeModel(
+                    MODEL_NAME, system_instruction=prompts.SYSTEM_INSTRUCTIONS[kind] if kind else None
+                )
+    return model
+
+def warm_up():
+    """Build the model for every prompt type up front."""
+    for kind in [None, *prompts.SYSTEM_INSTRUCTIONS]:
+        get_model(kind)
+
+def generate_text(prompt, kind=None):
+    """Generate a response for a prompt of a given type within the request deadline and return its text."""
+    kind_stats = stats.setdefault(kind or "plain", {"calls": 0, "prompt_chars": 0})
+    kind_stats["calls"] += 1
+    kind_stats["prompt_chars"] += len(prompt)
+
+    def generate():
+        time_left = resilience.remaining()
+        if time_left is None:
+            return get_model(kind).generate_content(prompt).text
+        # Also bound the HTTP call itself so abandoned requests don't linger
+        return get_model(kind).generate_content(prompt, request_options={"timeout": max(time_left, 1.0)}).text
+    return resilience.call(breaker, generate)
+
+def is_initialized():
+    """Check if a Gemini model has been built yet."""
+    return bool(_models)
+
+def get_stats():
+    return {kind: dict(kind_stats) for kind, kind_stats in stats.items()}
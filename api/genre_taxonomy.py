@@ -0,0 +1,229 @@
+"""
+Local genre taxonomy and seed index for genre requests.
+api/data/genres.json maps each canonical genre to its aliases and sub-genres,
+so "hip hop", "rap", "drill" and "hiphopp" all resolve to "hip-hop" with one
+dictionary lookup (misspellings go through a cached fuzzy match). Each
+canonical genre keeps seed tracks and playlists from a single Spotify search,
+refreshed in the background and saved to disk so a restart starts warm. Genre
+suggestions are answered from the seed tracks and "play some jazz" starts one
+of the seed playlists, instead of a chain of searches.
+"""
+import difflib
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "genres.json")
+
+SEEDS_PATH = os.environ.get(
+    "GENRE_SEEDS_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "genre_seeds.json")
+)
+
+# How old a genre's seeds can get before they are fetched again
+REFRESH_INTERVAL = int(os.environ.get("GENRE_SEED_REFRESH_SECONDS", str(24 * 3600)))
+# Pause between genre refreshes, so a full refresh doesn't burst the Spotify rate limit
+REFRESH_PACE_SECONDS = float(os.environ.get("GENRE_SEED_PACE_SECONDS", "2"))
+SEED_TRACKS = int(os.environ.get("GENRE_SEED_TRACKS", "30"))
+SEED_PLAYLISTS = int(os.environ.get("GENRE_SEED_PLAYLISTS", "5"))
+
+# How close a misspelling has to be to a known name (difflib ratio)
+FUZZY_CUTOFF = float(os.environ.get("GENRE_FUZZY_CUTOFF", "0.82"))
+
+# Words that say nothing about the genre ("some jazz music" -> "jazz")
+_FILLER_WORDS = {"music", "songs", "song", "tracks", "some", "genre", "style", "tunes"}
+
+# genre -> {"tracks": [...], "playlists": [...], "cursor": int, "refreshed_at": float}
+seeds = {}
+stats = {"lookups": 0, "exact": 0, "fuzzy": 0, "unknown": 0, "hits": 0, "misses": 0, "refreshes": 0}
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_wanted = []  # Cold genres that were asked for, refreshed first
+_thread = None
+_fetch_seeds = None
+
+def normalize(name):
+    """Lowercase, unify separators and drop filler words: "Hip-Hop Music!" -> "hip hop"."""
+    text = str(name or "").lower().replace("&", " and ")
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    kept = [word for word in words if word not in _FILLER_WORDS]
+    return " ".join(kept or words)
+
+def load_taxonomy(path=TAXONOMY_PATH):
+    """Read genres.json into (genres, names), where names maps every normalized name to its genre."""
+    with open(path) as taxonomy_file:
+        genres = json.load(taxonomy_file)
+    names = {}
+    for genre, entry in genres.items():
+        for name in [genre, *entry.get("aliases", []), *entry.get("subgenres", [])]:
+            names.setdefault(normalize(name), genre)
+    return genres, names
+
+genres, names = load_taxonomy()
+_known_names = list(names)
+
+@lru_cache(maxsize=1024)
+def _lookup(normalized):
+    """(genre, how) for a normalized name; how is "exact", "fuzzy" or None."""
+    genre = names.get(normalized)
+    if genre:
+        return genre, "exact"
+    # "90s hip hop", "sad indie songs": a known name inside a longer request
+    words = normalized.split()
+    for size in range(len(words) - 1, 0, -1):
+        for start in range(len(words) - size + 1):
+            genre = names.get(" ".join(words[start:start + size]))
+            if genre:
+                return genre, "exact"
+    match = difflib.get_close_matches(normalized, _known_names, n=1, cutoff=FUZZY_CUTOFF)
+    if match:
+        return names[match[0]], "fuzzy"
+    return None, None
+
+def resolve(name):
+    """Return the canonical genre for a genre name, alias, sub-genre or misspelling, or None."""
+    if not name:
+        return None
+    genre, how = _lookup(normalize(name))
+    with _lock:
+        stats["lookups"] += 1
+        stats[how or "unknown"] += 1
+    return genre
+
+def resolve_exact(name):
+    """Like resolve(), but only when the whole name is a genre ("some jazz"), so "Rock With You" stays a song."""
+    return names.get(normalize(name)) if name else None
+
+def search_query(genre):
+    """The Spotify search that finds seeds for a canonical genre."""
+    return genres.get(genre, {}).get("query") or f'genre:"{genre}"'
+
+def tracks(genre, count=5):
+    """Return `count` seed tracks for a canonical genre in rotation, or None while its seeds are cold."""
+    with _lock:
+        entry = seeds.get(genre)
+        if not entry or not entry["tracks"]:
+            stats["misses"] += 1
+            # A genre whose last fetch failed waits for REFRESH_INTERVAL like any other
+            failed_recently = entry is not None and time.time() - entry["refreshed_at"] < REFRESH_INTERVAL
+            if genre in genres and genre not in _wanted and not failed_recently:
+                _wanted.append(genre)
+                _wake.set()
+            return None
+        pool = entry["tracks"]
+        count = min(count, len(pool))
+        if entry["cursor"] + count > len(pool):
+            random.shuffle(pool)
+            entry["cursor"] = 0
+        selection = pool[entry["cursor"]:entry["cursor"] + count]
+        entry["cursor"] += count
+        stats["hits"] += 1
+        return [dict(track) for track in selection]
+
+def playlists(genre):
+    """The seed playlists for a canonical genre ([] while cold)."""
+    with _lock:
+        entry = seeds.get(genre)
+        return [dict(playlist) for playlist in entry["playlists"]] if entry else []
+
+def load_seeds():
+    """Load seeds saved by a previous run."""
+    try:
+        with open(SEEDS_PATH) as seeds_file:
+            data = json.load(seeds_file)
+    except (OSError, ValueError):
+        return
+    with _lock:
+        for genre, entry in data.items():
+            if genre in genres and genre not in seeds:
+                seeds[genre] = {"tracks": entry.get("tracks", []), "playlists": entry.get("playlists", []),
+                                "cursor": 0, "refreshed_at": entry.get("refreshed_at", 0)}
+
+def save_seeds():
+    """Write the seeds to disk atomically."""
+    with _lock:
+        data = {genre: {"tracks": entry["tracks"], "playlists": entry["playlists"],
+                        "refreshed_at": entry["refreshed_at"]}
+                for genre, entry in seeds.items()}
+    try:
+        os.makedirs(os.path.dirname(SEEDS_PATH), exist_ok=True)
+        temp_path = f"{SEEDS_PATH}.tmp"
+        with open(temp_path, "w") as seeds_file:
+            json.dump(data, seeds_file)
+        os.replace(temp_path, SEEDS_PATH)
+    except OSError as e:
+        print(f"Could not save genre seeds: {e}")
+
+def refresh(genre):
+    """Fetch new seeds for one canonical genre with the registered fetcher."""
+    if _fetch_seeds is None:
+        return False
+    try:
+        fetched = _fetch_seeds(search_query(genre), SEED_TRACKS, SEED_PLAYLISTS) or {}
+    except Exception as e:
+        print(f"Error refreshing genre seeds for {genre}: {e}")
+        return False
+    unique = list({track["id"]: track for track in fetched.get("tracks", []) if track.get("id")}.values())
+    if not unique:
+        return False
+    random.shuffle(unique)
+    with _lock:
+        seeds[genre] = {"tracks": unique, "playlists": fetched.get("playlists", []),
+                        "cursor": 0, "refreshed_at": time.time()}
+        stats["refreshes"] += 1
+    return True
+
+def _next_stale():
+    """The genre to refresh next: one that was asked for, else the stalest, else None."""
+    with _lock:
+        if _wanted:
+            return _wanted.pop(0)
+        now = time.time()
+        stale = [(seeds[genre]["refreshed_at"] if genre in seeds else 0, genre) for genre in genres
+                 if genre not in seeds or now - seeds[genre]["refreshed_at"] >= REFRESH_INTERVAL]
+    return min(stale)[1] if stale else None
+
+def _run():
+    load_seeds()
+    refreshed = 0
+    while True:
+        genre = _next_stale()
+        if genre is None:
+            if refreshed:
+                save_seeds()
+                print(f"Refreshed seeds for {refreshed} genres")
+                refreshed = 0
+            _wake.wait(REFRESH_INTERVAL)
+            _wake.clear()
+            continue
+        if refresh(genre):
+            refreshed += 1
+        elif genre in seeds:
+            # Keep the old seeds and try again next interval
+            with _lock:
+                seeds[genre]["refreshed_at"] = time.time()
+        else:
+            with _lock:
+                seeds[genre] = {"tracks": [], "playlists": [], "cursor": 0, "refreshed_at": time.time()}
+        _wake.wait(REFRESH_PACE_SECONDS)
+        _wake.clear()
+
+def start(fetch_seeds):
+    """Start the seed refresher once. fetch_seeds(query, tracks, playlists) returns {"tracks", "playlists"}."""
+    global _thread, _fetch_seeds
+    with _lock:
+        _fetch_seeds = fetch_seeds
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="genre-seeds", daemon=True)
+        _thread.start()
+
+def get_stats():
+    with _lock:
+        warm = sum(1 for entry in seeds.values() if entry["tracks"])
+        return {**stats, "genres": len(genres), "names": len(names), "warm": warm, "wanted": len(_wanted)}
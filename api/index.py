@@ -1,24 +1,67 @@
-from flask import Flask, request, jsonify, redirect, session
+from flask import Flask, request, jsonify, redirect, session, stream_with_context, has_request_context
 from flask_cors import CORS  # Import CORS
-import google.generativeai as genai
-from spotipy import Spotify
-from spotipy.oauth2 import SpotifyOAuth
-from collections import deque
 import json
 import re
 import datetime
 import random
 import os
-from dotenv import load_dotenv
-import requests
+import time
+
+def load_env_file():
+    """Load the nearest .env file, importing python-dotenv only when one exists."""
+    # Same lookup order as dotenv: this file's directory upwards, then the working directory
+    search_dirs = []
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while directory not in search_dirs:
+        search_dirs.append(directory)
+        directory = os.path.dirname(directory)
+    search_dirs.append(os.getcwd())
+
+    for directory in search_dirs:
+        env_path = os.path.join(directory, ".env")
+        if os.path.isfile(env_path):
+            from dotenv import load_dotenv
+            load_dotenv(env_path)
+            return env_path
+    return None
 
 # Load environment variables from .env file
-load_dotenv()
+load_env_file()
+
+# Heavy SDKs (google.generativeai, spotipy, requests) are imported on first use
+# so cold starts only pay for Flask. See tools/profile_imports.py.
+# These modules read their settings at import time, so .env is loaded first.
+try:
+    from . import (
+        gemini_client, spotify_client, intent_classifier, recommendation_pool,
+        similar_prefetch, spotify_governor, resilience, weather, dashboard, now_playing,
+        token_store, track_ranking, library_index, state, prompts, recommendation_engine, genre_taxonomy,
+        device_readiness
+    )
+    from .single_flight import SingleFlight
+except ImportError:  # Running as a script (python index.py) or as a Vercel function
+    import gemini_client
+    import spotify_client
+    import intent_classifier
+    import recommendation_pool
+    import similar_prefetch
+    import spotify_governor
+    import resilience
+    import weather
+    import dashboard
+    import now_playing
+    import token_store
+    import track_ranking
+    import library_index
+    import state
+    import prompts
+    import recommendation_engine
+    import genre_taxonomy
+    import device_readiness
+    from single_flight import SingleFlight
 
-# Configure Google AI
+# Google AI is configured lazily by gemini_client.get_model()
 API_KEY = os.environ.get("GOOGLE_API_KEY", "")
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
 
 # Configure Flask app
 app = Flask(__name__)
@@ -36,6 +79,27 @@ SPOTIFY_REDIRECT_URI = os.environ.get("SPOTIFY_REDIRECT_URI", "http://localhost:
 # This will hold the authenticated Spotify instance
 sp = None
 
+# Every /ask request is answered within this many seconds, even if Gemini or Spotify stall
+ASK_DEADLINE_SECONDS = float(os.environ.get("ASK_DEADLINE_SECONDS", "8"))
+# Intent analysis only gets part of that budget so there is time left to answer
+INTENT_DEADLINE_SECONDS = float(os.environ.get("INTENT_DEADLINE_SECONDS", "3"))
+# What /ask says when an upstream runs out of time or rate limit mid-request
+DEGRADED_ASK_REPLY = "The mirror is a little slow right now... Please ask me again in a moment."
+
+# Idle /now-playing/stream connections get a comment this often so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+# Streams end after this long and the browser reconnects, so no client keeps a thread for good
+SSE_MAX_SECONDS = float(os.environ.get("SSE_MAX_SECONDS", "300"))
+
+# Calls to accounts.spotify.com hold the Spotify lock, so they get a hard timeout
+TOKEN_REQUEST_TIMEOUT = float(os.environ.get("SPOTIFY_TOKEN_TIMEOUT_SECONDS", "5"))
+# After a failed token refresh, wait this long before the next (doubling up to TOKEN_RETRY_MAX_SECONDS)
+TOKEN_RETRY_SECONDS = float(os.environ.get("SPOTIFY_TOKEN_RETRY_SECONDS", "30"))
+TOKEN_RETRY_MAX_SECONDS = float(os.environ.get("SPOTIFY_TOKEN_RETRY_MAX_SECONDS", "600"))
+
+# How long /set-active-device keeps checking in the background that the device came up
+MONITOR_DEVICE_SECONDS = float(os.environ.get("MONITOR_DEVICE_SECONDS", "50"))
+
 # Step 1: Redirect user to Spotify login - moved back from auth.py
 @app.route("/login")
 def login():
@@ -60,6 +124,7 @@ def login():
 def callback():
     """Handle callback from Spotify OAuth"""
     global sp
+    import requests
     code = request.args.get("code")
     if not code:
         return "Authorization failed: No code provided", 400
@@ -78,7 +143,7 @@ def callback():
     }
 
     try:
-        response = requests.post(token_url, data=payload, headers=headers)
+        response = requests.post(token_url, data=payload, headers=headers, timeout=TOKEN_REQUEST_TIMEOUT)
         response.raise_for_status()  # This will raise an exception for 4XX/5XX responses
         
         tokens = response.json()
@@ -86,16 +151,17 @@ def callback():
         refresh_token = tokens.get("refresh_token")  # Store this for later use
         
         # Initialize the Spotify client with the access token
-        sp = Spotify(auth=access_token)
+        with state.spotify_lock:
+            sp = spotify_client.create_client(access_token)
+        token_refresh_backoff.update(failures=0, next_attempt=0.0)
         
         # Verify Spotify client is initialized
         user_info = sp.current_user()
         print(f"Spotify client initialized successfully for user: {user_info.get('id', 'unknown')}")
         
-        # Store tokens securely in session or database for server-side use
+        # Persist the tokens so a restart comes back up logged in
+        token_store.save(access_token, refresh_token, tokens.get("expires_in", 3600))
         if refresh_token:
-            # Store refresh_token in a secure way - example only
-            # In production, use a secure database or encrypted storage
             session['spotify_refresh_token'] = refresh_token
         
         # Return success page with token and auto-close script
@@ -188,51 +254,89 @@ def get_devices():
     except Exception as e:
         return f"Error fetching devices: {str(e)}", 500
 
-# Initialize deque to store the last 10 messages (query, response pairs)
-message_history = deque(maxlen=10)
+# Request threads share this state, so it lives in state.py: reads are
+# lock-free snapshots and every update is applied atomically
+message_history = state.history
+conversation_context = state.conversation
+active_device = state.active_device
 
-# Global variable for active device
-active_device_id = None
+# Largest page /history returns
+HISTORY_PAGE_LIMIT = 50
 
-# Global variable for tracking conversation context
-conversation_context = {
-    'last_suggested_songs': [],
-    'current_song_topic': None,
-    'last_recommendation_query': None
-}
+def record_message(query, response):
+    """Add a query/response pair to the message history and return the entry."""
+    return message_history.append(query, response)
+
+def history_since(cursor):
+    """Return the history entries newer than `cursor`, whether older unseen ones were dropped and whether the cursor was reset."""
+    return message_history.since(cursor)
+
+# Failed refreshes back off, so requests made while logged out don't each call Spotify
+token_refresh_backoff = {"failures": 0, "next_attempt": 0.0}
+
+def _token_refresh_failed(revoked):
+    """Back off after a failed refresh; a revoked refresh token is forgotten for good."""
+    if revoked:
+        print("Spotify refresh token was revoked or expired; log in again")
+        token_store.clear()
+        if has_request_context():
+            session.pop('spotify_refresh_token', None)
+    failures = token_refresh_backoff["failures"] + 1
+    delay = min(TOKEN_RETRY_SECONDS * 2 ** (failures - 1), TOKEN_RETRY_MAX_SECONDS)
+    token_refresh_backoff.update(failures=failures, next_attempt=time.monotonic() + delay)
 
 def refresh_spotify_token(refresh_token):
     """Helper function to refresh an expired Spotify token"""
     global sp
-    try:
-        token_url = "https://accounts.spotify.com/api/token"
-        payload = {
-            "grant_type": "refresh_token",
-            "refresh_token": refresh_token,
-            "client_id": SPOTIFY_CLIENT_ID,
-            "client_secret": SPOTIFY_CLIENT_SECRET
-        }
+    if time.monotonic() < token_refresh_backoff["next_attempt"]:
+        return None
+    # Serialized so concurrent requests don't each spend (and rotate) the refresh token
+    with state.spotify_lock:
+        if time.monotonic() < token_refresh_backoff["next_attempt"]:
+            return None  # Another request just failed to refresh
+        try:
+            import requests
+            token_url = "https://accounts.spotify.com/api/token"
+            payload = {
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "client_id": SPOTIFY_CLIENT_ID,
+                "client_secret": SPOTIFY_CLIENT_SECRET
+            }
 
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
+            headers = {
+                "Content-Type": "application/x-www-form-urlencoded"
+            }
 
-        response = requests.post(token_url, data=payload, headers=headers)
-        response.raise_for_status()
+            timeout = TOKEN_REQUEST_TIMEOUT
+            time_left = resilience.remaining()
+            if time_left is not None:
+                timeout = max(0.1, min(timeout, time_left))
+            response = requests.post(token_url, data=payload, headers=headers, timeout=timeout)
+            if response.status_code in (400, 401):
+                # invalid_grant: the refresh token was revoked or has expired
+                print(f"Spotify rejected the refresh token: {response.text[:200]}")
+                _token_refresh_failed(revoked=True)
+                return None
+            response.raise_for_status()
         
-        tokens = response.json()
-        new_token = tokens["access_token"]
+            tokens = response.json()
+            new_token = tokens["access_token"]
+            # Spotify only sometimes rotates the refresh token
+            token_store.save(new_token, tokens.get("refresh_token", refresh_token), tokens.get("expires_in", 3600))
         
-        # Update the Spotify client with the new token
-        if sp is not None:
-            sp.auth = new_token
-        else:
-            sp = Spotify(auth=new_token)
+            # Update the Spotify client with the new token
+            if sp is not None:
+                sp.auth = new_token
+            else:
+                sp = spotify_client.create_client(new_token)
+            token_refresh_backoff.update(failures=0, next_attempt=0.0)
             
-        return new_token
-    except Exception as e:
-        print(f"Error refreshing token: {e}")
-        return None
+            return new_token
+        except Exception as e:
+            print(f"Error refreshing token: {e}")
+            _token_refresh_failed(revoked=False)
+            return None
 
 @app.route('/get-spotify-token', methods=['GET'])
 def get_spotify_token():
@@ -258,11 +362,11 @@ def get_spotify_token():
                 print(f"Token validation error: {e}")
                 
                 # Try to refresh the token if we have a refresh token
-                if 'spotify_refresh_token' in session:
+                refresh_token = session.get('spotify_refresh_token') or (token_store.load() or {}).get('refresh_token')
+                if refresh_token:
                     try:
-                        new_token = refresh_spotify_token(session['spotify_refresh_token'])
+                        new_token = refresh_spotify_token(refresh_token)
                         if new_token:
-                            sp.auth = new_token
                             return jsonify({
                                 'token': new_token,
                                 'valid': True,
@@ -288,31 +392,86 @@ def get_spotify_token():
         print(f"Error retrieving Spotify token: {e}")
         return jsonify({'error': f'Failed to retrieve token: {str(e)}'}), 500
 
+def restore_spotify_session():
+    """Rebuild the Spotify client from the token store, refreshing only if the access token expired."""
+    global sp
+    tokens = token_store.load()
+    if not tokens:
+        return False
+    if token_store.is_access_token_valid(tokens):
+        with state.spotify_lock:
+            sp = spotify_client.create_client(tokens["access_token"])
+        print("Restored Spotify session from the token store")
+        return True
+    if tokens.get("refresh_token"):
+        return refresh_spotify_token(tokens["refresh_token"]) is not None
+    return False
+
 # Function to ensure Spotify is initialized before any operations
 def ensure_spotify_initialized():
-    global sp
     if sp is None:
-        # Check if we have a refresh token to try
-        if 'spotify_refresh_token' in session:
-            try:
-                new_token = refresh_spotify_token(session['spotify_refresh_token'])
-                if new_token:
-                    sp = Spotify(auth=new_token)
-                    return True
-            except Exception as e:
-                print(f"Error initializing Spotify client: {e}")
-                return False
-        return False
+        # One request restores the session; concurrent ones wait for it and reuse the client
+        with state.spotify_lock:
+            if sp is None and not restore_spotify_session():
+                # Check if we have a refresh token to try
+                refresh_token = session.get('spotify_refresh_token')
+                if not refresh_token or not refresh_spotify_token(refresh_token):
+                    return False
+    start_background_jobs()
     return True
 
-def get_gemini_response(prompt):
-    """Get AI-generated response from Google Gemini."""
+def in_background(function):
+    """Wrap a function so its Spotify calls queue behind user-facing ones."""
+    def run_in_background(*args, **kwargs):
+        with spotify_governor.priority(spotify_governor.PRIORITY_BACKGROUND):
+            return function(*args, **kwargs)
+    return run_in_background
+
+def start_background_jobs():
+    """Start the background workers that need an authenticated Spotify client (idempotent)."""
+    recommendation_pool.start(
+        resolve_mood=in_background(lambda mood, count: resolve_ai_song_suggestions(f" that match the mood: {mood}", count)),
+        resolve_genre=in_background(search_genre_tracks)
+    )
+    similar_prefetch.start(compute_similar=in_background(get_similar_songs_for_track))
+    now_playing.start(get_playback=in_background(lambda: sp.current_playback() if sp else None),
+                      get_playback_now=lambda: sp.current_playback() if sp else None)
+    library_index.start(sync_library=in_background(lambda: library_index.sync(sp) if sp else None))
+    genre_taxonomy.start(fetch_seeds=in_background(fetch_genre_seeds))
+
+def warm_up():
+    """Pay the one-time startup costs (SDK imports, models, caches) before serving traffic."""
+    started = datetime.datetime.now()
+    intent_classifier.get_model()
+    if API_KEY:
+        gemini_client.warm_up()
+    import spotipy  # noqa: F401
+    import requests  # noqa: F401
+    # Come up already logged in if there is a stored session
+    if restore_spotify_session():
+        start_background_jobs()
+    weather.get_weather()
+    dashboard.start()
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    print(f"🔥 API warmed up in {elapsed:.2f}s")
+
+# Track changes prefetch similar songs and refresh the dashboard
+now_playing.add_listener(similar_prefetch.on_playback_change)
+now_playing.add_listener(lambda playback: dashboard.rebuild())
+
+# Identical prompts that are already in flight share one Gemini call
+gemini_flights = SingleFlight()
+
+def get_gemini_response(prompt, kind=None):
+    """Get AI-generated response from Google Gemini, using the system instruction for `kind` (see prompts.py)."""
     try:
-        response = model.generate_content(prompt)
-        if not response or not response.text:
+        response_text = gemini_flights.do(
+            (kind, prompt), lambda: gemini_client.generate_text(prompt, kind), timeout=resilience.remaining()
+        )
+        if not response_text:
             return "{}"  # Return an empty JSON object to prevent errors
-        print(f"Gemini Raw Response: {response.text}")  # Debugging
-        return response.text
+        print(f"Gemini Raw Response: {response_text}")  # Debugging
+        return response_text
     except Exception as e:
         print(f"Error with Gemini AI: {e}")
         return "{}"  # Return empty JSON object
@@ -336,25 +495,8 @@ def extract_json_from_text(text):
 
 def extract_music_intent(user_query):
     """Determine if the command is music-related and extract relevant details."""
-    prompt = f"""
-    Analyze the following user query and determine whether it is related to music playback.
-
-    - If it is a music command (play, pause, next, previous, song name, artist, etc.), return a structured JSON response with:
-        - `intent`: (play, pause, next, previous, current_song)
-        - `song_name`: (if mentioned, otherwise null)
-        - `artist`: (if mentioned, otherwise null)
-        - `option_number`: (if user is selecting from options like "play option 1", extract the number)
-
-    - If user is selecting from options (e.g., "play option 2", "choose option 1"), set:
-        - `intent`: "play_option"
-        - `option_number`: (the option number they selected, as an integer)
-
-    - If the query is NOT about music, return `{{"intent": "general"}}`.
-
-    User Query: "{user_query}"
-    Return JSON format only.
-    """
-    response = get_gemini_response(prompt)
+    prompt = prompts.user_prompt("music_intent", query=user_query)
+    response = get_gemini_response(prompt, "music_intent")
     json_response = extract_json_from_text(response)
     
     try:
@@ -367,22 +509,9 @@ def extract_music_intent(user_query):
 
 def analyze_mood_for_music(user_query):
     """Analyze user's query to determine mood and suggest appropriate music."""
-    prompt = f"""
-    Analyze the following statement and extract:
-    1. The user's current mood or emotional state
-    2. A music genre that would match this mood
-    3. A specific search query for a song that would be appropriate
-    
-    Format your response as valid JSON with these fields:
-    - mood: a brief description of the detected mood
-    - genre: a music genre that matches the mood
-    - song_query: a specific search phrase for Spotify (artist name and/or song title)
-    
-    User statement: "{user_query}"
-    Return ONLY the JSON object without any additional text.
-    """
+    prompt = prompts.user_prompt("mood", query=user_query)
     
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "mood")
     json_response = extract_json_from_text(response)
     
     try:
@@ -400,8 +529,6 @@ def analyze_mood_for_music(user_query):
 
 def play_on_active_device(uris=None, context_uri=None):
     """Play specified content on the active Spotify device."""
-    global active_device_id
-    
     try:
         # Get available devices if we don't have an active one or refresh anyway
         devices = sp.devices()
@@ -421,22 +548,24 @@ def play_on_active_device(uris=None, context_uri=None):
         
         if active_devices:
             # Use the currently active device
-            active_device_id = active_devices[0]['id']
-            print(f"Using currently active device: {active_devices[0]['name']} ({active_device_id})")
+            device_id = active_devices[0]['id']
+            active_device.set(device_id)
+            print(f"Using currently active device: {active_devices[0]['name']} ({device_id})")
         else:
             # Use the first available device
-            active_device_id = available_devices[0]['id']
-            print(f"No active device, using first available: {available_devices[0]['name']} ({active_device_id})")
+            device_id = available_devices[0]['id']
+            active_device.set(device_id)
+            print(f"No active device, using first available: {available_devices[0]['name']} ({device_id})")
             
             # Try to activate this device
             try:
-                sp.transfer_playback(device_id=active_device_id, force_play=False)
+                sp.transfer_playback(device_id=device_id, force_play=False)
                 print(f"Set {available_devices[0]['name']} as active device")
             except Exception as e:
                 print(f"Note: Could not transfer playback (this is normal if no music is playing): {e}")
         
         # Prepare playback arguments
-        play_kwargs = {'device_id': active_device_id}
+        play_kwargs = {'device_id': device_id}
         
         if uris:
             play_kwargs['uris'] = uris
@@ -448,6 +577,7 @@ def play_on_active_device(uris=None, context_uri=None):
         # Attempt playback
         print("Calling start_playback with parameters:", play_kwargs)
         sp.start_playback(**play_kwargs)
+        now_playing.invalidate()
         print("✅ Playback started successfully")
         return True
     
@@ -467,22 +597,24 @@ def play_on_active_device(uris=None, context_uri=None):
                     return False
                 
                 # Select first device and force activation
-                active_device_id = available_devices[0]['id']
-                sp.transfer_playback(device_id=active_device_id, force_play=True)
+                device_id = available_devices[0]['id']
+                active_device.set(device_id)
+                transferred_at = time.monotonic()
+                sp.transfer_playback(device_id=device_id, force_play=True)
                 print(f"Transferred playback to {available_devices[0]['name']}")
                 
                 # Wait for device activation
-                import time
-                time.sleep(2)
+                device_readiness.wait_until_active(device_id, sp.devices, started=transferred_at)
                 
                 # Retry playback
-                play_kwargs = {'device_id': active_device_id}
+                play_kwargs = {'device_id': device_id}
                 if uris:
                     play_kwargs['uris'] = uris
                 elif context_uri:
                     play_kwargs['context_uri'] = context_uri
                 
                 sp.start_playback(**play_kwargs)
+                now_playing.invalidate()
                 print("✅ Playback started successfully after retry")
                 return True
             except Exception as retry_error:
@@ -496,6 +628,15 @@ def play_on_active_device(uris=None, context_uri=None):
             
         return False
 
+def search_ranked_tracks(song_name, artist=None):
+    """Find a song in the user's library, or search Spotify and rank a page of results. Returns (ranked, confident)."""
+    ranked, confident = library_index.lookup(song_name, artist)
+    if confident:
+        return ranked, confident
+    query = f"{song_name} {artist}" if artist else song_name
+    results = sp.search(q=query, type='track', limit=track_ranking.SEARCH_LIMIT)
+    return track_ranking.best_match(song_name, artist, results["tracks"]["items"])
+
 def control_music(user_query):
     """Control Spotify playback based on AI-detected intent."""
     music_data = extract_music_intent(user_query)
@@ -508,30 +649,14 @@ def control_music(user_query):
                 song_name = music_data.get("song_name", "").lower() if music_data.get("song_name") else ""
                 artist = music_data.get("artist", "").lower() if music_data.get("artist") else ""
                 
-                # Construct search query
-                query = f"{song_name} {artist}".strip()
+                # Rank a page of search results against the request
+                ranked, confident = search_ranked_tracks(song_name, artist)
                 
-                # Search for tracks with the given query
-                results = sp.search(q=query, type='track', limit=3)
-                
-                if results["tracks"]["items"]:
-                    tracks = results["tracks"]["items"]
+                if ranked:
+                    tracks = track_ranking.distinct_options(ranked)
                     
-                    # Check for exact match (case insensitive)
-                    exact_match = None
-                    for track in tracks:
-                        track_name = track["name"].lower()
-                        track_artist = track["artists"][0]["name"].lower() if track["artists"] else ""
-                        
-                        # Check if this is an exact match
-                        name_match = song_name in track_name or track_name in song_name
-                        artist_match = not artist or artist in track_artist or track_artist in artist
-                        
-                        if name_match and artist_match:
-                            exact_match = track
-                            break
-                    
-                    # If we found an exact match, play it
+                    # If there is a clear best match, play it
+                    exact_match = ranked[0][1] if confident else None
                     if exact_match:
                         success = play_on_active_device(uris=[exact_match["uri"]])
                         if success:
@@ -630,18 +755,21 @@ def control_music(user_query):
         
         elif music_data["intent"] == "pause":
             sp.pause_playback()
+            now_playing.invalidate()
             return "Music paused."
 
         elif music_data["intent"] == "next":
             sp.next_track()
+            now_playing.invalidate()
             return "Skipped to the next song."
 
         elif music_data["intent"] == "previous":
             sp.previous_track()
+            now_playing.invalidate()
             return "Playing the previous song."
 
         elif music_data["intent"] == "current_song":
-            current_track = sp.current_playback()
+            current_track = now_playing.get_playback()
             if current_track and current_track["is_playing"]:
                 song_name = current_track["item"]["name"]
                 artist = current_track["item"]["artists"][0]["name"]
@@ -666,25 +794,44 @@ def ask_google_assistant(prompt):
     # Combine conversation history into a single string
     history_text = "\n".join([f"User: {msg['query']}\nAssistant: {msg['response']}" for msg in message_history])
 
-    simplified_prompt = (
-        "Imagine you are a magic mirror. You reflect the questions asked of you and offer answers in a clear, simple, and easy-to-understand way. "
-        "Avoid using complex words, bullet points, or special characters. Keep your responses short and sweet, so they are easy for anyone to understand. "
-        "You provide simple, natural answers as though you are a mirror reflecting the world around you. Don't make the answers too long or too short. "
-        "Also, don't explicity say 'I am a mirror' or 'I reflect'. Just reflect the user's query in your response. "
-        "When the reply is small, you can add a little more detail to make it more interesting. But not more than 1 sentence. "
-        "Here is the conversation history:\n" + history_text + "\nUser's Question: " + prompt + "\nYour Response:"
-    )
+    # The magic-mirror persona is the "assistant" model's system instruction
+    simplified_prompt = prompts.user_prompt("assistant", history=history_text, query=prompt)
 
     try:
-        response = model.generate_content(simplified_prompt)
-        if response:
-            return response.text
+        response_text = gemini_flights.do(
+            ("assistant", simplified_prompt), lambda: gemini_client.generate_text(simplified_prompt, "assistant"),
+            timeout=resilience.remaining()
+        )
+        if response_text:
+            return response_text
         else:
             return "The reflection is unclear... I cannot see the answer at this moment."
+    except (resilience.CircuitOpen, resilience.DeadlineExceeded, TimeoutError) as e:
+        print(f"Gemini unavailable, answering locally: {e}")
+        return local_fallback_answer(prompt)
     except Exception as e:
         print(f"Error occurred: {e}")
         return "The mirror has clouded over... Please try again."
 
+def local_fallback_answer(prompt):
+    """Canned answers for when Gemini is down or too slow."""
+    query = prompt.lower()
+    now = datetime.datetime.now()
+
+    def mentions(*phrases):
+        # Whole words only, so "sometimes" isn't about the time and "this" isn't a greeting
+        return any(re.search(rf"\b{re.escape(phrase)}\b", query) for phrase in phrases)
+
+    if mentions("time", "clock"):
+        return f"It is {now.strftime('%H:%M')} right now."
+    if mentions("date", "what day", "today"):
+        return f"Today is {now.strftime('%A, %B %d')}."
+    if mentions("hello", "hi", "hey", "good morning", "good evening", "how are you"):
+        return "Hello! The mirror is a little quiet right now, but it is happy to see you."
+    if mentions("thank", "thanks"):
+        return "You are very welcome."
+    return "The mirror is resting its thoughts for a moment... Please ask me again shortly."
+
 def get_similar_songs(song_name, artist=None, limit=5):
     """Get similar songs to a given track using Spotify recommendations."""
     try:
@@ -705,172 +852,151 @@ def get_similar_songs(song_name, artist=None, limit=5):
         if results['tracks']['items']:
             seed_track = results['tracks']['items'][0]
             
-            try:
-                # First try: Get recommendations using seed track
-                recommendations = sp.recommendations(
-                    seed_tracks=[seed_track['id']], 
-                    limit=limit
-                )
-                
-                recommended_tracks = []
-                for track in recommendations['tracks']:
-                    recommended_tracks.append({
-                        'name': track['name'],
-                        'artist': track['artists'][0]['name'],
-                        'uri': track['uri'],
-                        'id': track['id']
-                    })
-                
-                if recommended_tracks:
-                    print(f"Found {len(recommended_tracks)} recommendations using seed track")
-                    return recommended_tracks
-                    
-            except Exception as rec_error:
-                print(f"Error with recommendations API: {rec_error}")
-                # Using AI to generate recommendations instead of manual fallback methods
-                return get_ai_fallback_recommendations(seed_track, limit)
+            # The prefetcher may already have the answer for this track
+            prefetched = similar_prefetch.get(seed_track['id'])
+            if prefetched:
+                return prefetched[:limit]
+            
+            recommended_tracks = get_similar_songs_for_track(seed_track, limit)
+            similar_prefetch.put(seed_track['id'], recommended_tracks)
+            return recommended_tracks
     
     except Exception as e:
         print(f"Error getting song recommendations: {e}")
-        return []
+    return []
+
+def get_similar_songs_for_track(seed_track, limit=5):
+    """Get similar songs for a Spotify track item from whichever recommendation source answers well first."""
+    return recommendation_engine.recommend(seed_track, RECOMMENDATION_SOURCES, limit)
+
+def refers_to_current_song(user_query):
+    """Check if a query asks about the song that is playing right now."""
+    query = user_query.lower()
+    return any(phrase in query for phrase in [
+        "like this", "similar to this", "this song", "this track", "like the current",
+        "current song", "what's playing", "like what is playing", "like what's playing"
+    ])
 
-def get_ai_fallback_recommendations(seed_track, limit=5):
-    """Use AI to generate fallback recommendations when Spotify API methods fail."""
+def suggest_similar_to_current_song(play_first=False):
+    """Suggest (or play) songs similar to the current track, using the prefetched list when ready."""
+    current_track = None
     try:
-        # Extract information about the seed track
-        song_name = seed_track['name']
-        artist_name = seed_track['artists'][0]['name']
-        
-        # Create a prompt for Gemini to suggest similar songs
-        prompt = f"""
-        I need recommendations for songs similar to "{song_name}" by {artist_name}.
-        Please suggest {limit} songs that are musically similar or related.
-        
-        Return your response as a JSON array with this format:
-        [
-            {{"name": "Song Name 1", "artist": "Artist Name 1"}},
-            {{"name": "Song Name 2", "artist": "Artist Name 2"}},
-            ...
-        ]
-        
-        Only return the JSON array, nothing else.
-        """
-        
-        # Get recommendations from Gemini
-        response = get_gemini_response(prompt)
-        json_response = extract_json_from_text(response)
-        
-        try:
-            recommended_songs = json.loads(json_response)
-            
-            if isinstance(recommended_songs, list) and recommended_songs:
-                # For each AI-suggested song, search Spotify to get the URI
-                ai_recommended_tracks = []
-                
-                for song in recommended_songs[:limit]:
-                    if 'name' in song and 'artist' in song:
-                        # Search Spotify for this song
-                        search_query = f"{song['name']} {song['artist']}"
-                        results = sp.search(q=search_query, type='track', limit=1)
-                        
-                        if results['tracks']['items']:
-                            track = results['tracks']['items'][0]
-                            ai_recommended_tracks.append({
-                                'name': track['name'],
-                                'artist': track['artists'][0]['name'],
-                                'uri': track['uri'],
-                                'id': track['id']
-                            })
-                
-                if ai_recommended_tracks:
-                    print(f"Found {len(ai_recommended_tracks)} recommendations using AI fallback")
-                    return ai_recommended_tracks
-        except json.JSONDecodeError as json_err:
-            print(f"Error decoding AI recommendations JSON: {json_err}")
-        
-        # If AI recommendations failed or returned no valid results, try artist fallback
-        print("Trying artist fallback after AI recommendations failed")
-        artist_id = seed_track['artists'][0]['id']
-            
-        try:
-            # Get top tracks from the same artist
-            artist_tracks = sp.artist_top_tracks(artist_id)
-            
-            recommended_tracks = []
-            for track in artist_tracks['tracks'][:limit]:
-                # Skip the original song
-                if track['id'] == seed_track['id']:
-                    continue
-                        
-                recommended_tracks.append({
-                    'name': track['name'],
-                    'artist': track['artists'][0]['name'],
-                    'uri': track['uri'],
-                    'id': track['id']
-                })
-            
-            if recommended_tracks:
-                print(f"Found {len(recommended_tracks)} recommendations using artist top tracks")
-                return recommended_tracks
-                    
-        except Exception as artist_error:
-            print(f"Error getting artist top tracks: {artist_error}")
-        
-        # If all else fails, search for related terms
-        search_term = f"{seed_track['artists'][0]['name']} similar"
-        similar_results = sp.search(q=search_term, type='track', limit=limit)
-        
-        recommended_tracks = []
-        for track in similar_results['tracks']['items']:
-            # Skip the original song
-            if track['id'] == seed_track['id']:
-                continue
-                    
-            recommended_tracks.append({
-                'name': track['name'],
-                'artist': track['artists'][0]['name'],
-                'uri': track['uri'],
-                'id': track['id']
-            })
-        
-        print(f"Found {len(recommended_tracks)} recommendations using search")
-        return recommended_tracks
+        playback = now_playing.get_playback()
+        if playback and playback.get("item"):
+            current_track = playback["item"]
     except Exception as e:
-        print(f"Error getting song recommendations: {e}")
+        print(f"Error getting current playback: {e}")
+    
+    if not current_track:
+        return None
+    
+    # Give an in-flight prefetch a moment to finish rather than starting over
+    similar_prefetch.observe(current_track)
+    wait = 5
+    time_left = resilience.remaining()
+    if time_left is not None:
+        wait = min(wait, time_left)
+    recommendations = similar_prefetch.get(current_track['id'], wait=wait)
+    if not recommendations:
+        recommendations = get_similar_songs_for_track(current_track)
+        similar_prefetch.put(current_track['id'], recommendations)
+    
+    if not recommendations:
+        return None
+    
+    conversation_context.update(last_suggested_songs=recommendations, current_song_topic=current_track['name'])
+    
+    if play_first:
+        return play_suggested_song(0)
+    
+    suggestion_text = f"Here are some songs like \"{current_track['name']}\":\n"
+    for i, track in enumerate(recommendations[:3], 1):
+        suggestion_text += f"{i}. \"{track['name']}\" by {track['artist']}\n"
+    
+    suggestion_text += "\nWould you like me to play any of these?"
+    return suggestion_text
+
+def track_summary(track):
+    """The fields suggestions keep for a Spotify track item."""
+    return {
+        'name': track['name'],
+        'artist': track['artists'][0]['name'],
+        'uri': track['uri'],
+        'id': track['id']
+    }
+
+def spotify_recommendation_source(seed_track, limit, cancelled):
+    """Spotify's own recommendations for the seed track."""
+    recommendations = sp.recommendations(seed_tracks=[seed_track['id']], limit=limit)
+    return [track_summary(track) for track in recommendations['tracks']]
+
+def gemini_recommendation_source(seed_track, limit, cancelled):
+    """Songs Gemini suggests for the seed track, resolved to Spotify tracks."""
+    song_name = seed_track['name']
+    artist_name = seed_track['artists'][0]['name']
+    
+    # Create a prompt for Gemini to suggest similar songs
+    prompt = prompts.user_prompt("similar_songs", limit=limit, song=song_name, artist=artist_name)
+    response = get_gemini_response(prompt, "similar_songs")
+    recommended_songs = json.loads(extract_json_from_text(response))
+    if not isinstance(recommended_songs, list):
         return []
+    
+    # For each AI-suggested song, search Spotify to get the URI
+    ai_recommended_tracks = []
+    for song in recommended_songs[:limit]:
+        if cancelled.is_set():
+            break
+        if 'name' in song and 'artist' in song:
+            results = sp.search(q=f"{song['name']} {song['artist']}", type='track', limit=1)
+            if results['tracks']['items']:
+                ai_recommended_tracks.append(track_summary(results['tracks']['items'][0]))
+    return ai_recommended_tracks
+
+def artist_top_tracks_source(seed_track, limit, cancelled):
+    """Top tracks from the seed track's artist."""
+    artist_tracks = sp.artist_top_tracks(seed_track['artists'][0]['id'])
+    return [track_summary(track) for track in artist_tracks['tracks'][:limit + 1]]
+
+def similar_search_source(seed_track, limit, cancelled):
+    """A Spotify search for "<artist> similar"."""
+    search_term = f"{seed_track['artists'][0]['name']} similar"
+    similar_results = sp.search(q=search_term, type='track', limit=limit + 1)
+    return [track_summary(track) for track in similar_results['tracks']['items']]
+
+# In order of preference; each starts after its RECOMMENDATION_HEDGE_DELAYS delay
+RECOMMENDATION_SOURCES = [
+    recommendation_engine.Source("spotify_recommendations", spotify_recommendation_source),
+    recommendation_engine.Source("gemini", gemini_recommendation_source),
+    recommendation_engine.Source("artist_top_tracks", artist_top_tracks_source),
+    recommendation_engine.Source("similar_search", similar_search_source),
+]
 
 def get_genre_recommendations(genre, limit=5):
     """Get song recommendations for a specific genre."""
+    # Aliases, sub-genres and misspellings share their canonical genre's pool and seeds
+    genre = genre_taxonomy.resolve(genre) or genre
+    
+    # Serve popular genres from the warm pool
+    recommendation_pool.record_request("genre", genre)
+    pooled_tracks = recommendation_pool.take("genre", genre, limit)
+    if pooled_tracks:
+        print(f"Serving {len(pooled_tracks)} tracks for genre {genre} from the warm pool")
+        return pooled_tracks
+
+    return search_genre_tracks(genre, limit)
+
+def search_genre_tracks(genre, limit=5):
+    """Tracks for a genre from its seeds, or one Spotify search while they are cold or for unknown genres."""
+    seeded_tracks = genre_taxonomy.tracks(genre, limit)
+    if seeded_tracks:
+        print(f"Serving {len(seeded_tracks)} tracks for genre {genre} from its seeds")
+        return seeded_tracks
     try:
         print(f"Searching for genre: {genre}")
-        
-        # First try searching directly with the genre
-        results = sp.search(q=genre, type='track', limit=limit)
-        
-        if not results['tracks']['items']:
-            # Try variations of the genre name
-            alternative_queries = [
-                f"best {genre}", 
-                f"{genre} top", 
-                f"{genre} hits",
-                f"popular {genre}"
-            ]
-            
-            for query in alternative_queries:
-                results = sp.search(q=query, type='track', limit=limit)
-                if results['tracks']['items']:
-                    print(f"Found results with query: {query}")
-                    break
-        
-        recommended_tracks = []
-        for track in results['tracks']['items']:
-            recommended_tracks.append({
-                'name': track['name'],
-                'artist': track['artists'][0]['name'],
-                'uri': track['uri'],
-                'id': track['id']
-            })
-        
+        query = genre_taxonomy.search_query(genre) if genre in genre_taxonomy.genres else genre
+        results = sp.search(q=query, type='track', limit=limit)
+        recommended_tracks = [track_summary(track) for track in results['tracks']['items']]
         print(f"Found {len(recommended_tracks)} tracks for genre: {genre}")
         return recommended_tracks
     
@@ -878,60 +1004,115 @@ def get_genre_recommendations(genre, limit=5):
         print(f"Error getting genre recommendations: {e}")
         return []
 
+def fetch_genre_seeds(query, track_count, playlist_count):
+    """Seed tracks and playlists for a genre from one Spotify search."""
+    results = sp.search(q=query, type='track,playlist', limit=min(max(track_count, playlist_count), 50))
+    # Spotify sometimes returns null entries for playlists that were removed
+    found_playlists = [playlist for playlist in results['playlists']['items'] if playlist][:playlist_count]
+    return {
+        'tracks': [track_summary(track) for track in results['tracks']['items'][:track_count]],
+        'playlists': [
+            {'name': playlist['name'], 'uri': playlist['uri'], 'id': playlist['id']}
+            for playlist in found_playlists
+        ]
+    }
+
+def requested_genre(request_analysis):
+    """The canonical genre a play request asks for, if it names a genre and no artist."""
+    if request_analysis.get("artist"):
+        return None
+    if request_analysis.get("genre"):
+        return genre_taxonomy.resolve(request_analysis["genre"])
+    # "play jazz" often comes back as a song name; only a name that is wholly a genre counts
+    return genre_taxonomy.resolve_exact(request_analysis.get("song_name"))
+
+def play_genre(genre):
+    """Play one of a genre's seed playlists, or its seed tracks while no playlist is known."""
+    playlists = genre_taxonomy.playlists(genre)
+    if playlists:
+        playlist = random.choice(playlists)
+        if play_on_active_device(context_uri=playlist['uri']):
+            return f"Playing {genre} from the playlist \"{playlist['name']}\"."
+        return "I found a playlist but couldn't play it. Please make sure Spotify is open."
+
+    tracks = search_genre_tracks(genre, 10)
+    if not tracks:
+        return f"Sorry, I couldn't find any {genre} to play right now."
+    if play_on_active_device(uris=[track['uri'] for track in tracks]):
+        return f"Playing some {genre}, starting with \"{tracks[0]['name']}\" by {tracks[0]['artist']}."
+    return "I found some songs but couldn't play them. Please make sure Spotify is open."
+
 def get_song_suggestions():
     """Get song suggestions based on conversation context using AI."""
-    global conversation_context
-    
-    # Create an AI prompt based on the current context
-    query_context = ""
-    
-    if conversation_context.get('current_song_topic'):
-        query_context += f" similar to {conversation_context['current_song_topic']}"
-    
-    if conversation_context.get('artist'):
-        query_context += f" by or similar to {conversation_context['artist']}"
-    
-    if conversation_context.get('genre'):
-        query_context += f" in the {conversation_context['genre']} genre"
-    
-    if conversation_context.get('mood'):
-        query_context += f" that match the mood: {conversation_context['mood']}"
+    # One snapshot, so a concurrent request can't change the context halfway through
+    context = conversation_context.snapshot()
+    
+    # Plain mood or genre requests can be served from the warm recommendation pools
+    recommendations = None
+    if not context.get('current_song_topic') and not context.get('artist'):
+        mood = context.get('mood')
+        genre = genre_taxonomy.resolve(context.get('genre')) or context.get('genre')
+        if mood and not genre:
+            recommendation_pool.record_request("mood", mood)
+            recommendations = recommendation_pool.take("mood", mood)
+        elif genre and not mood:
+            recommendation_pool.record_request("genre", genre)
+            recommendations = recommendation_pool.take("genre", genre) or genre_taxonomy.tracks(genre)
+    
+    if recommendations:
+        print(f"Serving {len(recommendations)} suggestions from the warm pool")
+    else:
+        # Create an AI prompt based on the current context
+        query_context = ""
+        
+        if context.get('current_song_topic'):
+            query_context += f" similar to {context['current_song_topic']}"
+        
+        if context.get('artist'):
+            query_context += f" by or similar to {context['artist']}"
+        
+        if context.get('genre'):
+            query_context += f" in the {context['genre']} genre"
+        
+        if context.get('mood'):
+            query_context += f" that match the mood: {context['mood']}"
+        
+        # If no context, use the original query
+        if not query_context and context.get('last_recommendation_query'):
+            query_context = context['last_recommendation_query']
+        
+        recommendations = resolve_ai_song_suggestions(query_context)
     
-    # If no context, use the original query
-    if not query_context and conversation_context.get('last_recommendation_query'):
-        query_context = conversation_context['last_recommendation_query']
+    if recommendations:
+        # Store the recommendations
+        conversation_context.update(last_suggested_songs=recommendations)
+        
+        # Format the response
+        suggestion_text = f"Based on your mood, here are some songs that might help:\n"
+        for i, track in enumerate(recommendations[:3], 1):
+            suggestion_text += f"{i}. \"{track['name']}\" by {track['artist']}\n"
+        
+        suggestion_text += "\nWould you like me to play any of these?"
+        return suggestion_text
     
+    # Fallback - use AI for a general mood-based recommendation
+    return ai_mood_based_fallback()
+
+def resolve_ai_song_suggestions(query_context, count=5):
+    """Ask Gemini for songs matching a context and resolve them to Spotify tracks."""
     # Use AI to determine the best songs for this request
-    prompt = f"""
-    As a music expert, recommend 5 songs {query_context}.
-    
-    Be very specific about understanding the user's mood and intent:
-    - If they mentioned a date or romantic situation, suggest romantic or upbeat love songs
-    - If they mentioned needing confidence, suggest empowering songs
-    - If they mentioned relaxing, suggest calming songs
-    - Always prioritize popular, well-known songs that match the mood over obscure tracks
-    
-    Return your response ONLY as a JSON array with this format:
-    [
-        {{"name": "Song Name 1", "artist": "Artist Name 1"}},
-        {{"name": "Song Name 2", "artist": "Artist Name 2"}},
-        {{"name": "Song Name 3", "artist": "Artist Name 3"}},
-        {{"name": "Song Name 4", "artist": "Artist Name 4"}},
-        {{"name": "Song Name 5", "artist": "Artist Name 5"}}
-    ]
-    """
+    prompt = prompts.user_prompt("song_suggestions", count=count, context=query_context)
     
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "song_suggestions")
     json_response = extract_json_from_text(response)
     
+    recommendations = []
     try:
         ai_suggestions = json.loads(json_response)
         
         if isinstance(ai_suggestions, list) and ai_suggestions:
             # Convert AI suggestions to actual Spotify tracks
-            recommendations = []
-            
-            for song in ai_suggestions[:5]:
+            for song in ai_suggestions[:count]:
                 if 'name' in song and 'artist' in song:
                     # Search Spotify for this song
                     search_query = f"{song['name']} {song['artist']}"
@@ -945,49 +1126,16 @@ def get_song_suggestions():
                             'uri': track['uri'],
                             'id': track['id']
                         })
-            
-            if recommendations:
-                # Store the recommendations
-                conversation_context['last_suggested_songs'] = recommendations
-                
-                # Format the response
-                suggestion_text = f"Based on your mood, here are some songs that might help:\n"
-                for i, track in enumerate(recommendations[:3], 1):
-                    suggestion_text += f"{i}. \"{track['name']}\" by {track['artist']}\n"
-                
-                suggestion_text += "\nWould you like me to play any of these?"
-                return suggestion_text
     except json.JSONDecodeError as json_err:
         print(f"Error decoding AI song suggestions: {json_err}")
     
-    # Fallback - use AI for a general mood-based recommendation
-    return ai_mood_based_fallback()
+    return recommendations
 
 def analyze_music_suggestion_request(user_query):
     """Check if the user is asking for song suggestions."""
-    prompt = f"""
-    Determine if the user is asking for music or song suggestions/recommendations.
-    If they are, extract the type of music they're interested in.
-    
-    Return JSON with:
-    - "is_asking_for_suggestions": true/false 
-    - "reference_song": song name they mentioned (or null)
-    - "reference_artist": artist they mentioned (or null)
-    - "genre": genre they're interested in (or null)
-    - "mood": mood they're interested in (or null)
-
-    Examples:
-    "suggest me some songs like Shape of You" -> {{"is_asking_for_suggestions": true, "reference_song": "Shape of You", "reference_artist": null, "genre": null, "mood": null}}
-    "play something like Ed Sheeran" -> {{"is_asking_for_suggestions": true, "reference_song": null, "reference_artist": "Ed Sheeran", "genre": null, "mood": null}}
-    "recommend some upbeat songs" -> {{"is_asking_for_suggestions": true, "reference_song": null, "reference_artist": null, "genre": null, "mood": "upbeat"}}
-    "anime songs?" -> {{"is_asking_for_suggestions": true, "reference_song": null, "reference_artist": null, "genre": "anime", "mood": null}}
-    "what's the weather like" -> {{"is_asking_for_suggestions": false, "reference_song": null, "reference_artist": null, "genre": null, "mood": null}}
-    
-    User query: "{user_query}"
-    Return only JSON format.
-    """
+    prompt = prompts.user_prompt("suggestion_request", query=user_query)
     
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "suggestion_request")
     json_response = extract_json_from_text(response)
     
     try:
@@ -999,8 +1147,6 @@ def analyze_music_suggestion_request(user_query):
 
 def play_suggested_song(index=0):
     """Play a suggested song by index."""
-    global conversation_context
-    
     suggested_songs = conversation_context.get('last_suggested_songs', [])
     
     if not suggested_songs:
@@ -1024,7 +1170,6 @@ def play_suggested_song(index=0):
 
 def process_play_request(user_query):
     """Process a 'play' request, checking for references to suggested songs."""
-    global conversation_context
     music_data = extract_music_intent(user_query)
     
     # Check for references to "it" or "that song" when we have suggestions
@@ -1060,37 +1205,9 @@ def process_play_request(user_query):
 
 def analyze_music_request(user_query):
     """Use AI to comprehensively analyze a music-related request."""
-    prompt = f"""
-    Analyze this music-related request: "{user_query}"
-    
-    Return a detailed JSON with the following information:
-    
-    1. Top-level intent (determine the primary goal):
-       - "play": User wants to play a specific song/artist directly
-       - "suggest": User wants recommendations or suggestions
-       - "control": User wants to control playback (pause, next, etc.)
-       - "query": User is asking about music information
-    
-    2. Details based on intent:
-       - For "play": Include song_name, artist, specific_request_type (exact_song, artist_songs, playlist)
-       - For "suggest": Include reference_song, reference_artist, genre, mood
-       - For "control": Include action (pause, next, previous, resume, volume)
-       - For "query": Include question_type (current_song, artist_info, lyrics)
-    
-    3. Option selection (if applicable):
-       - option_number: If user is selecting from a numbered list (e.g. "play the third one")
-       - is_selecting_option: true/false for if this is an option selection
-    
-    Example responses:
-    - For "play Katchi by Ofenbach": {{\"intent\":\"play\", \"song_name\":\"Katchi\", \"artist\":\"Ofenbach\", \"specific_request_type\":\"exact_song\", \"is_selecting_option\":false}}
-    - For "suggest songs like Katchi": {{\"intent\":\"suggest\", \"reference_song\":\"Katchi\", \"reference_artist\":null, \"genre\":null, \"mood\":null, \"is_selecting_option\":false}}
-    - For "play the third option": {{\"intent\":\"play\", \"is_selecting_option\":true, \"option_number\":3}}
-    - For "next song": {{\"intent\":\"control\", \"action\":\"next\"}}
-    
-    Analyze carefully to distinguish between requests to play specific songs vs requests for suggestions/recommendations.
-    """
+    prompt = prompts.user_prompt("music_request", query=user_query)
     
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "music_request")
     json_response = extract_json_from_text(response)
     
     try:
@@ -1103,43 +1220,23 @@ def analyze_music_request(user_query):
 
 def analyze_request_intent(user_query):
     """Use AI to analyze user requests and determine if they're music-related or general questions."""
-    prompt = f"""
-    Analyze this user request: "{user_query}"
-    
-    Determine if this is a music-related request or a general question.
-    
-    Return a detailed JSON with the following information:
-    
-    1. Top-level intent:
-       - "music": User wants to play music, get music recommendations, or control music playback
-       - "general": User is asking a general question not related to music
-    
-    2. If intent is "music", include these details:
-       - "sub_intent": One of "play", "suggest", "control", or "query"
-       - For "play": Include song_name, artist, specific_request_type (exact_song, artist_songs, playlist)
-       - For "suggest": Include reference_song, reference_artist, genre, mood
-       - For "control": Include action (pause, next, previous, resume, volume)
-       - For "query": Include question_type (current_song, artist_info, lyrics)
-       - If the user is selecting from options: is_selecting_option (true/false), option_number (if applicable)
-    
-    3. If intent is "general", include these details:
-       - "query_type": "factual", "conversational", "personal", "greeting", or "other"
-    
-    Example responses:
-    - For "play Katchi by Ofenbach": {{\"intent\":\"music\", \"sub_intent\":\"play\", \"song_name\":\"Katchi\", \"artist\":\"Ofenbach\", \"specific_request_type\":\"exact_song\", \"is_selecting_option\":false}}
-    - For "what's the weather today": {{\"intent\":\"general\", \"query_type\":\"factual\"}}
-    - For "how are you doing": {{\"intent\":\"general\", \"query_type\":\"greeting\"}}
-    - For "play the third option": {{\"intent\":\"music\", \"sub_intent\":\"play\", \"is_selecting_option\":true, \"option_number\":3}}
-    
-    Analyze carefully to determine if this is a music request or a general query.
-    """
+    # Try the on-device classifier first; it returns None when Gemini should decide
+    local_analysis = intent_classifier.classify(user_query)
+    if local_analysis is not None:
+        print(f"Local Request Analysis: {local_analysis}")  # Debugging
+        return local_analysis
+
+    prompt = prompts.user_prompt("request_intent", query=user_query)
     
-    response = get_gemini_response(prompt)
+    with resilience.deadline(INTENT_DEADLINE_SECONDS):
+        response = get_gemini_response(prompt, "request_intent")
     json_response = extract_json_from_text(response)
     
     try:
         request_data = json.loads(json_response)
         print(f"AI Request Analysis: {request_data}")  # Debugging
+        # Keep Gemini's answer as training data for the local classifier
+        intent_classifier.log_example(user_query, request_data)
         return request_data
     except json.JSONDecodeError as e:
         print(f"Error decoding AI analysis: {e}")
@@ -1148,8 +1245,43 @@ def analyze_request_intent(user_query):
 @app.route('/ask', methods=['POST'])
 def ask():
     """API endpoint to process user queries with AI-driven intent recognition."""
-    global conversation_context, sp
-    
+    # Every Gemini and Spotify call below shares one overall latency budget
+    with resilience.deadline(ASK_DEADLINE_SECONDS):
+        try:
+            return handle_ask()
+        except (resilience.DeadlineExceeded, resilience.CircuitOpen, TimeoutError,
+                spotify_governor.RateLimitExceeded) as e:
+            # An upstream was too slow or too busy; answer anyway rather than fail the request
+            print(f"Answering /ask with the degraded reply: {e}")
+            data = request.get_json(silent=True) or {}
+            history_cursor = data.get('history_cursor')
+            return ask_reply(data.get('query', ''), DEGRADED_ASK_REPLY,
+                             history_cursor if is_history_cursor(history_cursor) else None)
+
+def is_history_cursor(value):
+    """History cursors are integers; bool is an int subclass, but true/false isn't a cursor."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def ask_reply(user_query, response_text, history_cursor):
+    """Record the exchange in the message history and build the /ask response."""
+    entry = record_message(user_query, response_text)
+
+    if history_cursor is None:
+        # Older clients get the full history on every turn
+        return jsonify({'response': response_text, 'history': list(message_history)})
+
+    # Only send the entries the client hasn't seen yet
+    entries, truncated, reset = history_since(history_cursor)
+    return jsonify({
+        'response': response_text,
+        'history': entries,
+        'history_cursor': entry['id'],
+        'history_truncated': truncated,
+        'history_reset': reset
+    })
+
+def handle_ask():
+    """Process an /ask request; runs under the request deadline set by ask()."""
     # Check if Spotify is initialized
     spotify_available = ensure_spotify_initialized()
     if not spotify_available:
@@ -1159,6 +1291,10 @@ def ask():
     if 'query' not in data:
         return jsonify({'error': 'Query is required'}), 400
 
+    history_cursor = data.get('history_cursor')
+    if history_cursor is not None and not is_history_cursor(history_cursor):
+        return jsonify({'error': 'history_cursor must be an integer'}), 400
+
     user_query = data['query']
     print(f"Received query: {user_query}")
     
@@ -1167,36 +1303,41 @@ def ask():
     intent = request_analysis.get("intent", "general")
     
     # Handle different types of intents
-    if intent == "music" and spotify_available:
+    if intent == "music" and spotify_available and spotify_governor.breaker.is_open():
+        # Fail fast with a canned answer while Spotify is unhealthy
+        response_text = "Spotify isn't responding right now. Please try again in a moment."
+    
+    elif intent == "music" and spotify_available:
         sub_intent = request_analysis.get("sub_intent", "unknown")
         
         if sub_intent == "play":
+            genre = requested_genre(request_analysis)
             if request_analysis.get("is_selecting_option", False):
                 # User is selecting from previously suggested options
                 option_number = request_analysis.get("option_number", 1)
                 # Convert to zero-based index
                 option_index = option_number - 1
                 response_text = play_suggested_song(option_index)
+            
+            elif genre:
+                # "Play some jazz": a genre rather than a song
+                response_text = play_genre(genre)
                 
             elif request_analysis.get("song_name"):
                 # User wants to play a specific song
                 song_name = request_analysis.get("song_name")
                 artist = request_analysis.get("artist")
                 
-                # Search Spotify for the song
-                query = f"{song_name}"
-                if artist:
-                    query += f" {artist}"
-                    
                 try:
-                    results = sp.search(q=query, type='track', limit=3)
+                    # Rank a page of search results against the request
+                    ranked, confident = search_ranked_tracks(song_name, artist)
                     
-                    if results["tracks"]["items"]:
-                        tracks = results["tracks"]["items"]
+                    if ranked:
+                        tracks = track_ranking.distinct_options(ranked)
                         
-                        # If we found exactly one match or an exact match, play it directly
-                        if len(tracks) == 1 or (song_name.lower() in tracks[0]["name"].lower()):
-                            track = tracks[0]
+                        # If we found exactly one match or a clear best match, play it directly
+                        if len(tracks) == 1 or confident:
+                            track = ranked[0][1]
                             success = play_on_active_device(uris=[track["uri"]])
                             if success:
                                 response_text = f"Playing \"{track['name']}\" by {track['artists'][0]['name']}."
@@ -1204,7 +1345,7 @@ def ask():
                                 response_text = "I found the song but couldn't play it. Please make sure Spotify is open."
                         else:
                             # Store the tracks as options
-                            conversation_context['last_suggested_songs'] = [
+                            conversation_context.update(last_suggested_songs=[
                                 {
                                     'name': track['name'],
                                     'artist': track['artists'][0]['name'],
@@ -1212,7 +1353,7 @@ def ask():
                                     'id': track['id']
                                 }
                                 for track in tracks
-                            ]
+                            ])
                             
                             # Format options for display
                             options_text = "I found these songs matching your request:\n"
@@ -1227,29 +1368,42 @@ def ask():
                     print(f"Error searching Spotify: {e}")
                     response_text = "I'm having trouble with Spotify right now. Please make sure you're logged in."
             else:
-                # Generic play request without specific song
-                # Check if we should use the last suggested songs
-                if conversation_context.get('last_suggested_songs'):
-                    response_text = play_suggested_song(0)  # Play first suggested
-                else:
-                    response_text = "I'm not sure which song you'd like me to play. Could you specify a song or artist?"
+                response_text = None
+                if refers_to_current_song(user_query):
+                    # "Play something like this" - answered from the prefetched similar tracks
+                    response_text = suggest_similar_to_current_song(play_first=True)
+                
+                if response_text is None:
+                    # Generic play request without specific song
+                    # Check if we should use the last suggested songs
+                    if conversation_context.get('last_suggested_songs'):
+                        response_text = play_suggested_song(0)  # Play first suggested
+                    else:
+                        response_text = "I'm not sure which song you'd like me to play. Could you specify a song or artist?"
         
         # ...rest of the music handling logic...
         elif sub_intent == "suggest":
-            # Update conversation context with suggestion details
-            if request_analysis.get("reference_song"):
-                conversation_context['current_song_topic'] = request_analysis["reference_song"]
-            if request_analysis.get("reference_artist"):
-                conversation_context['artist'] = request_analysis["reference_artist"]
-            if request_analysis.get("genre"):
-                conversation_context['genre'] = request_analysis["genre"]
-            if request_analysis.get("mood"):
-                conversation_context['mood'] = request_analysis["mood"]
-                
-            conversation_context['last_recommendation_query'] = user_query
+            response_text = None
+            if (not request_analysis.get("reference_song") and not request_analysis.get("reference_artist")
+                    and refers_to_current_song(user_query)):
+                # Suggestions for the current song come from the prefetched similar tracks
+                response_text = suggest_similar_to_current_song()
             
-            # Get AI-driven song suggestions
-            response_text = get_song_suggestions()
+            if response_text is None:
+                # Update conversation context with suggestion details, as one atomic update
+                changes = {'last_recommendation_query': user_query}
+                if request_analysis.get("reference_song"):
+                    changes['current_song_topic'] = request_analysis["reference_song"]
+                if request_analysis.get("reference_artist"):
+                    changes['artist'] = request_analysis["reference_artist"]
+                if request_analysis.get("genre"):
+                    changes['genre'] = request_analysis["genre"]
+                if request_analysis.get("mood"):
+                    changes['mood'] = request_analysis["mood"]
+                conversation_context.update(**changes)
+                
+                # Get AI-driven song suggestions
+                response_text = get_song_suggestions()
         
         elif sub_intent == "control":
             # Process playback control commands
@@ -1273,6 +1427,7 @@ def ask():
                     response_text = "I'm sorry, volume control is not yet implemented."
                 else:
                     response_text = "I'm not sure how to control the playback with that command."
+                now_playing.invalidate()
             except Exception as e:
                 print(f"Error controlling playback: {e}")
                 response_text = "I couldn't control the playback. Please make sure Spotify is open and playing."
@@ -1282,7 +1437,7 @@ def ask():
             query_type = request_analysis.get("question_type", "")
             
             if query_type == "current_song":
-                current_track = sp.current_playback()
+                current_track = now_playing.get_playback()
                 if current_track and current_track.get("item"):
                     song_name = current_track["item"]["name"]
                     artist = current_track["item"]["artists"][0]["name"]
@@ -1301,16 +1456,27 @@ def ask():
         response_text = ask_google_assistant(user_query)
     
     # Add the query and response to the message history
-    message_history.append({'query': user_query, 'response': response_text})
+    return ask_reply(user_query, response_text, history_cursor)
 
-    # Return the response
-    return jsonify({'response': response_text, 'history': list(message_history)})
+@app.route('/history', methods=['GET'])
+def get_history():
+    """Page through the message history, oldest first: ?after=<id>&limit=<n>."""
+    after = request.args.get('after', default=0, type=int)
+    limit = max(1, min(request.args.get('limit', default=10, type=int), HISTORY_PAGE_LIMIT))
+
+    entries, truncated, reset = history_since(after)
+    page = entries[:limit]
+    return jsonify({
+        'history': page,
+        'next_cursor': page[-1]['id'] if page else after,
+        'has_more': len(entries) > limit,
+        'history_truncated': truncated,
+        'history_reset': reset
+    })
 
 @app.route('/set-active-device', methods=['POST'])
 def set_active_device():
     """Set the active Spotify device ID and immediately attempt to transfer playback."""
-    global sp, active_device_id
-    
     if not sp:
         return jsonify({'error': 'Not authenticated with Spotify'}), 401
     
@@ -1319,8 +1485,8 @@ def set_active_device():
         return jsonify({'error': 'device_id is required'}), 400
     
     device_id = data['device_id']
-    active_device_id = device_id
-    print(f"Set active Spotify device ID to: {active_device_id}")
+    active_device.set(device_id)
+    print(f"Set active Spotify device ID to: {device_id}")
     
     # Validate device exists first
     try:
@@ -1342,20 +1508,26 @@ def set_active_device():
     retry_delay = 2  # seconds
     success = False
     error_message = None
+    transferred_at = time.monotonic()
     
     for attempt in range(max_retries):
         try:
-            sp.transfer_playback(device_id=active_device_id, force_play=False)
-            print(f"Successfully transferred playback to device: {active_device_id}")
+            transferred_at = time.monotonic()
+            sp.transfer_playback(device_id=device_id, force_play=False)
+            print(f"Successfully transferred playback to device: {device_id}")
             success = True
             break
         except Exception as e:
             error_message = str(e)
             print(f"Attempt {attempt+1}/{max_retries}: Could not transfer playback: {e}")
             if attempt < max_retries - 1:
-                print(f"Waiting {retry_delay} seconds before retrying...")
-                import time
-                time.sleep(retry_delay)
+                # A device that is still starting up often turns active on its own before the retry
+                print(f"Waiting up to {retry_delay} seconds for the device before retrying...")
+                if device_readiness.wait_until_active(device_id, sp.devices, timeout=retry_delay,
+                                                      started=transferred_at) is not None:
+                    success = True
+                    error_message = None
+                    break
                 retry_delay *= 2  # Exponential backoff
     
     # Try a direct API call if spotipy transfer failed
@@ -1368,6 +1540,8 @@ def set_active_device():
                 token = sp.auth
             
             # Make direct API call
+            import requests
+            transferred_at = time.monotonic()
             response = requests.put(
                 'https://api.spotify.com/v1/me/player',
                 headers={
@@ -1375,7 +1549,7 @@ def set_active_device():
                     'Content-Type': 'application/json'
                 },
                 json={
-                    'device_ids': [active_device_id],
+                    'device_ids': [device_id],
                     'play': False
                 }
             )
@@ -1398,32 +1572,23 @@ def set_active_device():
     # Start monitor thread in the background
     import threading
     def monitor_device():
-        import time
-        count = 0
-        while count < 10:  # Check for 10 times (50 seconds)
-            time.sleep(5)  # Check every 5 seconds
-            try:
-                devices = sp.devices()
-                print(f"Device check {count+1}/10: Found {len(devices.get('devices', []))} devices")
-                for device in devices.get('devices', []):
-                    if device['id'] == active_device_id:
-                        print(f"Confirmed device is available: {device['name']} (ID: {device['id']})")
-                        # Try to make it active if it's not
-                        if not device.get('is_active'):
-                            try:
-                                sp.transfer_playback(device_id=active_device_id, force_play=False)
-                                print("Set as active device")
-                            except Exception as e:
-                                print(f"Could not set as active: {e}")
-                        return  # Device found and confirmed, exit thread
-                
-                # If we're here, device wasn't found in the list
-                print(f"Device {active_device_id} not found in available devices")
-                
-            except Exception as e:
-                print(f"Error checking devices: {e}")
-            
-            count += 1
+        # Confirm the device comes up, transferring again once if it is still idle
+        started = transferred_at
+        for attempt in range(2):
+            activation = device_readiness.wait_until_active(
+                device_id, sp.devices, timeout=MONITOR_DEVICE_SECONDS / 2, started=started,
+                keep_waiting=lambda: active_device.get() == device_id
+            )
+            if activation is not None or active_device.get() != device_id:
+                return  # Active, or a newer device was chosen and its own monitor takes over
+            print(f"Device {device_id} is not active yet")
+            if attempt == 0:
+                try:
+                    started = time.monotonic()
+                    sp.transfer_playback(device_id=device_id, force_play=False)
+                    print("Set as active device")
+                except Exception as e:
+                    print(f"Could not set as active: {e}")
     
     # Start the monitoring thread
     monitor_thread = threading.Thread(target=monitor_device)
@@ -1432,7 +1597,7 @@ def set_active_device():
     
     return jsonify({
         'success': success, 
-        'device_id': active_device_id,
+        'device_id': device_id,
         'error': error_message if not success else None
     })
     
@@ -1441,15 +1606,8 @@ def get_data():
     """API endpoint to provide general data for the mirror display."""
     current_time = datetime.datetime.now()
     
-    # Get current weather (mock data for now)
-    weather_conditions = ["Sunny", "Cloudy", "Rainy", "Partly Cloudy", "Clear"]
-    temperatures = list(range(15, 30))  # Temperature range in Celsius
-    
-    weather = {
-        "condition": random.choice(weather_conditions),
-        "temperature": random.choice(temperatures),
-        "humidity": random.randint(30, 90)
-    }
+    # Served from the weather cache; refreshed in the background
+    weather_data = weather.get_weather()
     
     # Format time
     formatted_time = current_time.strftime("%H:%M:%S")
@@ -1458,45 +1616,96 @@ def get_data():
     return jsonify({
         "time": formatted_time,
         "date": current_time.strftime("%Y-%m-%d"),
-        "weather": f"{weather['condition']} {weather['temperature']}°C",
-        "humidity": f"{weather['humidity']}%",
+        "weather": f"{weather_data['condition']} {weather_data['temperature']}°C" if weather_data else "Unavailable",
+        "humidity": f"{weather_data['humidity']}%" if weather_data else "--",
+        "weather_stale": weather_data["stale"] if weather_data else True,
         "updated_at": current_time.isoformat()
     })
 
+# The dashboard reads weather and the current song from memory
+dashboard.register_source("weather", weather.get_weather, version=weather.version)
+dashboard.register_source("now_playing", lambda: now_playing.get_current()[1],
+                          version=lambda: now_playing.get_current()[0])
+
+@app.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    """Everything the mirror shows in one snapshot, revalidated with ETags.
+
+    Clients send If-None-Match to get an empty 304 when nothing changed, or
+    ?since=<version>&wait=<seconds> to hold the request until a newer version exists.
+    """
+    since = request.args.get('since', type=int)
+    wait = request.args.get('wait', default=0.0, type=float)
+
+    snapshot = dashboard.get_snapshot()
+    dashboard.stats['requests'] += 1
+    if since is not None and since > snapshot['version']:
+        # A version this server never issued (e.g. from before a clock change); send everything
+        since = None
+    if since is not None and wait > 0 and snapshot['version'] <= since:
+        dashboard.stats['long_polls'] += 1
+        snapshot = dashboard.wait_for_change(since, wait)
+
+    unchanged = since is not None and snapshot['version'] <= since
+    if unchanged or request.if_none_match.contains(snapshot['etag']):
+        dashboard.stats['not_modified'] += 1
+        response = app.response_class(status=304)
+    else:
+        dashboard.stats['bytes_sent'] += len(snapshot['body'])
+        response = app.response_class(snapshot['body'], mimetype='application/json')
+
+    response.set_etag(snapshot['etag'])
+    # Let browsers keep the body but always revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Dashboard-Version'] = str(snapshot['version'])
+    return response
+
+@app.route('/now-playing/stream', methods=['GET'])
+def now_playing_stream():
+    """Server-sent events with the current song, sent again every time the track or play state changes."""
+    ensure_spotify_initialized()
+
+    if not now_playing.open_stream():
+        # Every stream slot is taken; answer once and let the client retry or poll
+        version, summary = now_playing.get_current()
+        response = jsonify({'error': 'Too many now-playing streams', 'version': version, 'now_playing': summary})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_KEEPALIVE_SECONDS)
+        return response
+
+    def events():
+        version, summary = now_playing.get_current()
+        ends = time.monotonic() + SSE_MAX_SECONDS
+        # EventSource waits this long (ms) before reconnecting after the stream ends
+        yield f"retry: 1000\nid: {version}\nevent: track\ndata: {json.dumps(summary)}\n\n"
+        while time.monotonic() < ends:
+            wait = min(SSE_KEEPALIVE_SECONDS, max(0.0, ends - time.monotonic()))
+            new_version, summary = now_playing.wait_for_change(version, wait)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"id: {version}\nevent: track\ndata: {json.dumps(summary)}\n\n"
+
+    response = app.response_class(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs however the stream ends, even if the client leaves before the first event
+    response.call_on_close(now_playing.close_stream)
+    return response
+
 def ai_mood_based_fallback():
     """Use AI to generate song recommendations based on current conversation context when other methods fail."""
-    global conversation_context
-    
     # Use the last query directly for better context
     query = conversation_context.get('last_recommendation_query', '')
     
     # Create a detailed AI prompt to get mood-appropriate songs
-    prompt = f"""
-    As a music expert, I need song recommendations for this request:
-    "{query}"
-    
-    Please analyze the request and recommend 5 songs that would be perfect for this situation.
-    Consider the mood, activity, situation, and any implied emotions in the request.
-    
-    Pay special attention to:
-    1. If they mentioned a date, romantic outing, or love - suggest popular romantic songs
-    2. If they want a confidence boost - suggest empowering, upbeat songs
-    3. If they want to relax or calm down - suggest soothing, peaceful songs
-    4. If they're feeling sad - suggest uplifting or comforting songs
-    5. If they mentioned a specific activity - suggest songs that pair well with that activity
-    
-    Return your suggestions ONLY as a JSON array with this format:
-    [
-        {{"name": "Song Name 1", "artist": "Artist Name 1"}},
-        {{"name": "Song Name 2", "artist": "Artist Name 2"}},
-        {{"name": "Song Name 3", "artist": "Artist Name 3"}},
-        {{"name": "Song Name 4", "artist": "Artist Name 4"}},
-        {{"name": "Song Name 5", "artist": "Artist Name 5"}}
-    ]
-    """
+    prompt = prompts.user_prompt("mood_fallback", query=query)
     
     # Get AI recommendations
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "mood_fallback")
     json_response = extract_json_from_text(response)
     
     try:
@@ -1523,7 +1732,7 @@ def ai_mood_based_fallback():
             
             if recommendations:
                 # Store the recommendations
-                conversation_context['last_suggested_songs'] = recommendations
+                conversation_context.update(last_suggested_songs=recommendations)
                 
                 # Format the response
                 suggestion_text = f"For your mood, here are some songs you might enjoy:\n"
@@ -1541,7 +1750,7 @@ def ai_mood_based_fallback():
         results = sp.search(q="top hits", type='track', limit=3)
         if results['tracks']['items']:
             tracks = results['tracks']['items']
-            conversation_context['last_suggested_songs'] = [
+            conversation_context.update(last_suggested_songs=[
                 {
                     'name': track['name'],
                     'artist': track['artists'][0]['name'],
@@ -1549,7 +1758,7 @@ def ai_mood_based_fallback():
                     'id': track['id']
                 }
                 for track in tracks
-            ]
+            ])
             
             suggestion_text = "I found some songs that might lift your mood:\n"
             for i, track in enumerate(tracks, 1):
@@ -1564,21 +1773,38 @@ def ai_mood_based_fallback():
 
 def get_ai_response_for_music_query(user_query):
     """Generate AI responses for music-related information queries."""
-    prompt = f"""
-    As a music expert, please answer this music-related question:
-    "{user_query}"
-    
-    Keep your answer concise, helpful, and focused on the music topic.
-    If the question is about song lyrics, artist information, music history, 
-    or other music topics, provide accurate information.
-    
-    If you're not sure about the exact answer, it's better to say so
-    rather than providing potentially incorrect information.
-    """
+    prompt = prompts.user_prompt("music_question", query=user_query)
     
-    response = get_gemini_response(prompt)
+    response = get_gemini_response(prompt, "music_question")
     return response
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose internal counters (rate limiting, caches, local classifier) for monitoring."""
+    return jsonify({
+        'spotify': spotify_governor.governor.get_stats(),
+        'circuit_breakers': {
+            'gemini': gemini_client.breaker.get_stats(),
+            'spotify': spotify_governor.breaker.get_stats()
+        },
+        'gemini_prompts': gemini_client.get_stats(),
+        'recommendation_engine': recommendation_engine.get_stats(),
+        'genre_taxonomy': genre_taxonomy.get_stats(),
+        'device_readiness': device_readiness.get_stats(),
+        'single_flight': {
+            'gemini': gemini_flights.get_stats(),
+            'spotify': spotify_governor.flights.get_stats()
+        },
+        'intent_classifier': dict(intent_classifier.stats),
+        'recommendation_pool': recommendation_pool.get_stats(),
+        'similar_prefetch': similar_prefetch.get_stats(),
+        'weather': weather.get_stats(),
+        'now_playing': now_playing.get_stats(),
+        'library_index': library_index.get_stats(),
+        'dashboard': dashboard.get_stats(),
+        'state': state.get_stats()
+    })
+
 @app.route("/")
 def home():
     # A simple html for Magic mirror
@@ -1595,6 +1821,7 @@ def home():
     """
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Shared state is in state.py, so requests can be served in parallel
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
 
 # handler = app
\ No newline at end of file
@@ -0,0 +1,342 @@
+"""
+On-device intent classifier.
+A small linear model over hashed word and character n-grams that decides
+between general questions and the music sub-intents (play, suggest, control,
+query) without a Gemini round trip. Gemini is only consulted when the model's
+confidence is below INTENT_CONFIDENCE_THRESHOLD or when the slots for the
+predicted intent cannot be filled locally.
+
+Train it offline with tools/train_intent_classifier.py from the query/intent
+pairs that analyze_request_intent logs to INTENT_LOG_PATH.
+"""
+import json
+import math
+import os
+import re
+import threading
+import zlib
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Where the trained model is read from
+MODEL_PATH = os.environ.get("INTENT_MODEL_PATH", os.path.join(DATA_DIR, "intent_model.json"))
+
+# Gemini results are appended here as training data (set to an empty string to disable)
+LOG_PATH = os.environ.get(
+    "INTENT_LOG_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "intent_log.jsonl")
+)
+
+# Once the log passes this many examples, only the newest half is kept
+LOG_MAX_LINES = int(os.environ.get("INTENT_LOG_MAX_LINES", "5000"))
+
+# Below this softmax probability the query is sent to Gemini instead
+CONFIDENCE_THRESHOLD = float(os.environ.get("INTENT_CONFIDENCE_THRESHOLD", "0.85"))
+
+LABELS = ["general", "music:play", "music:suggest", "music:control", "music:query"]
+
+# Number of hash buckets for the n-gram features
+DEFAULT_DIMENSIONS = 1 << 14
+
+# Lazily loaded model and counters for how often Gemini was avoided
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+stats = {"local": 0, "fallback": 0}
+
+# Lines in the training log, counted on the first write
+_log_lines = None
+_log_lock = threading.Lock()
+
+def normalize(text):
+    """Lowercase a query and strip everything except letters, digits and apostrophes."""
+    text = text.lower().replace("’", "'")
+    return re.sub(r"[^a-z0-9' ]+", " ", text).strip()
+
+def extract_features(text, dimensions=DEFAULT_DIMENSIONS):
+    """Hash word unigrams, bigrams and character trigrams into a sparse vector."""
+    words = normalize(text).split()
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    if words:
+        grams.append(f"f:{words[0]}")
+    padded = f" {' '.join(words)} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    features = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode("utf-8")) % dimensions
+        features[bucket] = features.get(bucket, 0.0) + 1.0
+
+    # L2 normalize so long queries don't get overconfident
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {bucket: value / norm for bucket, value in features.items()}
+
+def _softmax(scores):
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+class IntentModel:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, labels=None, dimensions=DEFAULT_DIMENSIONS, weights=None, bias=None):
+        self.labels = list(labels or LABELS)
+        self.dimensions = dimensions
+        # bucket -> list of per-label weights, only non-zero buckets are stored
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(self.labels)
+
+    def probabilities(self, text):
+        """Return the probability of each label for a query."""
+        scores = list(self.bias)
+        for bucket, value in extract_features(text, self.dimensions).items():
+            row = self.weights.get(bucket)
+            if row is not None:
+                for i, weight in enumerate(row):
+                    scores[i] += weight * value
+        return _softmax(scores)
+
+    def predict(self, text):
+        """Return (label, confidence) for a query."""
+        probabilities = self.probabilities(text)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.labels[best], probabilities[best]
+
+    def fit(self, examples, epochs=30, learning_rate=0.5, l2=1e-5, seed=13):
+        """Train with plain SGD on (query, label) pairs."""
+        import random
+        rng = random.Random(seed)
+        index = {label: i for i, label in enumerate(self.labels)}
+        data = [(extract_features(query, self.dimensions), index[label])
+                for query, label in examples if label in index]
+
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, target in data:
+                scores = list(self.bias)
+                for bucket, value in features.items():
+                    row = self.weights.get(bucket)
+                    if row is not None:
+                        for i, weight in enumerate(row):
+                            scores[i] += weight * value
+                probabilities = _softmax(scores)
+
+                for i, probability in enumerate(probabilities):
+                    gradient = probability - (1.0 if i == target else 0.0)
+                    self.bias[i] -= rate * gradient
+                    for bucket, value in features.items():
+                        row = self.weights.setdefault(bucket, [0.0] * len(self.labels))
+                        row[i] -= rate * (gradient * value + l2 * row[i])
+        return self
+
+    def to_dict(self):
+        return {
+            "labels": self.labels,
+            "dimensions": self.dimensions,
+            "bias": [round(value, 5) for value in self.bias],
+            "weights": {
+                str(bucket): [round(value, 5) for value in row]
+                for bucket, row in self.weights.items()
+                if any(abs(value) > 1e-4 for value in row)
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        weights = {int(bucket): row for bucket, row in data["weights"].items()}
+        return cls(data["labels"], data["dimensions"], weights, data["bias"])
+
+    def save(self, path):
+        """Write the model as JSON, replacing any previous file atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as model_file:
+            json.dump(self.to_dict(), model_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as model_file:
+            return cls.from_dict(json.load(model_file))
+
+def get_model():
+    """Load the trained model on first use. Returns None if no model is available."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                try:
+                    _model = IntentModel.load(MODEL_PATH)
+                    print(f"Loaded intent classifier from {MODEL_PATH}")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Intent classifier not available, using Gemini only: {e}")
+                    _model = None
+                _model_loaded = True
+    return _model
+
+# Vocabulary used to fill slots locally for the predicted intent
+CONTROL_ACTIONS = [
+    ("pause", ["pause", "stop", "hold on", "be quiet"]),
+    ("next", ["next", "skip"]),
+    ("previous", ["previous", "go back", "last song", "back"]),
+    ("resume", ["resume", "continue", "unpause", "keep playing"]),
+    ("volume", ["volume", "louder", "quieter", "turn it up", "turn it down"]),
+]
+CURRENT_SONG_PHRASES = [
+    "what's playing", "whats playing", "what is playing", "what song is this",
+    "what's this song", "whats this song", "what is this song", "current song",
+    "who sings this", "who is singing", "name of this song", "what am i listening to"
+]
+MOODS = [
+    "upbeat", "relaxing", "relaxed", "calm", "chill", "happy", "sad", "romantic",
+    "energetic", "peaceful", "motivational", "motivating", "uplifting", "sleepy",
+    "party", "workout", "focus", "study", "cheerful", "melancholic", "angry", "dreamy"
+]
+GENRES = [
+    "pop", "rock", "jazz", "blues", "classical", "hip hop", "hip-hop", "rap", "country",
+    "edm", "electronic", "house", "techno", "metal", "indie", "folk", "reggae", "r&b",
+    "soul", "funk", "disco", "k-pop", "kpop", "anime", "lofi", "lo-fi", "bollywood",
+    "latin", "punk", "gospel", "ambient", "dance", "acoustic"
+]
+ORDINALS = {
+    "first": 1, "1": 1, "one": 1, "second": 2, "2": 2, "two": 2,
+    "third": 3, "3": 3, "three": 3, "fourth": 4, "4": 4, "fifth": 5, "5": 5
+}
+ORDINAL_WORDS = {"first", "second", "third", "fourth", "fifth"}
+# Words after "play" that don't name a song
+GENERIC_PLAY_WORDS = {"music", "something", "some", "a", "song", "songs", "anything", "it", "that", "this"}
+
+def _contains(text, phrase):
+    return re.search(rf"(?<![a-z]){re.escape(phrase)}(?![a-z])", text) is not None
+
+def _play_slots(query):
+    text = query.lower().strip(" ?!.")
+    option = re.search(
+        r"\b(?:play|choose|pick|select)\s+(?:the\s+)?(?:option\s+|number\s+|#)?(\w+)(?:\s+(?:one|option|song))?$",
+        text
+    )
+    if option and option.group(1) in ORDINALS:
+        # "play one" could be a song title, so require an ordinal or an explicit option marker
+        word = option.group(1)
+        if word in ORDINAL_WORDS or re.search(r"\b(?:option|number)\b|#", text):
+            return {"is_selecting_option": True, "option_number": ORDINALS[word]}
+
+    match = re.search(r"\bplay\s+(?:the\s+song\s+|song\s+)?(.+?)(?:\s+by\s+(.+))?$", text)
+    if not match:
+        return None
+    song_name, artist = match.group(1).strip(), match.group(2)
+    if not song_name or set(song_name.split()) <= GENERIC_PLAY_WORDS:
+        return None
+    slots = {"song_name": song_name, "artist": artist.strip() if artist else None,
+             "specific_request_type": "exact_song", "is_selecting_option": False}
+    return slots
+
+def _suggest_slots(query):
+    text = normalize(query)
+    # "songs like X" needs Gemini to tell a song from an artist
+    if re.search(r"\b(like|similar to|such as)\b", text):
+        return None
+    mood = next((word for word in MOODS if _contains(text, word)), None)
+    genre = next((word for word in GENRES if _contains(query.lower(), word)), None)
+    if not mood and not genre:
+        return None
+    return {"reference_song": None, "reference_artist": None, "genre": genre, "mood": mood,
+            "is_selecting_option": False}
+
+def fill_slots(label, query):
+    """Build an analyze_request_intent style result for a label, or None if the slots need Gemini."""
+    if label == "general":
+        return {"intent": "general", "query_type": "other"}
+
+    sub_intent = label.split(":", 1)[1]
+    text = normalize(query)
+    if sub_intent == "control":
+        action = next((action for action, words in CONTROL_ACTIONS
+                       if any(_contains(text, word) for word in words)), None)
+        slots = {"action": action} if action else None
+    elif sub_intent == "query":
+        lowered = query.lower().replace("’", "'")
+        is_current = any(phrase in lowered for phrase in CURRENT_SONG_PHRASES)
+        slots = {"question_type": "current_song" if is_current else "artist_info"}
+    elif sub_intent == "play":
+        slots = _play_slots(query)
+    else:
+        slots = _suggest_slots(query)
+
+    if slots is None:
+        return None
+    return {"intent": "music", "sub_intent": sub_intent, **slots}
+
+def classify(query, threshold=None):
+    """Return a local intent analysis for a query, or None when Gemini should decide."""
+    model = get_model()
+    if model is None:
+        return None
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+
+    label, confidence = model.predict(query)
+    analysis = fill_slots(label, query) if confidence >= threshold else None
+    if analysis is None:
+        stats["fallback"] += 1
+        return None
+    stats["local"] += 1
+    analysis["confidence"] = round(confidence, 3)
+    analysis["source"] = "local"
+    return analysis
+
+def label_for_analysis(analysis):
+    """Map a Gemini analyze_request_intent result to a classifier label."""
+    if analysis.get("intent") == "general":
+        return "general"
+    label = f"music:{analysis.get('sub_intent')}"
+    return label if label in LABELS else None
+
+def _trim_log_locked():
+    """Keep the newest half of LOG_MAX_LINES examples in the training log."""
+    global _log_lines
+    with open(LOG_PATH) as log_file:
+        lines = log_file.readlines()[-(LOG_MAX_LINES // 2):]
+    temp_path = f"{LOG_PATH}.tmp"
+    with open(temp_path, "w") as log_file:
+        log_file.writelines(lines)
+    os.replace(temp_path, LOG_PATH)
+    _log_lines = len(lines)
+
+def log_example(query, analysis):
+    """Append a Gemini-labelled query to the training log, trimming it past LOG_MAX_LINES."""
+    global _log_lines
+    label = label_for_analysis(analysis)
+    if not LOG_PATH or label is None:
+        return
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+            if _log_lines is None:
+                try:
+                    with open(LOG_PATH) as log_file:
+                        _log_lines = sum(1 for _ in log_file)
+                except FileNotFoundError:
+                    _log_lines = 0
+            with open(LOG_PATH, "a") as log_file:
+                log_file.write(json.dumps({"query": query, "label": label}) + "\n")
+            _log_lines += 1
+            if LOG_MAX_LINES > 0 and _log_lines > LOG_MAX_LINES:
+                _trim_log_locked()
+    except OSError as e:
+        print(f"Could not log intent example: {e}")
+
+def load_examples(path):
+    """Read (query, label) pairs from a JSON lines file."""
+    examples = []
+    with open(path) as data_file:
+        for line in data_file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("label") in LABELS and record.get("query"):
+                examples.append((record["query"], record["label"]))
+    return examples
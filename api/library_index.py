@@ -0,0 +1,263 @@
+"""
+Local full-text index of the user's Spotify library.
+A background sync copies saved tracks, playlist tracks and top tracks into
+SQLite with an FTS5 index, so "play <song>" is usually resolved locally
+instead of with a Spotify search. Syncs are incremental: saved tracks are
+paged only until an already indexed one, and playlists whose snapshot id
+hasn't changed are skipped.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from . import track_ranking
+except ImportError:  # Running as a script or as a Vercel function
+    import track_ranking
+
+DB_PATH = os.environ.get(
+    "LIBRARY_INDEX_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "library.db")
+)
+SYNC_INTERVAL = float(os.environ.get("LIBRARY_SYNC_SECONDS", "1800"))
+
+# Fields requested for playlist items, to keep the pages small
+PLAYLIST_ITEM_FIELDS = "items(track(id,uri,name,popularity,artists(name),type,is_local)),next,total"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id TEXT PRIMARY KEY, uri TEXT NOT NULL, name TEXT NOT NULL,
+    artists TEXT NOT NULL, popularity INTEGER
+);
+CREATE TABLE IF NOT EXISTS track_sources (
+    source TEXT NOT NULL, track_id TEXT NOT NULL, PRIMARY KEY (source, track_id)
+);
+CREATE INDEX IF NOT EXISTS track_sources_by_track ON track_sources (track_id);
+CREATE TABLE IF NOT EXISTS playlists (id TEXT PRIMARY KEY, snapshot_id TEXT, name TEXT);
+CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(track_id UNINDEXED, title, artist);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+# Set when the database can't be used (read-only filesystem, no FTS5); lookups then always miss
+_disabled = None
+_thread = None
+stats = {"lookups": 0, "hits": 0, "misses": 0, "syncs": 0, "sync_errors": 0,
+         "playlists_synced": 0, "playlists_unchanged": 0, "last_sync_seconds": None}
+
+def _connection():
+    """Per-thread connection; the schema is created on first use."""
+    global _schema_ready
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        connection = sqlite3.connect(DB_PATH, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        with _schema_lock:
+            if not _schema_ready:
+                connection.executescript(SCHEMA)
+                _schema_ready = True
+        _local.connection = connection
+    return connection
+
+def _get_state(connection, key):
+    row = connection.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _set_state(connection, key, value):
+    connection.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+def _add_tracks(connection, source, tracks):
+    for track in tracks:
+        if not track or not track.get("id") or track.get("is_local") or track.get("type", "track") != "track":
+            continue
+        artists = [artist["name"] for artist in track.get("artists") or []]
+        inserted = connection.execute(
+            "INSERT OR IGNORE INTO tracks (id, uri, name, artists, popularity) VALUES (?, ?, ?, ?, ?)",
+            (track["id"], track["uri"], track["name"], json.dumps(artists), track.get("popularity"))
+        ).rowcount
+        if inserted:
+            connection.execute(
+                "INSERT INTO tracks_fts (track_id, title, artist) VALUES (?, ?, ?)",
+                (track["id"], track_ranking.normalize(track["name"]),
+                 " ".join(track_ranking.normalize(artist) for artist in artists))
+            )
+        connection.execute("INSERT OR IGNORE INTO track_sources (source, track_id) VALUES (?, ?)",
+                           (source, track["id"]))
+
+def _replace_source(connection, source, tracks):
+    connection.execute("DELETE FROM track_sources WHERE source = ?", (source,))
+    _add_tracks(connection, source, tracks)
+
+def _prune(connection):
+    """Drop tracks that are no longer in any saved list, playlist or top list."""
+    orphaned = "SELECT id FROM tracks WHERE id NOT IN (SELECT track_id FROM track_sources)"
+    connection.execute(f"DELETE FROM tracks_fts WHERE track_id IN ({orphaned})")
+    connection.execute(f"DELETE FROM tracks WHERE id IN ({orphaned})")
+
+def _pages(fetch, limit, **kwargs):
+    offset = 0
+    while True:
+        page = fetch(limit=limit, offset=offset, **kwargs)
+        yield page
+        if not page.get("next"):
+            return
+        offset += limit
+
+def _saved_key(item):
+    """What tells saved items apart, including local files that have no track id."""
+    track = item.get("track") or {}
+    return track.get("id") or track.get("uri")
+
+def _sync_saved(connection, client):
+    newest_known = _get_state(connection, "saved_newest_added_at")
+    known_total = _get_state(connection, "saved_total")
+    # Items saved in the same second as the newest known one can't be told apart by
+    # added_at, so their keys are kept too
+    newest_keys = set(json.loads(_get_state(connection, "saved_newest_keys") or "[]"))
+
+    new_items, total = [], 0
+    for page in _pages(client.current_user_saved_tracks, 50):
+        total = page.get("total", 0)
+        items = page.get("items") or []
+        # Saved tracks come newest first, so stop at the first one older than the newest indexed
+        fresh = [item for item in items if not newest_known or item["added_at"] >= newest_known]
+        new_items.extend(item for item in fresh
+                         if item["added_at"] != newest_known or _saved_key(item) not in newest_keys)
+        if len(fresh) < len(items):
+            break
+
+    # The count includes items the index skips (local files, episodes), so it only
+    # disagrees when something was unsaved, which paging from the top can't see
+    if newest_known and (known_total is None or int(known_total) + len(new_items) != total):
+        connection.execute("DELETE FROM track_sources WHERE source = 'saved'")
+        for key in ("saved_newest_added_at", "saved_total", "saved_newest_keys"):
+            _set_state(connection, key, None)
+        return _sync_saved(connection, client)
+
+    _add_tracks(connection, "saved", [item["track"] for item in new_items])
+    if new_items:
+        newest = new_items[0]["added_at"]
+        keys = {_saved_key(item) for item in new_items if item["added_at"] == newest}
+        if newest == newest_known:
+            keys |= newest_keys
+        _set_state(connection, "saved_newest_added_at", newest)
+        _set_state(connection, "saved_newest_keys", json.dumps(sorted(key for key in keys if key)))
+    _set_state(connection, "saved_total", str(total))
+
+def _sync_playlists(connection, client):
+    known = dict(connection.execute("SELECT id, snapshot_id FROM playlists").fetchall())
+    seen = set()
+    for page in _pages(client.current_user_playlists, 50):
+        for playlist in page.get("items") or []:
+            if not playlist:
+                continue
+            seen.add(playlist["id"])
+            if known.get(playlist["id"]) == playlist.get("snapshot_id"):
+                stats["playlists_unchanged"] += 1
+                continue
+            tracks = []
+            for items_page in _pages(client.playlist_items, 100, playlist_id=playlist["id"],
+                                     fields=PLAYLIST_ITEM_FIELDS, additional_types=("track",)):
+                tracks.extend(item.get("track") for item in items_page.get("items") or [])
+            _replace_source(connection, f"playlist:{playlist['id']}", tracks)
+            connection.execute("INSERT OR REPLACE INTO playlists (id, snapshot_id, name) VALUES (?, ?, ?)",
+                               (playlist["id"], playlist.get("snapshot_id"), playlist.get("name")))
+            connection.commit()
+            stats["playlists_synced"] += 1
+
+    for playlist_id in set(known) - seen:
+        connection.execute("DELETE FROM track_sources WHERE source = ?", (f"playlist:{playlist_id}",))
+        connection.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
+
+def _sync_top(connection, client):
+    top = client.current_user_top_tracks(limit=50, time_range="medium_term")
+    _replace_source(connection, "top", top.get("items") or [])
+
+def sync(client):
+    """Bring the index up to date with the user's library."""
+    started = time.monotonic()
+    connection = _connection()
+    user_id = client.current_user()["id"]
+    with connection:
+        if _get_state(connection, "user_id") != user_id:
+            # A different account logged in; its library replaces the old one
+            for table in ("tracks", "track_sources", "playlists", "sync_state", "tracks_fts"):
+                connection.execute(f"DELETE FROM {table}")
+            _set_state(connection, "user_id", user_id)
+        _sync_saved(connection, client)
+        _sync_top(connection, client)
+    _sync_playlists(connection, client)
+    with connection:
+        _prune(connection)
+    stats["syncs"] += 1
+    stats["last_sync_seconds"] = round(time.monotonic() - started, 2)
+    print(f"Library index synced in {stats['last_sync_seconds']}s ({count_tracks()} tracks)")
+
+def lookup(song_name, artist=None, limit=track_ranking.SEARCH_LIMIT):
+    """Rank indexed tracks matching the request. Returns (ranked, confident) like track_ranking.best_match."""
+    stats["lookups"] += 1
+    words = f"{track_ranking.normalize(song_name)} {track_ranking.normalize(artist)}".split()
+    if _thread is None or not words:
+        # Not syncing (no Spotify login yet, or the index is disabled)
+        stats["misses"] += 1
+        return [], False
+    # Every word has to appear in the title or the artists
+    query = " ".join(f'"{word}"' for word in words)
+    try:
+        rows = _connection().execute(
+            "SELECT t.id, t.uri, t.name, t.artists, t.popularity FROM tracks_fts f "
+            "JOIN tracks t ON t.id = f.track_id WHERE tracks_fts MATCH ? ORDER BY f.rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Library index lookup failed: {e}")
+        rows = []
+    tracks = [
+        {"id": track_id, "uri": uri, "name": name, "popularity": popularity,
+         "artists": [{"name": artist_name} for artist_name in json.loads(artists)]}
+        for track_id, uri, name, artists, popularity in rows
+    ]
+    ranked, confident = track_ranking.best_match(song_name, artist, tracks)
+    stats["hits" if confident else "misses"] += 1
+    return ranked, confident
+
+def count_tracks():
+    try:
+        return _connection().execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+def _sync_loop(sync_library):
+    while True:
+        try:
+            sync_library()
+        except Exception as e:
+            stats["sync_errors"] += 1
+            print(f"Error syncing library index: {e}")
+        time.sleep(SYNC_INTERVAL)
+
+def start(sync_library):
+    """Start syncing on a schedule. sync_library calls sync() with the current Spotify client."""
+    global _thread, _disabled
+    with _schema_lock:
+        if _thread is not None or _disabled:
+            return
+    try:
+        _connection()
+    except (OSError, sqlite3.Error) as e:
+        # e.g. a read-only filesystem or an SQLite build without FTS5
+        _disabled = str(e)
+        print(f"Library index disabled: {e}")
+        return
+    with _schema_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_sync_loop, args=(sync_library,), name="library-sync", daemon=True)
+            _thread.start()
+
+def get_stats():
+    return {**stats, "tracks": count_tracks() if not _disabled else 0, "disabled": _disabled}
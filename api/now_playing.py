@@ -0,0 +1,182 @@
+"""
+Shared now-playing state.
+One tracker polls Spotify's playback state adaptively (often while music is
+playing, rarely while paused or idle) and keeps the latest answer in memory.
+"What's playing" queries, the similar-track prefetch and the dashboard read
+from here instead of calling Spotify themselves, and track changes are pushed
+to listeners and to the /now-playing/stream SSE endpoint.
+"""
+import os
+import threading
+import time
+
+# Poll intervals by state
+POLL_PLAYING = float(os.environ.get("NOW_PLAYING_POLL_PLAYING_SECONDS", "5"))
+POLL_PAUSED = float(os.environ.get("NOW_PLAYING_POLL_PAUSED_SECONDS", "30"))
+POLL_IDLE = float(os.environ.get("NOW_PLAYING_POLL_IDLE_SECONDS", "60"))
+
+# After a playback command Spotify takes a moment to report the new state
+COMMAND_SETTLE_SECONDS = 1.0
+
+# How old a state get_playback() answers from memory; older means a live read. While
+# music plays the tracker polls well within this, and our own commands invalidate()
+# the state, so only a change made elsewhere while paused or idle needs a live read
+MAX_AGE_SECONDS = float(os.environ.get("NOW_PLAYING_MAX_AGE_SECONDS", str(POLL_PLAYING + 1)))
+
+# Each /now-playing/stream holds a server thread for as long as it is open
+MAX_STREAMS = int(os.environ.get("NOW_PLAYING_MAX_STREAMS", "2"))
+
+_cond = threading.Condition()
+# Latest raw playback from Spotify (None when nothing is active) and when it was read
+_playback = None
+_updated_at = 0.0
+_version = 0
+# Set by invalidate(): the state is out of date until the next poll
+_invalidated = False
+_listeners = []
+_streams = 0
+_wake = threading.Event()
+_get_playback = None
+# Used for live reads a user is waiting on, at foreground Spotify priority
+_get_playback_now = None
+_thread = None
+stats = {"polls": 0, "errors": 0, "changes": 0, "served_from_memory": 0, "live_reads": 0,
+         "streams_opened": 0, "streams_rejected": 0}
+
+def summarize(playback):
+    """Reduce a playback payload to the fields listeners and clients care about."""
+    if not playback or not playback.get("item"):
+        return None
+    item = playback["item"]
+    return {
+        "is_playing": bool(playback.get("is_playing")),
+        "id": item.get("id"),
+        "name": item.get("name"),
+        "artist": item["artists"][0]["name"] if item.get("artists") else None,
+        "duration_ms": item.get("duration_ms"),
+        "progress_ms": playback.get("progress_ms"),
+    }
+
+def _change_key(playback):
+    summary = summarize(playback)
+    return (summary["id"], summary["is_playing"]) if summary else None
+
+def add_listener(callback):
+    """Call `callback(playback)` whenever the track or play/pause state changes."""
+    _listeners.append(callback)
+
+def poll(get_playback=None):
+    """Read the playback state from Spotify now and publish it if it changed."""
+    global _playback, _updated_at, _version, _invalidated
+    get_playback = get_playback or _get_playback
+    playback = get_playback() if get_playback else None
+    stats["polls"] += 1
+    with _cond:
+        changed = _change_key(playback) != _change_key(_playback)
+        _playback = playback
+        _updated_at = time.monotonic()
+        _invalidated = False
+        if changed:
+            _version += 1
+            stats["changes"] += 1
+            _cond.notify_all()
+    if changed:
+        for listener in list(_listeners):
+            try:
+                listener(playback)
+            except Exception as e:
+                print(f"Error in now-playing listener: {e}")
+    return playback
+
+def poll_interval():
+    """How long to wait before the next poll, given the current state."""
+    with _cond:
+        playback = _playback
+    if playback and playback.get("is_playing"):
+        item = playback.get("item") or {}
+        # Wake up right when the song should end instead of a few seconds after
+        if item.get("duration_ms") and playback.get("progress_ms") is not None:
+            time_left = (item["duration_ms"] - playback["progress_ms"]) / 1000
+            return max(1.0, min(POLL_PLAYING, time_left + 0.5))
+        return POLL_PLAYING
+    if playback and playback.get("item"):
+        return POLL_PAUSED
+    return POLL_IDLE
+
+def _track():
+    while True:
+        try:
+            poll()
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error polling now playing: {e}")
+        _wake.wait(poll_interval())
+        if _wake.is_set():
+            _wake.clear()
+            time.sleep(COMMAND_SETTLE_SECONDS)
+
+def start(get_playback, get_playback_now=None):
+    """
+    Start tracking playback with a function that returns sp.current_playback() (idempotent).
+    get_playback_now does the same for live reads from get_playback(); the tracker's own
+    getter is used when it is None.
+    """
+    global _thread, _get_playback, _get_playback_now
+    with _cond:
+        _get_playback = get_playback
+        _get_playback_now = get_playback_now
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_track, name="now-playing", daemon=True)
+        _thread.start()
+
+def invalidate():
+    """Re-poll soon, e.g. after a play, pause or skip command."""
+    global _invalidated
+    with _cond:
+        _invalidated = True
+    _wake.set()
+
+def get_playback(max_age=MAX_AGE_SECONDS):
+    """Return the latest playback state, reading Spotify if the tracker's is older than max_age."""
+    with _cond:
+        playback, age = _playback, time.monotonic() - _updated_at
+        fresh = _thread is not None and _updated_at and age <= max_age and not _invalidated
+    if fresh:
+        stats["served_from_memory"] += 1
+        return playback
+    stats["live_reads"] += 1
+    return poll(_get_playback_now)
+
+def get_current():
+    """Return the summary for the latest state plus its version: (version, summary)."""
+    with _cond:
+        return _version, summarize(_playback)
+
+def wait_for_change(since, timeout):
+    """Block until the version moves past `since` or the timeout passes; returns (version, summary)."""
+    with _cond:
+        _cond.wait_for(lambda: _version > since, timeout=timeout)
+        return _version, summarize(_playback)
+
+def open_stream():
+    """Claim a stream slot; False when MAX_STREAMS are already open."""
+    global _streams
+    with _cond:
+        if _streams >= MAX_STREAMS:
+            stats["streams_rejected"] += 1
+            return False
+        _streams += 1
+        stats["streams_opened"] += 1
+        return True
+
+def close_stream():
+    global _streams
+    with _cond:
+        _streams -= 1
+
+def get_stats():
+    with _cond:
+        age = time.monotonic() - _updated_at if _updated_at else None
+        return {**stats, "version": _version, "listeners": len(_listeners), "streams": _streams,
+                "age_seconds": round(age, 1) if age is not None else None}
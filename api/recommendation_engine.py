@@ -0,0 +1,170 @@
+"""
+Hedged recommendation sources for "songs like this one".
+The sources (Spotify recommendations, Gemini, the artist's top tracks, a
+"similar" search) used to be tried one after another, so the worst case was
+the sum of all their latencies. Here each source starts after its own hedging
+delay (RECOMMENDATION_HEDGE_DELAYS), or as soon as every source started before
+it has failed. The first result set that passes the quality checks wins and
+the rest are cancelled: sources that haven't started are skipped, and running
+ones see `cancelled` set and stop at their next check. Each source's wins and
+latency are recorded for /metrics.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import resilience
+except ImportError:  # Running as a script or as a Vercel function
+    import resilience
+
+# Seconds after the start before each source is tried, in source order; sources
+# past the end of the list use the last delay
+HEDGE_DELAYS = [float(delay) for delay in os.environ.get("RECOMMENDATION_HEDGE_DELAYS", "0,0.5,1,1.5").split(",")]
+
+# A result set needs at least this many usable tracks (or `limit`, if lower) to win
+MIN_TRACKS = int(os.environ.get("RECOMMENDATION_MIN_TRACKS", "3"))
+
+# Longest a recommendation waits when the request has no deadline of its own
+TIMEOUT_SECONDS = float(os.environ.get("RECOMMENDATION_TIMEOUT_SECONDS", "10"))
+
+# Sources keep running after losing until they next check `cancelled`
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("RECOMMENDATION_WORKERS", "8")), thread_name_prefix="recommend"
+)
+
+_stats_lock = threading.Lock()
+# source name -> counters; latency is only counted for sources that finished
+source_stats = {}
+stats = {"requests": 0, "answered": 0, "fallbacks": 0, "empty": 0}
+
+class Source:
+    """A named way to find tracks like a seed: fetch(seed_track, limit, cancelled) -> [track dicts]."""
+
+    def __init__(self, name, fetch):
+        self.name = name
+        self.fetch = fetch
+
+def _record(name, field, latency=None):
+    """Count an outcome for a source: started, wins, lost, rejected, errors or skipped."""
+    with _stats_lock:
+        entry = source_stats.setdefault(name, {
+            "started": 0, "wins": 0, "lost": 0, "rejected": 0, "errors": 0, "skipped": 0,
+            "finished": 0, "total_ms": 0.0, "max_ms": 0.0
+        })
+        entry[field] += 1
+        if latency is not None:
+            latency_ms = latency * 1000
+            entry["finished"] += 1
+            entry["total_ms"] += latency_ms
+            entry["max_ms"] = max(entry["max_ms"], latency_ms)
+
+def usable_tracks(tracks, seed_track, limit):
+    """The tracks worth suggesting: playable, not the seed itself and no duplicates, at most `limit`."""
+    seen = {seed_track.get('id')}
+    usable = []
+    for track in tracks or []:
+        if not track.get('uri') or track.get('id') in seen:
+            continue
+        seen.add(track.get('id'))
+        usable.append(track)
+    return usable[:limit]
+
+def passes_quality(tracks, limit):
+    return len(tracks) >= min(MIN_TRACKS, limit)
+
+def _delay(index):
+    return HEDGE_DELAYS[min(index, len(HEDGE_DELAYS) - 1)]
+
+def recommend(seed_track, sources, limit=5):
+    """Race the sources for tracks like seed_track; returns the winning tracks, or the best that were found."""
+    with _stats_lock:
+        stats["requests"] += 1
+    started = time.monotonic()
+    time_left = resilience.remaining()
+    ends = started + (TIMEOUT_SECONDS if time_left is None else time_left)
+
+    cond = threading.Condition()
+    cancelled = threading.Event()
+    results = {}  # source index -> (usable tracks or None if it failed, latency)
+
+    def run(index, source):
+        if cancelled.is_set():
+            _record(source.name, "skipped")
+            return
+        _record(source.name, "started")
+        source_started = time.monotonic()
+        try:
+            tracks = usable_tracks(source.fetch(seed_track, limit, cancelled), seed_track, limit)
+        except Exception as e:
+            print(f"Recommendation source {source.name} failed: {e}")
+            tracks = None
+        with cond:
+            results[index] = (tracks, time.monotonic() - source_started)
+            cond.notify_all()
+
+    def good(index):
+        tracks = results[index][0]
+        return tracks is not None and passes_quality(tracks, limit)
+
+    submitted = 0
+    winning = None
+    with cond:
+        while True:
+            now = time.monotonic()
+            # Start every source whose delay has passed, or the next one as soon as all started ones failed
+            while submitted < len(sources) and (
+                now - started >= _delay(submitted)
+                or all(index in results and not good(index) for index in range(submitted))
+            ):
+                context = contextvars.copy_context()
+                _executor.submit(context.run, run, submitted, sources[submitted])
+                submitted += 1
+            winning = next((index for index in results if good(index)), None)
+            if winning is not None or len(results) == len(sources) or now >= ends:
+                break
+            next_start = started + _delay(submitted) if submitted < len(sources) else ends
+            cond.wait(max(0.0, min(next_start, ends) - now))
+        cancelled.set()
+        finished = dict(results)
+
+    for index in range(submitted, len(sources)):
+        _record(sources[index].name, "skipped")
+    for index, (tracks, latency) in finished.items():
+        if index == winning:
+            outcome = "wins"
+        elif tracks is None:
+            outcome = "errors"
+        else:
+            outcome = "lost" if passes_quality(tracks, limit) else "rejected"
+        _record(sources[index].name, outcome, latency)
+    # Sources still running when the race ended are counted in "started" only
+
+    if winning is not None:
+        tracks, latency = finished[winning]
+        print(f"Found {len(tracks)} recommendations using {sources[winning].name} "
+              f"in {time.monotonic() - started:.2f}s")
+        with _stats_lock:
+            stats["answered"] += 1
+        return tracks
+
+    # Nothing passed the checks; fall back to the largest result that came in
+    best = max((tracks for tracks, _ in finished.values() if tracks), key=len, default=[])
+    with _stats_lock:
+        stats["fallbacks" if best else "empty"] += 1
+    return best
+
+def get_stats():
+    with _stats_lock:
+        sources = {}
+        for name, entry in source_stats.items():
+            sources[name] = {
+                **entry,
+                "total_ms": round(entry["total_ms"], 1),
+                "max_ms": round(entry["max_ms"], 1),
+                "avg_ms": round(entry["total_ms"] / entry["finished"], 1) if entry["finished"] else None,
+                "win_rate": round(entry["wins"] / entry["started"], 3) if entry["started"] else None,
+            }
+        return {**stats, "hedge_delays": HEDGE_DELAYS, "sources": sources}
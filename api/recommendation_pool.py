@@ -0,0 +1,198 @@
+"""
+Warm pools of resolved Spotify tracks for popular moods and genres.
+A background thread keeps a shuffled pool of tracks for the moods and genres
+people ask for most often, so common "suggest" requests are answered without
+a Gemini prompt or any Spotify searches. Pools are refreshed on a schedule and
+served in rotation so the same handful of songs isn't suggested every time.
+A key whose refresh fails is retried with exponential backoff.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+# How often every pool is rebuilt
+REFRESH_INTERVAL = int(os.environ.get("POOL_REFRESH_SECONDS", "3600"))
+
+# After a failed refresh a key waits this long before the next try, doubling per
+# consecutive failure up to REFRESH_INTERVAL
+RETRY_SECONDS = int(os.environ.get("POOL_RETRY_SECONDS", "30"))
+
+# How many moods and genres are kept warm, and how many tracks each pool holds
+POOL_KEYS = int(os.environ.get("POOL_KEYS", "8"))
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "15"))
+
+# Request counts survive restarts so the pools are seeded from real usage
+HISTORY_PATH = os.environ.get(
+    "POOL_HISTORY_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "suggestion_history.json")
+)
+
+# Used until there is enough request history
+DEFAULT_KEYS = [
+    ("mood", "relaxing"), ("mood", "upbeat"), ("mood", "romantic"), ("mood", "happy"),
+    ("mood", "sad"), ("genre", "pop"), ("genre", "rock"), ("genre", "jazz")
+]
+
+# (kind, name) -> {"tracks": [...], "cursor": int, "refreshed_at": float}
+pools = {}
+# (kind, name) -> number of times it was requested
+request_counts = {}
+# (kind, name) -> {"failures": int, "next_attempt": float} for keys whose last refresh failed
+backoff = {}
+stats = {"hits": 0, "misses": 0, "refreshes": 0, "failures": 0}
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_thread = None
+_resolvers = {}
+
+def _key(kind, name):
+    return (kind, " ".join(str(name).lower().split()))
+
+def load_history():
+    """Add request counts saved by a previous run to the ones counted so far."""
+    try:
+        with open(HISTORY_PATH) as history_file:
+            data = json.load(history_file)
+        with _lock:
+            for entry in data:
+                key = (entry["kind"], entry["name"])
+                request_counts[key] = request_counts.get(key, 0) + entry["count"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+def save_history():
+    """Write request counts to disk atomically."""
+    with _lock:
+        data = [{"kind": kind, "name": name, "count": count}
+                for (kind, name), count in request_counts.items()]
+    try:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        temp_path = f"{HISTORY_PATH}.tmp"
+        with open(temp_path, "w") as history_file:
+            json.dump(data, history_file)
+        os.replace(temp_path, HISTORY_PATH)
+    except OSError as e:
+        print(f"Could not save suggestion history: {e}")
+
+def record_request(kind, name):
+    """Count a mood or genre request. Wakes the refresher if a new key became popular."""
+    key = _key(kind, name)
+    with _lock:
+        request_counts[key] = request_counts.get(key, 0) + 1
+        needs_fill = key not in pools and not _backing_off_locked(key) and key in _popular_keys_locked()
+    if needs_fill:
+        _wake.set()
+
+def _backing_off_locked(key):
+    entry = backoff.get(key)
+    return entry is not None and time.time() < entry["next_attempt"]
+
+def _record_failure(key):
+    with _lock:
+        entry = backoff.setdefault(key, {"failures": 0, "next_attempt": 0.0})
+        entry["failures"] += 1
+        delay = min(RETRY_SECONDS * 2 ** (entry["failures"] - 1), REFRESH_INTERVAL)
+        entry["next_attempt"] = time.time() + delay
+        stats["failures"] += 1
+    print(f"Retrying {key[0]} pool '{key[1]}' in {delay}s")
+
+def _popular_keys_locked():
+    ranked = sorted(request_counts.items(), key=lambda item: item[1], reverse=True)
+    keys = [key for key, _ in ranked[:POOL_KEYS]]
+    for key in DEFAULT_KEYS:
+        if len(keys) >= POOL_KEYS:
+            break
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def popular_keys():
+    """Return the moods and genres that should be kept warm."""
+    with _lock:
+        return _popular_keys_locked()
+
+def take(kind, name, count=5):
+    """Return the next `count` tracks from a warm pool, or None if the pool is cold."""
+    key = _key(kind, name)
+    with _lock:
+        pool = pools.get(key)
+        if not pool or not pool["tracks"]:
+            stats["misses"] += 1
+            return None
+
+        tracks = pool["tracks"]
+        count = min(count, len(tracks))
+        if pool["cursor"] + count > len(tracks):
+            # Went all the way round; reshuffle so the next pass comes out in a new order
+            random.shuffle(tracks)
+            pool["cursor"] = 0
+        selection = tracks[pool["cursor"]:pool["cursor"] + count]
+        pool["cursor"] += count
+        stats["hits"] += 1
+        return [dict(track) for track in selection]
+
+def refresh(key):
+    """Rebuild the pool for one (kind, name) key using the registered resolver."""
+    kind, name = key
+    resolver = _resolvers.get(kind)
+    if resolver is None:
+        return False
+    try:
+        tracks = resolver(name, POOL_SIZE) or []
+    except Exception as e:
+        print(f"Error refreshing {kind} pool for {name}: {e}")
+        _record_failure(key)
+        return False
+
+    # Drop duplicates the resolver may have returned
+    unique = list({track["id"]: track for track in tracks if track.get("id")}.values())
+    if not unique:
+        _record_failure(key)
+        return False
+    random.shuffle(unique)
+    with _lock:
+        pools[key] = {"tracks": unique, "cursor": 0, "refreshed_at": time.time()}
+        backoff.pop(key, None)
+        stats["refreshes"] += 1
+    print(f"Refreshed {kind} pool '{name}' with {len(unique)} tracks")
+    return True
+
+def _run():
+    load_history()
+    while True:
+        for key in popular_keys():
+            with _lock:
+                pool = pools.get(key)
+                if _backing_off_locked(key):
+                    continue
+            if pool is None or time.time() - pool["refreshed_at"] >= REFRESH_INTERVAL:
+                refresh(key)
+        save_history()
+        # Wake early for the first key whose retry comes due
+        with _lock:
+            retry_at = min((entry["next_attempt"] for entry in backoff.values()), default=None)
+        timeout = REFRESH_INTERVAL if retry_at is None else min(REFRESH_INTERVAL, max(1.0, retry_at - time.time()))
+        _wake.wait(timeout)
+        _wake.clear()
+
+def start(resolve_mood, resolve_genre):
+    """Start the background refresher once. Resolvers take (name, count) and return track dicts."""
+    global _thread
+    with _lock:
+        _resolvers["mood"] = resolve_mood
+        _resolvers["genre"] = resolve_genre
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="recommendation-pool", daemon=True)
+        _thread.start()
+
+def get_stats():
+    with _lock:
+        return {
+            **stats,
+            "backing_off": len([key for key in backoff if _backing_off_locked(key)]),
+            "pools": {f"{kind}:{name}": len(pool["tracks"]) for (kind, name), pool in pools.items()},
+        }
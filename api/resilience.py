@@ -0,0 +1,152 @@
+"""
+Request deadlines and circuit breakers for upstream calls.
+A request sets a deadline once (see `deadline`) and every Gemini and Spotify
+call made while handling it is bounded by the time that is left. Each upstream
+also has a circuit breaker that fails fast after repeated failures, so an
+outage costs one timeout instead of one per call.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+# Monotonic time by which the current request must be answered (None = no deadline)
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+# A call that times out counts against its breaker only if it had at least this
+# long; a request that was nearly out of time failed on its own deadline
+MIN_FAIR_TIMEOUT = float(os.environ.get("UPSTREAM_MIN_FAIR_TIMEOUT", "2"))
+
+# Upstream calls made under a deadline run here so a stalled call can be abandoned
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("UPSTREAM_WORKERS", "16")), thread_name_prefix="upstream"
+)
+
+class DeadlineExceeded(Exception):
+    """Raised when a call can't finish before the request deadline."""
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+@contextmanager
+def deadline(seconds):
+    """Give the calls in this block at most `seconds` (never extends an outer deadline)."""
+    new_deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        new_deadline = min(new_deadline, outer)
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def get_deadline():
+    """Return the current deadline as a monotonic timestamp, or None."""
+    return _deadline.get()
+
+def remaining():
+    """Return the seconds left before the current deadline, or None if there is none."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return max(0.0, current - time.monotonic())
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one probe through after `reset_timeout`."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow(self):
+        """Return True if a call may go to the upstream right now."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                self.stats["calls"] += 1
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                self.stats["calls"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.stats["opened"] += 1
+                    print(f"⚠️ Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self):
+        """End a call that says nothing about the upstream, letting another half-open probe through."""
+        with self._lock:
+            self._probing = False
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, "state": self.state, "consecutive_failures": self.failures}
+
+def call(breaker, function, *args, **kwargs):
+    """Call an upstream through its circuit breaker, bounded by the current deadline."""
+    time_left = remaining()
+    if time_left is not None and time_left <= 0:
+        raise DeadlineExceeded(f"No time left to call {breaker.name}")
+    if not breaker.allow():
+        raise CircuitOpen(f"{breaker.name} is unavailable right now")
+
+    try:
+        if time_left is None:
+            result = function(*args, **kwargs)
+        else:
+            # Copy the context so the worker sees the same deadline and Spotify priority
+            context = contextvars.copy_context()
+            future = _executor.submit(context.run, function, *args, **kwargs)
+            try:
+                result = future.result(timeout=time_left)
+            except FutureTimeoutError:
+                future.cancel()
+                raise DeadlineExceeded(f"{breaker.name} did not answer within {time_left:.1f}s")
+    except DeadlineExceeded:
+        if time_left is not None and time_left >= MIN_FAIR_TIMEOUT:
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    except Exception as e:
+        if breaker.is_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
@@ -0,0 +1,101 @@
+"""
+Predictive prefetch of similar tracks for the song that is currently playing.
+When the now-playing tracker reports a new track, its similar-track list is
+computed in the background and cached against the track id, so "play something
+like this" and follow-up suggestions for the current song are answered without
+waiting.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# How long a prefetched list stays valid and how many tracks are remembered
+CACHE_TTL = float(os.environ.get("PREFETCH_TTL_SECONDS", "3600"))
+CACHE_SIZE = 50
+
+# track id -> {"tracks": [...], "computed_at": float}
+_cache = OrderedDict()
+# track id -> Future for lists that are still being computed
+_pending = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similar-prefetch")
+_compute = None
+
+# The last track seen playing
+current_track = None
+stats = {"prefetched": 0, "hits": 0, "misses": 0, "waited": 0}
+
+def _store(track_id, tracks):
+    with _lock:
+        _pending.pop(track_id, None)
+        if tracks:
+            _cache[track_id] = {"tracks": tracks, "computed_at": time.time()}
+            _cache.move_to_end(track_id)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+def _prefetch(track):
+    try:
+        tracks = _compute(track) or []
+        print(f"Prefetched {len(tracks)} similar tracks for {track['name']}")
+        stats["prefetched"] += 1
+    except Exception as e:
+        print(f"Error prefetching similar tracks: {e}")
+        tracks = []
+    _store(track["id"], tracks)
+    return tracks
+
+def observe(track):
+    """Note that a track is playing and start computing its similar tracks if needed."""
+    global current_track
+    if not track or not track.get("id") or _compute is None:
+        return
+    current_track = track
+    track_id = track["id"]
+    with _lock:
+        cached = _cache.get(track_id)
+        if cached and time.time() - cached["computed_at"] < CACHE_TTL:
+            return
+        if track_id in _pending:
+            return
+        _pending[track_id] = _executor.submit(_prefetch, track)
+
+def get(track_id, wait=0):
+    """Return the prefetched similar tracks for a track id, optionally waiting for an in-flight prefetch."""
+    with _lock:
+        cached = _cache.get(track_id)
+        if cached and time.time() - cached["computed_at"] < CACHE_TTL:
+            stats["hits"] += 1
+            return [dict(track) for track in cached["tracks"]]
+        future = _pending.get(track_id)
+
+    if future is not None and wait > 0:
+        try:
+            tracks = future.result(timeout=wait)
+            stats["waited"] += 1
+            return [dict(track) for track in tracks] if tracks else None
+        except Exception:
+            pass
+    stats["misses"] += 1
+    return None
+
+def put(track_id, tracks):
+    """Cache a similar-track list computed on demand."""
+    _store(track_id, tracks)
+
+def on_playback_change(playback):
+    """Now-playing listener: prefetch for each track that starts playing."""
+    if playback and playback.get("is_playing") and playback.get("item"):
+        observe(playback["item"])
+
+def start(compute_similar):
+    """Enable prefetching. compute_similar takes a Spotify track item and returns track dicts."""
+    global _compute
+    with _lock:
+        _compute = compute_similar
+
+def get_stats():
+    with _lock:
+        return {**stats, "cached": len(_cache), "pending": len(_pending)}
@@ -0,0 +1,62 @@
+"""
+Single-flight coalescing of identical in-flight upstream calls.
+When several requests ask for the same thing at the same time (a couple of
+mirrors sending the same query, or frontend retries), only the first one runs
+the upstream call and everyone else waits for and shares its result.
+"""
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key, function, timeout=None):
+        """Run function() once per key at a time; concurrent callers get the same result or error."""
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.stats["executed"] += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = function()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, "in_flight": len(self._calls)}
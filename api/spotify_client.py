@@ -1,12 +1,49 @@
 """
 Spotify client state management.
 This module provides a centralized way to manage the Spotify client instance.
+spotipy is only imported when a client is actually created, and every
+client goes through the shared rate governor in spotify_governor.
 """
-from spotipy import Spotify
+try:
+    from . import spotify_governor
+except ImportError:  # Running as a script or as a Vercel function
+    import spotify_governor
 
 # Global Spotify client instance
 spotify_client = None
 
+# Retries urllib3 makes itself, for server errors only
+SERVER_ERROR_RETRIES = 3
+
+def create_session():
+    """A requests session that retries 5xx but hands every 429 straight back to the caller."""
+    import requests
+    from urllib3.util.retry import Retry
+    # status_forcelist alone is not enough: urllib3 still retries any response with a
+    # Retry-After header, sleeping in the calling thread past the request deadline. With
+    # respect_retry_after_header off, the 429 reaches the governor, which pauses every caller.
+    retry = Retry(
+        total=SERVER_ERROR_RETRIES,
+        connect=None,
+        read=False,
+        status=SERVER_ERROR_RETRIES,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False
+    )
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def create_client(access_token):
+    """Create a rate-governed Spotify client for an access token."""
+    from spotipy import Spotify
+    client = Spotify(auth=access_token, requests_session=create_session())
+    return spotify_governor.GovernedSpotify(client, spotify_governor.governor, spotify_governor.flights)
+
 def get_client():
     """Get the current Spotify client instance."""
     global spotify_client
@@ -20,4 +57,4 @@ def set_client(client):
 def is_initialized():
     """Check if the Spotify client is initialized."""
     global spotify_client
-    return spotify_client is not None
\ No newline at end of file
+    return spotify_client is not None
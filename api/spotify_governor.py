@@ -0,0 +1,282 @@
+"""
+Rate governing for Spotify Web API calls.
+Every call made through a GovernedSpotify client takes a token from the bucket
+for its endpoint class before it goes out. When Spotify answers 429 the
+Retry-After pause applies to every caller, not just the one that hit it, and
+the call is retried instead of failing. Waiting calls are released in priority
+order so user-facing playback goes ahead of background polling. Identical
+read-only calls that are already in flight are coalesced into one request.
+Calls are bounded by the request deadline and go through the Spotify circuit
+breaker (see resilience).
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from . import resilience
+    from .single_flight import SingleFlight
+except ImportError:  # Running as a script or as a Vercel function
+    import resilience
+    from single_flight import SingleFlight
+
+# Lower number goes first
+PRIORITY_PLAYBACK = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+# Endpoint class -> (requests per second, burst size)
+DEFAULT_LIMITS = {
+    "player": (5.0, 10),
+    "search": (4.0, 8),
+    "browse": (4.0, 8),
+    "library": (2.0, 5),
+    "other": (2.0, 5),
+}
+
+ENDPOINT_CLASSES = {
+    "player": {
+        "start_playback", "pause_playback", "next_track", "previous_track", "transfer_playback",
+        "devices", "current_playback", "currently_playing", "volume", "shuffle", "repeat",
+        "seek_track", "add_to_queue", "queue",
+    },
+    "search": {"search"},
+    "browse": {
+        "recommendations", "artist_top_tracks", "artist", "artists", "track", "tracks",
+        "album", "albums", "album_tracks", "artist_albums", "audio_features",
+    },
+    "library": {
+        "current_user", "current_user_saved_tracks", "current_user_playlists", "playlist",
+        "playlist_items", "playlist_tracks", "current_user_top_tracks", "current_user_top_artists",
+        "current_user_recently_played",
+    },
+}
+
+# Calls that change what the user hears default to the highest priority
+PLAYBACK_METHODS = {
+    "start_playback", "pause_playback", "next_track", "previous_track", "transfer_playback",
+    "volume", "add_to_queue", "seek_track",
+}
+
+# Read-only calls that concurrent requests can safely share
+COALESCED_METHODS = {
+    "search", "devices", "current_playback", "currently_playing", "recommendations",
+    "artist_top_tracks", "artist", "track", "current_user",
+}
+
+# Give up on a call that has been waiting longer than this
+MAX_WAIT = float(os.environ.get("SPOTIFY_MAX_WAIT_SECONDS", "30"))
+
+# Set with `priority()`; a ContextVar so it follows calls into resilience's worker threads
+_priority = contextvars.ContextVar("spotify_priority", default=None)
+
+class RateLimitExceeded(Exception):
+    """Raised when a call could not get through the rate limiter in time."""
+
+@contextmanager
+def priority(level):
+    """Run the Spotify calls in this block at the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def endpoint_class(method_name):
+    for name, methods in ENDPOINT_CLASSES.items():
+        if method_name in methods:
+            return name
+    return "other"
+
+def call_priority(method_name):
+    explicit = _priority.get()
+    if explicit is not None:
+        return explicit
+    return PRIORITY_PLAYBACK if method_name in PLAYBACK_METHODS else PRIORITY_INTERACTIVE
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now):
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now):
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return max(1.0, float(headers.get("Retry-After", 1)))
+    except (TypeError, ValueError):
+        return 1.0
+
+class SpotifyGovernor:
+    """Shared token buckets, priority queues and Retry-After state for all Spotify clients."""
+
+    def __init__(self, limits=None, max_retries=3, max_wait=MAX_WAIT):
+        limits = limits or DEFAULT_LIMITS
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self._queues = {name: [] for name in limits}
+        self.stats = {"calls": 0, "throttled": 0, "rate_limited": 0, "timeouts": 0, "wait_seconds": 0.0}
+
+    def _acquire(self, endpoint, level, deadline):
+        entry = (level, next(self._sequence))
+        queue = self._queues[endpoint]
+        bucket = self._buckets[endpoint]
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if queue[0] == entry:
+                        wait = self.blocked_until - now
+                        if wait <= 0:
+                            if bucket.try_take(now):
+                                heapq.heappop(queue)
+                                break
+                            wait = bucket.time_until_token(now)
+
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        self.stats["timeouts"] += 1
+                        raise RateLimitExceeded(f"Spotify {endpoint} call could not be sent before its deadline")
+                    self._cond.wait(remaining if wait is None else wait)
+            except BaseException:
+                queue.remove(entry)
+                heapq.heapify(queue)
+                raise
+            finally:
+                # Let the next caller in line re-check
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.stats["throttled"] += 1
+                self.stats["wait_seconds"] += waited
+            self.stats["calls"] += 1
+
+    def call(self, method_name, method, *args, **kwargs):
+        """Run one Spotify call under the rate limiter, retrying on 429."""
+        endpoint = endpoint_class(method_name)
+        level = call_priority(method_name)
+        deadline = time.monotonic() + self.max_wait
+        request_deadline = resilience.get_deadline()
+        if request_deadline is not None:
+            deadline = min(deadline, request_deadline)
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(endpoint, level, deadline)
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                if getattr(e, "http_status", None) != 429 or attempt == self.max_retries:
+                    raise
+                retry_after = _retry_after(e)
+                print(f"Spotify rate limited {method_name}; pausing all calls for {retry_after:.0f}s")
+                with self._cond:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                    self.stats["rate_limited"] += 1
+                    self._cond.notify_all()
+
+    def queue_depth(self):
+        with self._cond:
+            return {name: len(queue) for name, queue in self._queues.items()}
+
+    def get_stats(self):
+        with self._cond:
+            depth = {name: len(queue) for name, queue in self._queues.items()}
+            return {
+                **self.stats,
+                "wait_seconds": round(self.stats["wait_seconds"], 3),
+                "queue_depth": depth,
+                "queued": sum(depth.values()),
+                "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            }
+
+def _is_upstream_failure(error):
+    """Only server errors and connection problems count against the Spotify breaker."""
+    status = getattr(error, "http_status", None)
+    return status is None or status >= 500
+
+class GovernedSpotify:
+    """Wraps a spotipy client so every API method goes through a SpotifyGovernor."""
+
+    def __init__(self, client, governor, flights=None):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_governor", governor)
+        object.__setattr__(self, "_flights", flights)
+
+    @property
+    def auth(self):
+        return self._client._auth
+
+    @auth.setter
+    def auth(self, token):
+        # spotipy reads the token from _auth, so route assignments there
+        self._client.set_auth(token)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        def guarded(*args, **kwargs):
+            return resilience.call(breaker, attribute, *args, **kwargs)
+
+        def governed(*args, **kwargs):
+            if self._flights is not None and name in COALESCED_METHODS:
+                # Keyed on the token too so different accounts never share results
+                key = repr((self._client._auth, name, args, sorted(kwargs.items())))
+                return self._flights.do(
+                    key, lambda: self._governor.call(name, guarded, *args, **kwargs),
+                    timeout=resilience.remaining()
+                )
+            return self._governor.call(name, guarded, *args, **kwargs)
+        governed.__name__ = name
+        return governed
+
+    def __setattr__(self, name, value):
+        if name == "auth":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._client, name, value)
+
+# One governor for the whole process so Retry-After pauses every caller
+governor = SpotifyGovernor()
+
+# Shared by every client so coalescing works across token refreshes
+flights = SingleFlight()
+
+# Fails fast while the Spotify Web API is erroring or stalling
+breaker = resilience.CircuitBreaker(
+    "Spotify",
+    failure_threshold=int(os.environ.get("SPOTIFY_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.environ.get("SPOTIFY_BREAKER_RESET_SECONDS", "30")),
+    is_failure=_is_upstream_failure
+)
@@ -0,0 +1,142 @@
+"""
+Shared conversation and device state, safe to use from parallel request threads.
+Readers get an immutable snapshot that is swapped in atomically, so they never
+see a half-applied update and never wait on a writer. Writers serialize on a
+lock per piece of state, copy the current snapshot, change the copy and
+publish it.
+
+The Spotify client stays the `sp` global in index.py: rebinding a name is
+already an atomic swap, so only its creation and token refresh take
+`spotify_lock`.
+"""
+import itertools
+import threading
+from collections import deque
+from types import MappingProxyType
+
+def _freeze(value):
+    """Lists become tuples so a snapshot can't be changed through its values."""
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+class Ref:
+    """A single value that is read without locking and replaced atomically."""
+
+    def __init__(self, value=None):
+        self._value = value
+        self._lock = threading.Lock()
+        self.swaps = 0
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+            self.swaps += 1
+
+    def compare_and_set(self, expected, value):
+        """Replace the value only if it is still `expected`; returns whether it was replaced."""
+        with self._lock:
+            if self._value is not expected and self._value != expected:
+                return False
+            self._value = value
+            self.swaps += 1
+            return True
+
+class Context:
+    """A dict of conversation facts published as read-only snapshots."""
+
+    def __init__(self, **initial):
+        self._lock = threading.Lock()
+        self._snapshot = MappingProxyType({key: _freeze(value) for key, value in initial.items()})
+        self.updates = 0
+
+    def snapshot(self):
+        """The current state; read several keys from one snapshot to get a consistent view."""
+        return self._snapshot
+
+    def get(self, key, default=None):
+        return self._snapshot.get(key, default)
+
+    def __getitem__(self, key):
+        return self._snapshot[key]
+
+    def update(self, **changes):
+        """Apply all changes as one atomic step."""
+        return self.modify(lambda current: changes)
+
+    def modify(self, function):
+        """Read-modify-write: function(snapshot) returns the changes to apply, with no other writer in between."""
+        with self._lock:
+            changes = function(self._snapshot)
+            updated = dict(self._snapshot)
+            updated.update((key, _freeze(value)) for key, value in (changes or {}).items())
+            self._snapshot = MappingProxyType(updated)
+            self.updates += 1
+            return self._snapshot
+
+class History:
+    """The last `maxlen` query/response pairs, each with an increasing id used as a cursor."""
+
+    def __init__(self, maxlen=10):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=maxlen)
+        self._ids = itertools.count(1)
+        self._snapshot = ()
+
+    def append(self, query, response):
+        """Add a query/response pair and return the entry."""
+        with self._lock:
+            # Entries are never changed after this, so snapshots can share them
+            entry = {'id': next(self._ids), 'query': query, 'response': response}
+            self._entries.append(entry)
+            self._snapshot = tuple(self._entries)
+        return entry
+
+    def snapshot(self):
+        return self._snapshot
+
+    def since(self, cursor):
+        """
+        Return (entries newer than `cursor`, whether older unseen ones were dropped,
+        whether the cursor was reset). A cursor newer than the latest entry was never
+        issued by this history (e.g. the server restarted), so the client gets every
+        entry kept and should replace what it has.
+        """
+        snapshot = self._snapshot
+        if snapshot and cursor > snapshot[-1]['id']:
+            return list(snapshot), snapshot[0]['id'] > 1, True
+        entries = [entry for entry in snapshot if entry['id'] > cursor]
+        truncated = bool(entries) and entries[0]['id'] > cursor + 1
+        return entries, truncated, False
+
+    def __iter__(self):
+        return iter(self._snapshot)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+# Serializes creating the Spotify client and refreshing its token
+spotify_lock = threading.RLock()
+
+# Device playback is sent to
+active_device = Ref()
+
+# What the conversation has been about, for follow-ups like "play the second one"
+conversation = Context(
+    last_suggested_songs=[],
+    current_song_topic=None,
+    last_recommendation_query=None
+)
+
+# The last 10 messages (query, response pairs)
+history = History(maxlen=10)
+
+def get_stats():
+    return {
+        "context_updates": conversation.updates,
+        "device_changes": active_device.swaps,
+        "history_length": len(history),
+    }
@@ -0,0 +1,101 @@
+"""
+Durable Spotify token storage.
+The access and refresh tokens are kept in an encrypted file so the API comes
+back up already logged in after a restart. Writes go to a temporary file that
+is swapped in with os.replace, so a crash mid-write never leaves a corrupt
+store. The Fernet key comes from SPOTIFY_TOKEN_KEY or a key file created next
+to the store on first use.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".magic_mirror")
+TOKEN_PATH = os.environ.get("SPOTIFY_TOKEN_PATH", os.path.join(STATE_DIR, "spotify_token.enc"))
+KEY_PATH = os.environ.get("SPOTIFY_TOKEN_KEY_PATH", os.path.join(STATE_DIR, "token.key"))
+
+# Treat access tokens this close to expiry as already expired
+EXPIRY_MARGIN_SECONDS = 60
+
+_lock = threading.Lock()
+_fernet = None
+
+def _write_atomic(path, data, mode=0o600):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def get_fernet():
+    """Get the Fernet cipher, creating a key file on first use if no key is configured."""
+    global _fernet
+    if _fernet is None:
+        from cryptography.fernet import Fernet
+        key = os.environ.get("SPOTIFY_TOKEN_KEY")
+        if not key:
+            try:
+                with open(KEY_PATH, "rb") as key_file:
+                    key = key_file.read().strip()
+            except FileNotFoundError:
+                key = Fernet.generate_key()
+                _write_atomic(KEY_PATH, key)
+        _fernet = Fernet(key)
+    return _fernet
+
+def save(access_token, refresh_token=None, expires_in=3600):
+    """Store the tokens, keeping the previous refresh token if Spotify didn't send a new one."""
+    with _lock:
+        if refresh_token is None:
+            refresh_token = (_read() or {}).get("refresh_token")
+        tokens = {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_at": time.time() + expires_in,
+        }
+        try:
+            _write_atomic(TOKEN_PATH, get_fernet().encrypt(json.dumps(tokens).encode("utf-8")))
+        except Exception as e:
+            # Read-only filesystems (e.g. serverless) just don't get persistence
+            print(f"Could not save Spotify tokens: {e}")
+            return False
+    return True
+
+def _read():
+    try:
+        with open(TOKEN_PATH, "rb") as token_file:
+            encrypted = token_file.read()
+    except FileNotFoundError:
+        return None
+    try:
+        return json.loads(get_fernet().decrypt(encrypted))
+    except Exception as e:
+        print(f"Ignoring unreadable Spotify token store: {e}")
+        return None
+
+def load():
+    """Return the stored {"access_token", "refresh_token", "expires_at"}, or None."""
+    with _lock:
+        return _read()
+
+def is_access_token_valid(tokens):
+    return bool(tokens and tokens.get("access_token")
+                and tokens.get("expires_at", 0) - time.time() > EXPIRY_MARGIN_SECONDS)
+
+def clear():
+    """Forget the stored tokens (e.g. after the user revokes access)."""
+    with _lock:
+        try:
+            os.remove(TOKEN_PATH)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,142 @@
+"""
+Ranking of Spotify search results against a requested song.
+Titles and artists are normalized (accents, "feat." credits, remaster and
+version suffixes) and compared as token sets, then combined with popularity
+and Spotify's own ordering into one score per track. A clear winner is played
+straight away instead of asking the user to pick an option.
+"""
+import re
+import unicodedata
+
+# How many search results are ranked
+SEARCH_LIMIT = 10
+
+# A match is played directly when it scores at least this much...
+CONFIDENT_SCORE = 0.72
+# ...and beats the best different song by this margin
+CONFIDENT_MARGIN = 0.08
+
+# Score weights with and without a requested artist
+WEIGHTS_WITH_ARTIST = {"title": 0.55, "artist": 0.3, "popularity": 0.1, "position": 0.05}
+# Without an artist, songs with the same title are told apart by popularity;
+# a clear gap (~30 points) is needed before one is played without asking
+WEIGHTS_TITLE_ONLY = {"title": 0.75, "artist": 0.0, "popularity": 0.2, "position": 0.05}
+
+# Suffixes that don't change which song it is
+_CREDIT_PATTERN = re.compile(r"[\(\[][^\)\]]*\b(feat|ft|featuring|with)\b[^\)\]]*[\)\]]|\b(feat|ft|featuring)\.?\s.*$")
+_VERSION_PATTERN = re.compile(
+    r"\s-\s.*\b(remaster(ed)?|version|edit|mono|stereo|mix|single|deluxe|anniversary)\b.*$"
+    r"|[\(\[][^\)\]]*\b(remaster(ed)?|version|edit|mono|stereo|deluxe|anniversary)\b[^\)\]]*[\)\]]"
+)
+_NON_WORD_PATTERN = re.compile(r"[^a-z0-9]+")
+
+def strip_accents(text):
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def normalize(text):
+    """Lowercase, accent-free text without credits, version suffixes or punctuation."""
+    if not text:
+        return ""
+    text = strip_accents(text).lower()
+    text = _CREDIT_PATTERN.sub(" ", text)
+    text = _VERSION_PATTERN.sub(" ", text)
+    text = text.replace("&", " and ").replace("'", "")
+    return " ".join(_NON_WORD_PATTERN.sub(" ", text).split())
+
+def tokens(text):
+    return set(normalize(text).split())
+
+def _overlap(query_tokens, candidate_tokens):
+    """(shared, candidate size) for one candidate."""
+    return len(query_tokens & candidate_tokens), len(candidate_tokens)
+
+def score_tracks(song_name, artist, tracks):
+    """Score every track against the request; returns a list of floats in [0, 1]."""
+    import numpy as np
+
+    if not tracks:
+        return []
+    title_query = tokens(song_name)
+    artist_query = tokens(artist)
+    compact_artist = normalize(artist).replace(" ", "")
+    count = len(tracks)
+
+    title_shared = np.zeros(count)
+    title_size = np.zeros(count)
+    # Words of the request found anywhere in the title or the artists, for
+    # requests like "shape of you ed sheeran" that arrive without an artist
+    any_shared = np.zeros(count)
+    artist_shared = np.zeros(count)
+    artist_size = np.ones(count)
+    popularity = np.zeros(count)
+    for i, track in enumerate(tracks):
+        title_tokens = tokens(track.get("name"))
+        artist_names = [a.get("name") for a in track.get("artists") or []]
+        artist_tokens = [tokens(name) for name in artist_names]
+        title_shared[i], title_size[i] = _overlap(title_query, title_tokens)
+        any_shared[i] = len(title_query & title_tokens.union(*artist_tokens))
+        if artist_query and artist_tokens:
+            if compact_artist in {normalize(name).replace(" ", "") for name in artist_names}:
+                # "aha" for "a-ha", "jay z" for "JAY-Z"
+                artist_shared[i] = artist_size[i] = len(artist_query)
+            else:
+                # Best matching credited artist
+                shared, size = max((_overlap(artist_query, a) for a in artist_tokens),
+                                   key=lambda overlap: overlap[0] / max(overlap[1], 1))
+                artist_shared[i], artist_size[i] = shared, max(size, 1)
+        popularity[i] = track.get("popularity") or 0
+
+    title_length = max(len(title_query), 1)
+    # Token-set similarity: how much of the request was found (recall) blended
+    # with how much of the title is accounted for (Dice)
+    recall = np.maximum(title_shared, any_shared) / title_length
+    dice = 2 * title_shared / (title_length + np.maximum(title_size, 1))
+    title_score = 0.6 * recall + 0.4 * dice
+
+    if artist_query:
+        artist_length = len(artist_query)
+        artist_score = 0.6 * artist_shared / artist_length + 0.4 * 2 * artist_shared / (artist_length + artist_size)
+        weights = WEIGHTS_WITH_ARTIST
+    else:
+        artist_score = np.zeros(count)
+        weights = WEIGHTS_TITLE_ONLY
+
+    position_score = 1.0 / (1.0 + np.arange(count))
+    scores = (weights["title"] * title_score + weights["artist"] * artist_score
+              + weights["popularity"] * popularity / 100.0 + weights["position"] * position_score)
+    return scores.tolist()
+
+def song_key(track):
+    """Identify a song regardless of which album or release it is on."""
+    first_artist = track["artists"][0]["name"] if track.get("artists") else ""
+    return normalize(track.get("name")), normalize(first_artist)
+
+def rank(song_name, artist, tracks):
+    """Return [(score, track)] best first."""
+    scores = score_tracks(song_name, artist, tracks)
+    return sorted(zip(scores, tracks), key=lambda pair: pair[0], reverse=True)
+
+def best_match(song_name, artist, tracks):
+    """Rank the tracks and return (ranked, confident) where confident means the top track can play directly."""
+    ranked = rank(song_name, artist, tracks)
+    if not ranked:
+        return ranked, False
+    top_score, top_track = ranked[0]
+    top_key = song_key(top_track)
+    # Other releases of the same song don't count as competition
+    runner_up = next((score for score, track in ranked[1:] if song_key(track) != top_key), 0.0)
+    confident = top_score >= CONFIDENT_SCORE and top_score - runner_up >= CONFIDENT_MARGIN
+    return ranked, confident
+
+def distinct_options(ranked, count=3):
+    """The best `count` tracks, skipping other releases of a song already listed."""
+    options, seen = [], set()
+    for _, track in ranked:
+        key = song_key(track)
+        if key not in seen:
+            seen.add(key)
+            options.append(track)
+        if len(options) == count:
+            break
+    return options
@@ -0,0 +1,180 @@
+"""
+Weather provider for the mirror display.
+Current conditions come from OpenWeather and are kept in memory with a
+stale-while-revalidate policy: polls are always answered from the cache, a
+background thread refreshes it on a schedule using conditional requests, and
+the last good value is kept when the provider can't be reached. If the
+provider is down before anything was cached, only the first poll waits for it;
+later polls get no weather at once while the refresher retries every
+WEATHER_RETRY_SECONDS. Without an OPENWEATHER_API_KEY the old mock data is
+returned.
+"""
+import os
+import random
+import threading
+import time
+
+API_KEY = os.environ.get("OPENWEATHER_API_KEY", "")
+BASE_URL = os.environ.get("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5")
+
+# City name ("London,GB") or coordinates
+LOCATION = os.environ.get("WEATHER_LOCATION", "London")
+LATITUDE = os.environ.get("WEATHER_LAT")
+LONGITUDE = os.environ.get("WEATHER_LON")
+
+REFRESH_INTERVAL = float(os.environ.get("WEATHER_REFRESH_SECONDS", "600"))
+REQUEST_TIMEOUT = float(os.environ.get("WEATHER_TIMEOUT_SECONDS", "5"))
+# How often the refresher retries while nothing has been cached yet
+RETRY_SECONDS = float(os.environ.get("WEATHER_RETRY_SECONDS", "30"))
+
+# OpenWeather "main" groups -> the wording the display already uses
+CONDITION_NAMES = {
+    "Clear": "Clear", "Clouds": "Cloudy", "Rain": "Rainy", "Drizzle": "Drizzle",
+    "Thunderstorm": "Stormy", "Snow": "Snowy", "Mist": "Misty", "Fog": "Foggy", "Haze": "Hazy",
+}
+
+# Latest weather: {"condition", "temperature", "humidity", "fetched_at", "stale"}
+_current = None
+# Validators from the last response, sent back as conditional request headers
+_validators = {}
+# When a fetch with nothing cached last failed; polls stop waiting on the provider after that
+_cold_failed_at = None
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_thread = None
+stats = {"fetches": 0, "not_modified": 0, "errors": 0, "unavailable": 0}
+
+def mock_weather():
+    """Random weather used when no API key is configured."""
+    weather_conditions = ["Sunny", "Cloudy", "Rainy", "Partly Cloudy", "Clear"]
+    temperatures = list(range(15, 30))  # Temperature range in Celsius
+    return {
+        "condition": random.choice(weather_conditions),
+        "temperature": random.choice(temperatures),
+        "humidity": random.randint(30, 90),
+        "fetched_at": time.time(),
+        "stale": False,
+        "source": "mock"
+    }
+
+def parse_response(data):
+    """Turn an OpenWeather current-weather payload into the cached shape."""
+    main_group = data["weather"][0]["main"] if data.get("weather") else "Clear"
+    return {
+        "condition": CONDITION_NAMES.get(main_group, main_group),
+        "temperature": round(data["main"]["temp"]),
+        "humidity": data["main"]["humidity"],
+        "fetched_at": time.time(),
+        "stale": False,
+        "source": "openweather"
+    }
+
+def refresh():
+    """Fetch the current weather, revalidating the cached copy. Returns True on success."""
+    global _current, _cold_failed_at
+    import requests
+
+    params = {"appid": API_KEY, "units": "metric"}
+    if LATITUDE and LONGITUDE:
+        params.update(lat=LATITUDE, lon=LONGITUDE)
+    else:
+        params["q"] = LOCATION
+
+    with _refresh_lock:
+        headers = {}
+        with _lock:
+            if _current is not None:
+                if _validators.get("etag"):
+                    headers["If-None-Match"] = _validators["etag"]
+                if _validators.get("last_modified"):
+                    headers["If-Modified-Since"] = _validators["last_modified"]
+        try:
+            response = requests.get(f"{BASE_URL}/weather", params=params, headers=headers,
+                                    timeout=REQUEST_TIMEOUT)
+            stats["fetches"] += 1
+            if response.status_code == 304:
+                stats["not_modified"] += 1
+                with _lock:
+                    _current = {**_current, "fetched_at": time.time(), "stale": False}
+                return True
+
+            response.raise_for_status()
+            weather = parse_response(response.json())
+            with _lock:
+                _current = weather
+                _validators["etag"] = response.headers.get("ETag")
+                _validators["last_modified"] = response.headers.get("Last-Modified")
+            return True
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error fetching weather: {e}")
+            # Keep serving the last good value, flagged as stale
+            with _lock:
+                if _current is not None:
+                    _current = {**_current, "stale": True}
+                else:
+                    _cold_failed_at = time.time()
+            return False
+
+def _refresh_loop():
+    while True:
+        with _lock:
+            cold = _current is None
+        time.sleep(RETRY_SECONDS if cold else REFRESH_INTERVAL)
+        refresh()
+
+def start():
+    """Start the background refresher once."""
+    global _thread
+    with _lock:
+        if _thread is not None or not API_KEY:
+            return
+        _thread = threading.Thread(target=_refresh_loop, name="weather-refresh", daemon=True)
+        _thread.start()
+
+def get_weather():
+    """Return the latest weather from memory, fetching only if nothing has been cached yet."""
+    global _current
+    if not API_KEY:
+        # Hold each mock value for a refresh interval so it behaves like real cached weather
+        with _lock:
+            if _current is None or time.time() - _current["fetched_at"] > REFRESH_INTERVAL:
+                _current = mock_weather()
+            return dict(_current)
+
+    with _lock:
+        current = _current
+        cold_failed = _cold_failed_at is not None
+    if current is None and cold_failed:
+        # The provider was down at boot; the refresher keeps retrying it
+        start()
+        stats["unavailable"] += 1
+        return None
+    if current is None:
+        # Cold cache: this is the only time a poll waits for the provider
+        refresh()
+        start()
+        with _lock:
+            current = _current
+        if current is None:
+            return None
+    elif time.time() - current["fetched_at"] > REFRESH_INTERVAL * 2 and not _refresh_lock.locked():
+        # The refresher has fallen behind (e.g. after a suspend); revalidate without blocking
+        threading.Thread(target=refresh, daemon=True).start()
+    return dict(current)
+
+def version():
+    """A value that changes whenever the cached weather does (None while cold)."""
+    with _lock:
+        if _current is None:
+            return None
+        if not API_KEY and time.time() - _current["fetched_at"] > REFRESH_INTERVAL:
+            # The mock value is due to be replaced on the next get_weather()
+            return "expired"
+        return _current["fetched_at"], _current["stale"]
+
+def get_stats():
+    with _lock:
+        age = time.time() - _current["fetched_at"] if _current else None
+        cold_failed = _current is None and _cold_failed_at is not None
+    return {**stats, "age_seconds": round(age, 1) if age is not None else None, "cold_failed": cold_failed}
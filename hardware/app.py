@@ -1,86 +1,24 @@
 # hardware_server.py
 from flask_cors import CORS  # Import CORS
 from flask import Flask, jsonify, request
-import platform
-import os
-import random
 
-try:
-    import RPi.GPIO as GPIO
-    import time
-    IS_PI = True
-except (ImportError, RuntimeError):
-    IS_PI = False
-
-try:
-    import adafruit_dht
-    import board
-    dht_sensor = adafruit_dht.DHT11(board.D4)  # Or use DHT22
-    HAS_DHT = True
-except (ImportError, RuntimeError, AttributeError) as e:
-    print("[WARNING] DHT sensor not available:", e)
-    HAS_DHT = False
+# Sensor and screen access is shared with the asyncio server (async_app.py)
+from sensors import measure_distance, read_dht, turn_off_screen, turn_on_screen, warm_up as warm_up_sensors
+import sensor_feed
 
 
 app = Flask(__name__)
 CORS(app, origin='*')  # Enable CORS for all routes
 
-# GPIO Setup (only on Pi)
-TRIG_PIN = 23
-ECHO_PIN = 24
-
-if IS_PI:
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(TRIG_PIN, GPIO.OUT)
-    GPIO.setup(ECHO_PIN, GPIO.IN)
-
-def get_distance():
-    if not IS_PI:
-        random_distance = random.randint(50, 400)
-        print("[MOCK] Returning fake distance ", random_distance)
-        
-        return random_distance
-
-    # Ensure trigger is LOW
-    GPIO.output(TRIG_PIN, False)
-    time.sleep(0.1)
-
-    # Send 10us pulse
-    GPIO.output(TRIG_PIN, True)
-    time.sleep(0.00001)
-    GPIO.output(TRIG_PIN, False)
-
-    # Measure echo time
-    while GPIO.input(ECHO_PIN) == 0:
-        pulse_start = time.time()
-
-    while GPIO.input(ECHO_PIN) == 1:
-        pulse_end = time.time()
-
-    pulse_duration = pulse_end - pulse_start
-    distance = pulse_duration * 17150
-    return round(distance, 2)
-
-def turn_off_screen():
-    if IS_PI:
-        os.system("vcgencmd display_power 0")
-    print("🛌 Screen OFF command sent")
-
-def turn_on_screen():
-    if IS_PI:
-        os.system("vcgencmd display_power 1")
-    print("👀 Screen ON command sent")
+def warm_up():
+    """Take first sensor readings and start sampling for /sensors."""
+    warm_up_sensors()
+    sensor_feed.start()
 
 @app.route('/dht', methods=['GET'])
 def get_temp_humidity():
-    if not HAS_DHT:
-        return jsonify({'error': 'DHT sensor not available'}), 500
     try:
-        temperature = dht_sensor.temperature
-        humidity = dht_sensor.humidity
-        if temperature is None or humidity is None:
-            raise ValueError("Sensor reading is None")
-        return jsonify({'temperature': temperature, 'humidity': humidity})
+        return jsonify(read_dht())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -88,11 +26,21 @@ def get_temp_humidity():
 @app.route('/distance', methods=['GET'])
 def distance():
     try:
-        dist = get_distance()
-        return jsonify({'distance': dist})
+        # 'distance' is filtered; 'raw', 'median' and 'outlier' are there for tuning
+        return jsonify(measure_distance())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/sensors', methods=['GET'])
+def get_sensors():
+    """All readings with a version; ?since=<version>&wait=<seconds> holds the request until one changes."""
+    sensor_feed.start()
+    since = request.args.get('since', type=int)
+    wait = min(max(request.args.get('wait', default=0, type=float), 0), sensor_feed.MAX_WAIT)
+    if since is not None and wait > 0:
+        return jsonify(sensor_feed.wait_for_change(since, wait))
+    return jsonify(sensor_feed.current())
+
 @app.route('/screen', methods=['POST'])
 def control_screen():
     try:
@@ -0,0 +1,177 @@
+"""
+Asyncio version of the hardware server (aiohttp), with the same routes as app.py.
+
+Sensor reads block - the distance echo is timed with a busy-wait and a DHT read
+can take a couple of seconds - so each sensor gets its own single-thread
+executor and concurrent requests for a sensor share one read. Screen commands
+run as subprocesses awaited on the event loop, so /screen is answered right
+away even while a sensor read is stuck.
+
+Usage:
+    python hardware/async_app.py                 # http://0.0.0.0:5001
+    python hardware/async_app.py --port 5002
+    python serve.py hardware-async               # under gunicorn
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import sensors
+import sensor_feed
+
+# A sensor read that takes longer than this is answered with an error
+SENSOR_TIMEOUT_SECONDS = float(os.environ.get("SENSOR_TIMEOUT_SECONDS", "3"))
+
+# One thread per sensor: the GPIO and DHT drivers aren't made for concurrent
+# use, and a slow read of one sensor doesn't hold up the other
+_executors = {
+    "distance": ThreadPoolExecutor(max_workers=1, thread_name_prefix="distance"),
+    "dht": ThreadPoolExecutor(max_workers=1, thread_name_prefix="dht"),
+}
+# Reads in progress, shared by requests that arrive while they run
+_pending = {}
+stats = {"reads": 0, "shared_reads": 0, "timeouts": 0, "screen_commands": 0}
+
+async def read_sensor(name, function):
+    """Run a blocking read in the sensor's executor, sharing one that is already in progress."""
+    future = _pending.get(name)
+    if future is None:
+        stats["reads"] += 1
+        future = asyncio.get_running_loop().run_in_executor(_executors[name], function)
+        _pending[name] = future
+        future.add_done_callback(lambda done: _pending.pop(name, None))
+    else:
+        stats["shared_reads"] += 1
+    try:
+        # shield() so one caller timing out doesn't cancel the read for the others
+        return await asyncio.wait_for(asyncio.shield(future), SENSOR_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        stats["timeouts"] += 1
+        raise TimeoutError(f"{name} read took longer than {SENSOR_TIMEOUT_SECONDS}s")
+
+async def set_screen(action):
+    stats["screen_commands"] += 1
+    if sensors.IS_PI:
+        process = await asyncio.create_subprocess_exec(*sensors.SCREEN_COMMANDS[action])
+        await process.wait()
+    print(sensors.SCREEN_MESSAGES[action])
+
+def error(message, status=500):
+    return web.json_response({'error': message}, status=status)
+
+async def get_temp_humidity(request):
+    try:
+        return web.json_response(await read_sensor("dht", sensors.read_dht))
+    except Exception as e:
+        return error(str(e))
+
+async def distance(request):
+    try:
+        # 'distance' is filtered; 'raw', 'median' and 'outlier' are there for tuning
+        return web.json_response(await read_sensor("distance", sensors.measure_distance))
+    except Exception as e:
+        return error(str(e))
+
+async def get_sensors(request):
+    """All readings with a version; ?since=<version>&wait=<seconds> holds the request until one changes."""
+    sensor_feed.start()
+    try:
+        since = int(request.query["since"]) if "since" in request.query else None
+        wait = min(max(float(request.query.get("wait", 0)), 0), sensor_feed.MAX_WAIT)
+    except ValueError:
+        return error("since must be an integer and wait a number", 400)
+
+    readings = sensor_feed.current()
+    if since is None or wait <= 0 or readings["version"] > since:
+        return web.json_response(readings)
+
+    # Woken from the sampler thread, so the wait costs no thread
+    loop = asyncio.get_running_loop()
+    changed = loop.create_future()
+
+    def on_change(version):
+        loop.call_soon_threadsafe(lambda: changed.done() or changed.set_result(version))
+
+    sensor_feed.add_listener(on_change)
+    try:
+        # Check again now that the listener is in place, so a change in between isn't missed
+        if sensor_feed.current()["version"] <= since:
+            await asyncio.wait_for(changed, wait)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        sensor_feed.remove_listener(on_change)
+    return web.json_response(sensor_feed.current())
+
+async def control_screen(request):
+    try:
+        data = await request.json()
+        action = data.get("action")
+
+        if action not in sensors.SCREEN_COMMANDS:
+            return error("Invalid action", 400)
+
+        await set_screen(action)
+        return web.json_response({"status": "success", "action": action})
+    except Exception as e:
+        return error(str(e))
+
+async def get_stats(request):
+    return web.json_response({**stats, "pending": sorted(_pending), "sensor_feed": sensor_feed.get_stats(),
+                              "distance_filter": sensors.distance_filter.get_stats()})
+
+async def home(request):
+    return web.Response(text="Magic Mirror hardware server (asyncio): /dht, /distance, /sensors, /screen, /stats")
+
+@web.middleware
+async def cors(request, handler):
+    """Allow every origin, like flask_cors in app.py; preflights are answered here."""
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+async def _warm_up(app):
+    """First reads, each in its sensor's executor, before requests are accepted."""
+    for name, function in (("dht", sensors.read_dht), ("distance", sensors.measure_distance)):
+        try:
+            await read_sensor(name, function)
+        except Exception as e:
+            print(f"[WARNING] {name} warmup read failed:", e)
+
+def create_app(warm=True):
+    app = web.Application(middlewares=[cors])
+    app.router.add_get('/dht', get_temp_humidity)
+    app.router.add_get('/distance', distance)
+    app.router.add_get('/sensors', get_sensors)
+    app.router.add_post('/screen', control_screen)
+    app.router.add_get('/stats', get_stats)
+    app.router.add_get('/', home)
+    if warm:
+        app.on_startup.append(_warm_up)
+    return app
+
+def warm_up():
+    """Take first sensor readings and start sampling for /sensors (serve.py calls this)."""
+    sensors.warm_up()
+    sensor_feed.start()
+
+# For serve.py, which warms up the sensors itself
+app = create_app(warm=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the asyncio hardware server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
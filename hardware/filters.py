@@ -0,0 +1,105 @@
+"""
+Noise filtering for the ultrasonic distance sensor.
+Samples go into a preallocated ring buffer. A sample further from the window's
+median than DISTANCE_OUTLIER_MADS median absolute deviations is rejected as a
+stray echo; accepted samples feed an exponential smoother (the steady-state
+form of a 1-D Kalman filter). A burst of samples is filtered as arrays - one
+sliding-window median and one smoothing pass - instead of sample by sample.
+"""
+import os
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Samples in the median window; a real step change shows after half of it
+WINDOW = int(os.environ.get("DISTANCE_FILTER_WINDOW", "5"))
+OUTLIER_MADS = float(os.environ.get("DISTANCE_OUTLIER_MADS", "3"))
+# Deviations up to this many cm are never outliers (a still target has a MAD near 0)
+MIN_DEVIATION_CM = float(os.environ.get("DISTANCE_MIN_DEVIATION_CM", "8"))
+# Weight of a new accepted sample in the smoothed value (1 = no smoothing)
+SMOOTHING = float(os.environ.get("DISTANCE_SMOOTHING", "0.5"))
+
+# Scales a MAD to a standard deviation for normally distributed noise
+_MAD_TO_SIGMA = 1.4826
+# Samples per closed-form smoothing step; keeps decay ** -n well inside float range
+_CHUNK = 64
+
+def smooth(values, alpha, initial=None):
+    """Exponentially smooth a 1-D array, continuing from `initial` (default: the first value)."""
+    values = np.asarray(values, dtype=float)
+    if alpha >= 1 or not len(values):
+        return values.copy()
+    decay = 1.0 - alpha
+    previous = values[0] if initial is None else initial
+    out = np.empty(len(values))
+    for start in range(0, len(values), _CHUNK):
+        chunk = values[start:start + _CHUNK]
+        steps = np.arange(len(chunk))
+        # y[i] = decay^(i+1) * y[-1] + alpha * sum_k decay^(i-k) * x[k], as one cumulative sum
+        weighted = np.cumsum(chunk * decay ** -steps)
+        out[start:start + len(chunk)] = decay ** (steps + 1) * previous + alpha * decay ** steps * weighted
+        previous = out[start + len(chunk) - 1]
+    return out
+
+class DistanceFilter:
+    """Median, outlier rejection and smoothing over the last `window` samples; thread-safe."""
+
+    def __init__(self, window=WINDOW, outlier_mads=OUTLIER_MADS, min_deviation=MIN_DEVIATION_CM,
+                 smoothing=SMOOTHING):
+        self.window = window
+        self.outlier_mads = outlier_mads
+        self.min_deviation = min_deviation
+        self.smoothing = smoothing
+        self._buffer = np.empty(window)
+        self._count = 0
+        self._estimate = None
+        self._lock = threading.Lock()
+        self.stats = {"samples": 0, "rejected": 0}
+
+    def _history(self):
+        """The buffered samples, oldest first."""
+        if self._count < self.window:
+            return self._buffer[:self._count]
+        return np.roll(self._buffer, -(self._count % self.window))
+
+    def add_many(self, values):
+        """Filter a burst. Returns (medians, accepted, filtered) arrays with one entry per sample."""
+        values = np.asarray(values, dtype=float)
+        count = len(values)
+        if not count:
+            return np.empty(0), np.empty(0, dtype=bool), np.empty(0)
+        with self._lock:
+            history = self._history()
+            series = np.concatenate([history, values])
+            # Until the buffer has filled, repeat the oldest sample to complete the first windows
+            series = np.pad(series, (max(self.window - 1 - len(history), 0), 0), mode="edge")
+            windows = sliding_window_view(series, self.window)[-count:]
+            medians = np.median(windows, axis=1)
+            deviations = np.median(np.abs(windows - medians[:, None]), axis=1)
+            limits = np.maximum(self.outlier_mads * _MAD_TO_SIGMA * deviations, self.min_deviation)
+            accepted = np.abs(values - medians) <= limits
+
+            # Rejected samples hold the last smoothed value
+            smoothed = smooth(values[accepted], self.smoothing, self._estimate)
+            latest = np.cumsum(accepted) - 1
+            fallback = medians if self._estimate is None else np.full(count, self._estimate)
+            filtered = np.where(latest >= 0, smoothed[np.maximum(latest, 0)] if len(smoothed) else 0.0, fallback)
+
+            kept = values[-self.window:]
+            self._buffer[(self._count + np.arange(count - len(kept), count)) % self.window] = kept
+            self._count += count
+            if len(smoothed):
+                self._estimate = float(smoothed[-1])
+            self.stats["samples"] += count
+            self.stats["rejected"] += int(count - accepted.sum())
+        return medians, accepted, filtered
+
+    def add(self, value):
+        """Filter one sample: {'distance': filtered, 'raw', 'median', 'outlier'}."""
+        medians, accepted, filtered = self.add_many([value])
+        return {'distance': round(float(filtered[0]), 2), 'raw': value,
+                'median': round(float(medians[0]), 2), 'outlier': not bool(accepted[0])}
+
+    def get_stats(self):
+        return {**self.stats, "estimate": self._estimate}
@@ -0,0 +1,173 @@
+"""
+Sources for the readings behind sensors.get_distance() and sensors.read_dht().
+
+    gpio    the ultrasonic sensor and DHT on the Pi (sensors.GPIOBackend)
+    mock    random readings, for running off the Pi
+    record  wraps another backend and appends every reading to a trace file
+    replay  plays a trace back through the same code paths, in real time,
+            faster (speed 10 = ten times) or as fast as it is read (speed 0)
+
+A trace is an 8-byte header followed by fixed 17-byte little-endian records
+(timestamp as a double, record kind, two floats), so an hour of 10 Hz distance
+samples takes about 600 KB.
+"""
+import bisect
+import math
+import os
+import random
+import struct
+import threading
+import time
+
+TRACE_MAGIC = b"MMTRACE1"
+RECORD = struct.Struct("<dBff")
+
+# Record kinds; failed reads are recorded too, so replays fail the same way
+DISTANCE, DHT, DISTANCE_ERROR, DHT_ERROR = range(4)
+
+# Gaps longer than this (the server was stopped) are skipped on replay
+MAX_REPLAY_GAP_SECONDS = 60.0
+
+# How often the recorder flushes to disk (SD cards don't like tiny writes)
+FLUSH_SECONDS = 1.0
+
+class MockBackend:
+    """Random readings in the range a person in front of the mirror would produce."""
+    name = "mock"
+
+    def distance(self):
+        return random.randint(50, 400)
+
+    def dht(self):
+        return {'temperature': random.randint(18, 26), 'humidity': random.randint(35, 60)}
+
+class TraceWriter:
+    """Appends records to a trace file; safe to share between threads."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(TRACE_MAGIC)
+        self._flushed_at = time.monotonic()
+        self.records = 0
+
+    def write(self, kind, a=math.nan, b=math.nan, timestamp=None):
+        record = RECORD.pack(time.time() if timestamp is None else timestamp, kind, a, b)
+        with self._lock:
+            self._file.write(record)
+            self.records += 1
+            if time.monotonic() - self._flushed_at >= FLUSH_SECONDS:
+                self._file.flush()
+                self._flushed_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def read_trace(path):
+    """Return the records of a trace file as (timestamp, kind, a, b) tuples."""
+    with open(path, "rb") as trace_file:
+        data = trace_file.read()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} is not a sensor trace")
+    body = data[len(TRACE_MAGIC):]
+    # A recorder that was killed mid-write can leave a partial last record
+    body = body[:len(body) - len(body) % RECORD.size]
+    return list(RECORD.iter_unpack(body))
+
+class RecordingBackend:
+    """Reads from another backend and records every reading (and failure) to a trace."""
+    name = "record"
+
+    def __init__(self, inner, writer):
+        self.inner = inner
+        self.writer = writer
+
+    def distance(self):
+        try:
+            value = self.inner.distance()
+        except Exception:
+            self.writer.write(DISTANCE_ERROR)
+            raise
+        self.writer.write(DISTANCE, value)
+        return value
+
+    def dht(self):
+        try:
+            reading = self.inner.dht()
+        except Exception:
+            self.writer.write(DHT_ERROR)
+            raise
+        self.writer.write(DHT, reading['temperature'], reading['humidity'])
+        return reading
+
+class ReplayBackend:
+    """Plays recorded readings back; each read returns what the sensor reported at that point."""
+    name = "replay"
+
+    def __init__(self, records, speed=1.0, loop=True):
+        self.speed = speed
+        self.loop = loop
+        self._streams = {"distance": ([], []), "dht": ([], [])}
+        self._positions = {"distance": 0, "dht": 0}
+        self._lock = threading.Lock()
+
+        clock, previous = 0.0, None
+        for timestamp, kind, a, b in sorted(records, key=lambda record: record[0]):
+            if previous is not None:
+                clock += min(timestamp - previous, MAX_REPLAY_GAP_SECONDS)
+            previous = timestamp
+            if kind in (DISTANCE, DISTANCE_ERROR):
+                stream, value = "distance", round(a, 2) if kind == DISTANCE else None
+            else:
+                stream = "dht"
+                value = {'temperature': round(a, 1), 'humidity': round(b, 1)} if kind == DHT else None
+            times, values = self._streams[stream]
+            times.append(clock)
+            values.append(value)
+        self.duration = clock
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_file(cls, path, speed=1.0, loop=True):
+        return cls(read_trace(path), speed, loop)
+
+    def _index(self, stream):
+        times = self._streams[stream][0]
+        if not times:
+            raise RuntimeError(f"The trace has no {stream} readings")
+        if self.speed <= 0:
+            # As fast as it is read: every read is the next record
+            with self._lock:
+                index = self._positions[stream]
+                if index >= len(times):
+                    if not self.loop:
+                        raise EOFError(f"End of the {stream} trace")
+                    index = 0
+                self._positions[stream] = index + 1
+            return index
+        position = (time.monotonic() - self._started) * self.speed
+        if position > self.duration:
+            if not self.loop:
+                raise EOFError(f"End of the {stream} trace")
+            position %= max(self.duration, 1e-9)
+        return max(bisect.bisect_right(times, position) - 1, 0)
+
+    def _read(self, stream):
+        value = self._streams[stream][1][self._index(stream)]
+        if value is None:
+            raise TimeoutError(f"Recorded {stream} read failed")
+        return value
+
+    def distance(self):
+        return self._read("distance")
+
+    def dht(self):
+        return dict(self._read("dht"))
+
+    def remaining(self, stream="distance"):
+        """Records left before the end in as-fast-as-read mode."""
+        return len(self._streams[stream][0]) - self._positions[stream]
@@ -0,0 +1,130 @@
+"""
+Combined, versioned sensor readings for the /sensors endpoint.
+A sampler thread reads the distance sensor every SENSORS_DISTANCE_POLL_SECONDS
+and the DHT every SENSORS_DHT_POLL_SECONDS (it can't be read much faster than
+once every 2 s). The version only moves when a reading changes by more than
+its delta, so long-polling clients (?since=<version>&wait=<seconds>) are woken
+for real changes and not for sensor jitter. The distance is the filtered value
+(filters.py); the raw reading comes along as distance_raw.
+"""
+import os
+import threading
+import time
+
+import sensors
+
+DISTANCE_POLL_SECONDS = float(os.environ.get("SENSORS_DISTANCE_POLL_SECONDS", "0.5"))
+DHT_POLL_SECONDS = float(os.environ.get("SENSORS_DHT_POLL_SECONDS", "5"))
+
+# A reading has to move this far from the last published value to count as a change
+DELTAS = {
+    "distance": float(os.environ.get("SENSORS_DISTANCE_DELTA_CM", "10")),
+    "temperature": float(os.environ.get("SENSORS_TEMPERATURE_DELTA", "0.5")),
+    "humidity": float(os.environ.get("SENSORS_HUMIDITY_DELTA", "2")),
+}
+
+# Longest a long-poll request is held open
+MAX_WAIT = 30.0
+
+_cond = threading.Condition()
+_readings = {**{key: None for key in DELTAS}, "distance_raw": None}
+_errors = {}
+_version = 0
+_updated_at = None
+_listeners = []
+_thread = None
+stats = {"samples": 0, "changes": 0, "sample_errors": 0}
+
+def _moved(key, value):
+    published = _readings[key]
+    if value is None or published is None:
+        return value != published
+    return abs(value - published) > DELTAS[key]
+
+def add_listener(listener):
+    """Call listener(version) from the sampler thread whenever the version moves."""
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    try:
+        _listeners.remove(listener)
+    except ValueError:
+        pass
+
+def publish(values, errors=None):
+    """Record a round of samples; the version moves if any reading moved past its delta."""
+    global _version, _updated_at
+    with _cond:
+        stats["samples"] += 1
+        changed = {key: value for key, value in values.items() if key in DELTAS and _moved(key, value)}
+        # Readings without a delta ride along without moving the version
+        _readings.update((key, value) for key, value in values.items() if key not in DELTAS)
+        for key in values:
+            _errors.pop(key, None)
+        _errors.update(errors or {})
+        if not changed:
+            return _version
+        _readings.update(changed)
+        _version += 1
+        _updated_at = time.time()
+        stats["changes"] += 1
+        _cond.notify_all()
+        version = _version
+    for listener in list(_listeners):
+        try:
+            listener(version)
+        except Exception as e:
+            print(f"[WARNING] Sensor listener failed: {e}")
+    return version
+
+def _read(function, keys):
+    """Run one sensor read; returns (values, errors) keyed by reading."""
+    try:
+        value = function()
+    except Exception as e:
+        return {}, {key: str(e) for key in keys}
+    return (value if isinstance(value, dict) else {keys[0]: value}), {}
+
+def _measure_distance():
+    reading = sensors.measure_distance()
+    return {"distance": reading["distance"], "distance_raw": reading["raw"]}
+
+def _sample_loop():
+    next_dht = 0.0
+    while True:
+        reads = [(_measure_distance, ("distance",))]
+        if time.monotonic() >= next_dht:
+            next_dht = time.monotonic() + DHT_POLL_SECONDS
+            reads.append((sensors.read_dht, ("temperature", "humidity")))
+        values, errors = {}, {}
+        for function, keys in reads:
+            read_values, read_errors = _read(function, keys)
+            values.update(read_values)
+            errors.update(read_errors)
+        if errors:
+            stats["sample_errors"] += 1
+        publish(values, errors)
+        time.sleep(DISTANCE_POLL_SECONDS)
+
+def start():
+    """Start the sampler once."""
+    global _thread
+    with _cond:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_sample_loop, name="sensor-sampler", daemon=True)
+        _thread.start()
+
+def current():
+    """The published readings: {"version", "distance", "distance_raw", "temperature", "humidity", "updated_at", "errors"}."""
+    with _cond:
+        return {"version": _version, **_readings, "updated_at": _updated_at, "errors": dict(_errors)}
+
+def wait_for_change(since, timeout):
+    """Block until the version is newer than `since` or the timeout passes, then return the readings."""
+    with _cond:
+        _cond.wait_for(lambda: _version > since, timeout=min(timeout, MAX_WAIT))
+    return current()
+
+def get_stats():
+    return {**stats, "version": _version, "listeners": len(_listeners)}
@@ -0,0 +1,167 @@
+"""
+Sensor and screen access shared by the hardware servers (app.py and async_app.py).
+Readings come from the backend picked by SENSOR_BACKEND (see sensor_backends.py):
+the real sensors on the Pi, random mock readings off it, or a recorded trace.
+Screen commands are only logged off the Pi. Every call here blocks, so the
+asyncio server runs them in its own executors.
+"""
+import os
+import threading
+import time
+
+import filters
+import sensor_backends
+
+try:
+    import RPi.GPIO as GPIO
+    IS_PI = True
+except (ImportError, RuntimeError):
+    IS_PI = False
+
+try:
+    import adafruit_dht
+    import board
+    dht_sensor = adafruit_dht.DHT11(board.D4)  # Or use DHT22
+    HAS_DHT = True
+except (ImportError, RuntimeError, AttributeError) as e:
+    print("[WARNING] DHT sensor not available:", e)
+    HAS_DHT = False
+
+# GPIO Setup (only on Pi)
+TRIG_PIN = 23
+ECHO_PIN = 24
+
+# An echo that hasn't started or ended by then is lost; the sensor's 4 m range
+# takes about 25 ms, and without a limit the busy-wait below never returns
+ECHO_TIMEOUT_SECONDS = float(os.environ.get("ECHO_TIMEOUT_SECONDS", "0.1"))
+
+# gpio, mock, record (gpio or mock, saved to SENSOR_TRACE_PATH) or replay (SENSOR_TRACE_PATH);
+# auto is gpio on the Pi and mock elsewhere
+SENSOR_BACKEND = os.environ.get("SENSOR_BACKEND", "auto")
+TRACE_PATH = os.environ.get(
+    "SENSOR_TRACE_PATH",
+    os.path.join(os.path.expanduser("~"), ".magic_mirror", "sensors.trace")
+)
+# Replay speed: 1 is real time, 10 ten times faster, 0 a new record on every read
+REPLAY_SPEED = float(os.environ.get("SENSOR_REPLAY_SPEED", "1"))
+
+# Shell commands for each /screen action
+SCREEN_COMMANDS = {
+    "sleep": ["vcgencmd", "display_power", "0"],
+    "wake": ["vcgencmd", "display_power", "1"],
+}
+SCREEN_MESSAGES = {
+    "sleep": "🛌 Screen OFF command sent",
+    "wake": "👀 Screen ON command sent",
+}
+
+# The sampler for /sensors and request handlers can read at the same time;
+# each sensor is only read by one of them at once
+_distance_lock = threading.Lock()
+_dht_lock = threading.Lock()
+
+if IS_PI:
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(TRIG_PIN, GPIO.OUT)
+    GPIO.setup(ECHO_PIN, GPIO.IN)
+
+def _wait_for_echo(level, deadline):
+    """Busy-wait while the echo pin is at `level`; returns when it changed."""
+    now = time.time()
+    while GPIO.input(ECHO_PIN) == level:
+        now = time.time()
+        if now > deadline:
+            raise TimeoutError("No echo from the distance sensor")
+    return now
+
+class GPIOBackend:
+    """The ultrasonic sensor on TRIG_PIN/ECHO_PIN and the DHT on D4."""
+    name = "gpio"
+
+    def distance(self):
+        with _distance_lock:
+            # Ensure trigger is LOW
+            GPIO.output(TRIG_PIN, False)
+            time.sleep(0.1)
+
+            # Send 10us pulse
+            GPIO.output(TRIG_PIN, True)
+            time.sleep(0.00001)
+            GPIO.output(TRIG_PIN, False)
+
+            # Measure echo time
+            pulse_start = _wait_for_echo(0, time.time() + ECHO_TIMEOUT_SECONDS)
+            pulse_end = _wait_for_echo(1, pulse_start + ECHO_TIMEOUT_SECONDS)
+
+        pulse_duration = pulse_end - pulse_start
+        distance = pulse_duration * 17150
+        return round(distance, 2)
+
+    def dht(self):
+        if not HAS_DHT:
+            raise RuntimeError("DHT sensor not available")
+        with _dht_lock:
+            temperature = dht_sensor.temperature
+            humidity = dht_sensor.humidity
+        if temperature is None or humidity is None:
+            raise ValueError("Sensor reading is None")
+        return {'temperature': temperature, 'humidity': humidity}
+
+def create_backend(name=SENSOR_BACKEND):
+    if name == "auto":
+        name = "gpio" if IS_PI else "mock"
+    if name == "gpio":
+        return GPIOBackend()
+    if name == "mock":
+        return sensor_backends.MockBackend()
+    if name == "record":
+        return sensor_backends.RecordingBackend(create_backend("auto"), sensor_backends.TraceWriter(TRACE_PATH))
+    if name == "replay":
+        return sensor_backends.ReplayBackend.from_file(TRACE_PATH, speed=REPLAY_SPEED)
+    raise ValueError(f"Unknown SENSOR_BACKEND {name!r} (choose auto, gpio, mock, record or replay)")
+
+backend = create_backend()
+print(f"Sensor backend: {backend.name}")
+
+def set_backend(new_backend):
+    """Swap the reading source, e.g. to replay a trace in a benchmark."""
+    global backend
+    backend = new_backend
+
+# Shared by /distance and the /sensors sampler, so both see the same filtered value
+distance_filter = filters.DistanceFilter()
+
+def get_distance():
+    """One raw distance reading in cm."""
+    return backend.distance()
+
+def measure_distance():
+    """Read the distance and filter it: {'distance': filtered, 'raw', 'median', 'outlier'}."""
+    return distance_filter.add(get_distance())
+
+def read_dht():
+    """Return {'temperature', 'humidity'}; raises if the sensor is missing or the read fails."""
+    return backend.dht()
+
+def set_screen(action):
+    if IS_PI:
+        os.system(" ".join(SCREEN_COMMANDS[action]))
+    print(SCREEN_MESSAGES[action])
+
+def turn_off_screen():
+    set_screen("sleep")
+
+def turn_on_screen():
+    set_screen("wake")
+
+def warm_up():
+    """Take a first reading from each sensor so the first request doesn't pay for it."""
+    try:
+        # The first DHT read after power-up often fails; get it out of the way
+        read_dht()
+    except Exception as e:
+        print("[WARNING] DHT warmup read failed:", e)
+    try:
+        get_distance()
+    except Exception as e:
+        print("[WARNING] Distance warmup read failed:", e)
@@ -29,7 +29,6 @@ const App = () => {
 
   // Get environment variables with fallbacks
   const API_URL = process.env.REACT_APP_API_URL || window.location.origin;
-  const HARDWARE_SERVER_URL = process.env.REACT_APP_HARDWARE_SERVER_URL || 'http://localhost:5001';
   
   // Detect if we're running on Vercel or locally
   useEffect(() => {
@@ -50,21 +49,6 @@ const App = () => {
     setDate(now.toLocaleDateString());
   };
 
-  const getSensorTemp = async () => {
-    try {
-      const res = await fetch(`${HARDWARE_SERVER_URL}/dht`);
-      const data = await res.json();
-      if (data?.temperature) {
-        setSensorTemp(`${data.temperature}°C (${data.humidity}%)`);
-      } else {
-        setSensorTemp("N/A");
-      }
-    } catch (error) {
-      console.error("Error fetching sensor temperature:", error);
-      setSensorTemp("N/A");
-    }
-  };
-
   const speak = (text) => {
     if (!text || typeof text !== 'string' || text.trim() === '') {
       console.log("Empty text provided to speak function, ignoring.");
@@ -235,11 +219,9 @@ const App = () => {
 
   useEffect(() => {
     const timeInterval = setInterval(updateTime, 1000);
-    const sensorInterval = setInterval(getSensorTemp, 10000);
 
     return () => {
       clearInterval(timeInterval);
-      clearInterval(sensorInterval);
     };
   }, []);
 
@@ -294,25 +276,49 @@ const App = () => {
     return () => clearInterval(interval);
   }, []);
 
+  // Weather and room sensors come from one dashboard snapshot. Locally it is
+  // long-polled, so a request only comes back when something changed; serverless
+  // functions can't hold a request open, so on Vercel it is fetched every 5 minutes.
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        // Use the appropriate API URL based on environment
-        const dataUrl = isVercel ? `${API_URL}/api/data` : `${API_URL}/api/data`;
-        
-        console.log(`Fetching data from: ${dataUrl}`);
-        const response = await fetch(dataUrl);
-        const result = await response.json();
-        setData(result);
-      } catch (error) {
-        console.error('Error fetching data:', error);
+    let cancelled = false;
+    let version = null;
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+    const applySnapshot = (snapshot) => {
+      setData(snapshot);
+      const sensors = snapshot.sensors;
+      if (sensors && sensors.temperature != null) {
+        setSensorTemp(`${sensors.temperature}°C (${sensors.humidity}%)`);
+      } else {
+        setSensorTemp("N/A");
       }
     };
 
-    fetchData();
-    const intervalId = setInterval(fetchData, 300000);
-    
-    return () => clearInterval(intervalId);
+    const followDashboard = async () => {
+      while (!cancelled) {
+        try {
+          const params = version === null || isVercel ? '' : `?since=${version}&wait=25`;
+          const response = await fetch(`${API_URL}/dashboard${params}`);
+          if (response.status === 200) {
+            const snapshot = await response.json();
+            version = snapshot.version;
+            if (!cancelled) applySnapshot(snapshot);
+          } else if (response.status !== 304) {
+            throw new Error(`Dashboard fetch failed: ${response.status}`);
+          }
+          if (isVercel) await sleep(300000);
+        } catch (error) {
+          console.error('Error fetching dashboard:', error);
+          if (!cancelled) setSensorTemp("N/A");
+          await sleep(10000);
+        }
+      }
+    };
+
+    followDashboard();
+    return () => {
+      cancelled = true;
+    };
   }, [API_URL, isVercel]);
 
   const handlePresenceChange = (isPresent) => {
@@ -0,0 +1,132 @@
+"""
+Production launcher for the Magic Mirror servers.
+
+Runs the API or the hardware server under gunicorn instead of Flask's
+development server. The API is imported once in the master (preload) and each
+worker warms up - SDKs, models and caches - before it accepts its first
+request. Threads are sized from the available cores and memory.
+
+Usage:
+    python serve.py api                 # http://0.0.0.0:5000
+    python serve.py hardware            # http://0.0.0.0:5001
+    python serve.py hardware-async      # same, on an asyncio event loop
+    python serve.py api --threads 16 --port 8000
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def load_api():
+    sys.path.insert(0, ROOT)
+    from api.index import app, warm_up
+    return app, warm_up
+
+def load_hardware():
+    sys.path.insert(0, os.path.join(ROOT, "hardware"))
+    from app import app, warm_up
+    return app, warm_up
+
+def load_hardware_async():
+    sys.path.insert(0, os.path.join(ROOT, "hardware"))
+    from async_app import app, warm_up
+    return app, warm_up
+
+SERVERS = {
+    # The conversation, Spotify session and caches live in process memory, so
+    # the API runs as one process and scales with threads; the shared state is
+    # made thread-safe by api/state.py (see tools/stress_state.py). It is
+    # preloaded so imports happen once, before the worker is forked.
+    "api": {"load": load_api, "port": 5000, "max_workers": 1, "preload": True, "thread_mb": 16},
+    # The GPIO pins and the DHT reader belong to a single process, which
+    # imports them itself rather than inheriting them across a fork.
+    "hardware": {"load": load_hardware, "port": 5001, "max_workers": 1, "preload": False, "thread_mb": 8},
+    # Same routes on an event loop; sensor reads run in executors inside it
+    "hardware-async": {"load": load_hardware_async, "port": 5001, "max_workers": 1, "preload": False,
+                       "thread_mb": 8, "worker_class": "aiohttp.GunicornWebWorker"},
+}
+
+def available_memory_mb():
+    """Memory available to new processes in MB, or None if it can't be read."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def size_server(name):
+    """Pick (workers, threads) for a server from the cores and memory on this machine."""
+    profile = SERVERS[name]
+    cores = os.cpu_count() or 1
+    memory = available_memory_mb()
+
+    workers = min(cores * 2 + 1, profile["max_workers"])
+    # Requests spend most of their time waiting on Gemini, Spotify or a sensor,
+    # and long-polls and event streams hold a thread each
+    threads = max(4, min(cores * 8, 32))
+    if memory is not None:
+        # Leave room for the rest of the mirror (browser, frontend) on small boards
+        threads = max(4, min(threads, (memory // 4) // profile["thread_mb"]))
+    return workers, threads
+
+def build_application(name, options):
+    from gunicorn.app.base import BaseApplication
+
+    loaded = {}
+
+    def load_server():
+        # With preload this runs once in the master and workers inherit the result
+        if not loaded:
+            loaded["app"], loaded["warm_up"] = SERVERS[name]["load"]()
+        return loaded
+
+    def post_worker_init(worker):
+        # Runs in each worker after the app is loaded, before it accepts connections
+        load_server()["warm_up"]()
+
+    class MirrorApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {**options, "post_worker_init": post_worker_init}.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_server()["app"]
+
+    return MirrorApplication()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Magic Mirror server under gunicorn.")
+    parser.add_argument("server", choices=sorted(SERVERS))
+    parser.add_argument("--host", default=os.environ.get("MIRROR_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="Override the computed worker count")
+    parser.add_argument("--threads", type=int, help="Override the computed thread count")
+    args = parser.parse_args()
+
+    workers, threads = size_server(args.server)
+    workers = args.workers or workers
+    threads = args.threads or threads
+    port = args.port or SERVERS[args.server]["port"]
+
+    options = {
+        "bind": f"{args.host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": SERVERS[args.server].get("worker_class", "gthread"),
+        "preload_app": SERVERS[args.server]["preload"],
+        # Long-polls and /now-playing/stream keep connections open
+        "timeout": 120,
+        "graceful_timeout": 10,
+        "keepalive": 5,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+    print(f"Starting {args.server} on {options['bind']} with {workers} worker(s) x {threads} threads")
+    build_application(args.server, options).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+#!/bin/bash
+# Start the Magic Mirror API and hardware servers in the background.
+# Logs go to ~/.magic_mirror/logs, process ids to ~/.magic_mirror/run.
+cd "$(dirname "$0")"
+
+STATE_DIR="${MAGIC_MIRROR_HOME:-$HOME/.magic_mirror}"
+mkdir -p "$STATE_DIR/logs" "$STATE_DIR/run"
+
+start_server() {
+    local name=$1
+    local server=${2:-$1}
+    local pid_file="$STATE_DIR/run/$name.pid"
+    if [ -f "$pid_file" ] && kill -0 "$(cat "$pid_file")" 2>/dev/null; then
+        echo "$name server is already running (pid $(cat "$pid_file"))"
+        return
+    fi
+    nohup python3 serve.py "$server" >> "$STATE_DIR/logs/$name.log" 2>&1 &
+    echo $! > "$pid_file"
+    echo "Started $name server (pid $!)"
+}
+
+# MIRROR_HARDWARE_SERVER=hardware-async runs the asyncio version of the hardware server
+start_server hardware "${MIRROR_HARDWARE_SERVER:-hardware}"
+start_server api
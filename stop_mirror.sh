@@ -0,0 +1,14 @@
+#!/bin/bash
+# Stop the servers started by start_mirror.sh.
+STATE_DIR="${MAGIC_MIRROR_HOME:-$HOME/.magic_mirror}"
+
+for name in api hardware; do
+    pid_file="$STATE_DIR/run/$name.pid"
+    if [ -f "$pid_file" ]; then
+        pid=$(cat "$pid_file")
+        if kill "$pid" 2>/dev/null; then
+            echo "Stopped $name server (pid $pid)"
+        fi
+        rm -f "$pid_file"
+    fi
+done
@@ -0,0 +1,76 @@
+"""
+Benchmark waiting for a Spotify device after a playback transfer.
+
+Transfers playback to the stand-in device from tools/standins.py, which only
+reports active a set time after the transfer, and times
+device_readiness.wait_until_active against the fixed 2 s sleep it replaced.
+Each activation delay starts from a fresh activation history, so the first
+waits use the default schedule and later ones the learned one. A device slower
+than the timeout misses its first waits, then gets a timeout stretched to its
+observed activation time. "never" is a player that doesn't report active at
+all (the web player): its timeout stretches to the maximum a couple of times,
+then drops back to the plain timeout.
+
+Usage:
+    python tools/benchmark_device_readiness.py
+    python tools/benchmark_device_readiness.py --delays 0.3,0.7,1.5,3,never --runs 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+# Keep the run away from the real activation history
+os.environ["DEVICE_ACTIVATION_PATH"] = os.path.join(tempfile.mkdtemp(prefix="mirror-devices-"), "activation.json")
+
+import device_readiness  # noqa: E402
+import standins  # noqa: E402
+
+LEGACY_SLEEP_SECONDS = 2.0
+
+def run(activation_delay, runs, latency):
+    """Wait for the stand-in device `runs` times; returns (wait seconds, ready count, polls)."""
+    device_readiness.activations.clear()
+    spotify = standins.StandInSpotify(latency, activation_delay)
+    polls_before = device_readiness.stats["polls"]
+    waits, ready = [], 0
+    for _ in range(runs):
+        started = time.monotonic()
+        spotify.transfer_playback(device_id="standin-device", force_play=True)
+        if device_readiness.wait_until_active("standin-device", spotify.devices, started=started) is not None:
+            ready += 1
+        waits.append(time.monotonic() - started)
+    return waits, ready, device_readiness.stats["polls"] - polls_before
+
+def main():
+    parser = argparse.ArgumentParser(description="Time device readiness polling against the old fixed sleep.")
+    parser.add_argument("--delays", default="0.3,0.7,1.5,never",
+                        help="Comma-separated activation delays in seconds; 'never' for a device that stays idle")
+    parser.add_argument("--runs", type=int, default=5, help="Transfers per delay")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean stand-in Spotify call latency")
+    args = parser.parse_args()
+
+    print(f"timeout {device_readiness.TIMEOUT_SECONDS:.1f}s (up to {device_readiness.MAX_TIMEOUT_SECONDS:.1f}s "
+          f"for slow devices), legacy sleep {LEGACY_SLEEP_SECONDS:.1f}s, "
+          f"{args.runs} runs each\n")
+    print(f"{'activation':>10} {'ready':>6} {'first':>7} {'median':>7} {'max':>7} {'polls':>6} {'legacy':>7}")
+    for value in args.delays.split(","):
+        delay = float("inf") if value.strip() == "never" else float(value)
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                waits, ready, polls = run(delay, args.runs, args.latency)
+            finally:
+                sys.stdout = stdout
+        label = "never" if delay == float("inf") else f"{delay:.1f}s"
+        print(f"{label:>10} {ready:>3}/{args.runs:<2} {waits[0]:>6.2f}s {statistics.median(waits):>6.2f}s "
+              f"{max(waits):>6.2f}s {polls / args.runs:>6.1f} {LEGACY_SLEEP_SECONDS:>6.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark track matching (api/track_ranking.py) on a labeled query set.
+
+Each case in the data file is a requested song (and optional artist), a page
+of Spotify search results and the index of the right track (or a list of
+equally right ones), or null when the request is genuinely ambiguous and the
+user should be asked. The ranking is compared with the old rule - play the
+first of three results if its title contains the request, otherwise list
+options.
+
+Usage:
+    python tools/benchmark_track_ranking.py
+    python tools/benchmark_track_ranking.py --data tools/data/track_ranking_cases.json --verbose
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+import track_ranking  # noqa: E402
+
+def legacy_choice(song_name, artist, tracks):
+    """The previous /ask behaviour: index played directly, or None for an options list."""
+    tracks = tracks[:3]
+    if len(tracks) == 1 or song_name.lower() in tracks[0]["name"].lower():
+        return 0
+    return None
+
+def ranked_choice(song_name, artist, tracks):
+    ranked, confident = track_ranking.best_match(song_name, artist, tracks)
+    if not confident:
+        return None
+    return next(i for i, track in enumerate(tracks) if track is ranked[0][1])
+
+def evaluate(cases, choose):
+    """Count direct plays, wrong direct plays and option lists that were needed or not."""
+    result = {"played": 0, "played_correct": 0, "played_wrong": 0, "asked": 0, "asked_needlessly": 0}
+    failures = []
+    for case in cases:
+        choice = choose(case["song_name"], case["artist"], case["results"])
+        expected = case["expected"]
+        if choice is None:
+            result["asked"] += 1
+            if expected is not None:
+                result["asked_needlessly"] += 1
+                failures.append((case, "asked"))
+        else:
+            result["played"] += 1
+            if choice == expected or (isinstance(expected, list) and choice in expected):
+                result["played_correct"] += 1
+            else:
+                result["played_wrong"] += 1
+                failures.append((case, f"played #{choice}"))
+    return result, failures
+
+def time_ranking(cases, rounds=200):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            track_ranking.best_match(case["song_name"], case["artist"], case["results"])
+    return (time.perf_counter() - started) / (rounds * len(cases)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ranked track matching against the old substring rule.")
+    parser.add_argument("--data", default=os.path.join(ROOT, "tools", "data", "track_ranking_cases.json"))
+    parser.add_argument("--verbose", action="store_true", help="List the cases each method gets wrong")
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as data_file:
+        cases = json.load(data_file)
+    answerable = sum(case["expected"] is not None for case in cases)
+    print(f"{len(cases)} cases, {answerable} with a single right answer\n")
+
+    print(f"{'method':<10} {'played':>7} {'correct':>8} {'wrong':>6} {'asked':>6} {'needless':>9}")
+    for name, choose in [("legacy", legacy_choice), ("ranked", ranked_choice)]:
+        result, failures = evaluate(cases, choose)
+        print(f"{name:<10} {result['played']:>7} {result['played_correct']:>8} {result['played_wrong']:>6} "
+              f"{result['asked']:>6} {result['asked_needlessly']:>9}")
+        if args.verbose:
+            for case, outcome in failures:
+                print(f"    {outcome:<10} {case['song_name']!r} artist={case['artist']!r} expected={case['expected']}")
+
+    # Every needless options list costs the user another /ask turn
+    print(f"\nranking time: {time_ranking(cases):.3f} ms per search page")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Check that Spotify 429s reach the rate governor.
+
+Points a real spotipy client from spotify_client.create_client() at a local
+server that answers every request with 429 and a Retry-After header, then
+checks that each 429 came back to the governor (one server hit per governor
+attempt, no retries hidden inside urllib3) and that the caller finally sees
+the 429 itself.
+
+Usage:
+    python tools/check_spotify_rate_limit.py
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "api"))
+
+import spotify_client  # noqa: E402
+import spotify_governor  # noqa: E402
+
+RETRY_AFTER_SECONDS = 1
+GOVERNOR_RETRIES = 1
+
+hits = []
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        hits.append(self.path)
+        body = b'{"error": {"status": 429, "message": "API rate limit exceeded"}}'
+        self.send_response(429)
+        self.send_header("Retry-After", str(RETRY_AFTER_SECONDS))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    governor = spotify_governor.SpotifyGovernor(max_retries=GOVERNOR_RETRIES, max_wait=10)
+    sp = spotify_client.create_client("token")
+    sp._client.prefix = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+    object.__setattr__(sp, "_governor", governor)
+
+    started = time.monotonic()
+    error = None
+    try:
+        sp.current_user()
+    except Exception as e:
+        error = e
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    attempts = GOVERNOR_RETRIES + 1
+    failures = []
+
+    def check(ok, message):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    check(len(hits) == attempts, f"server saw {len(hits)} requests for {attempts} governor attempts")
+    check(governor.stats["rate_limited"] == GOVERNOR_RETRIES,
+          f"governor counted {governor.stats['rate_limited']} rate limits")
+    check(getattr(error, "http_status", None) == 429, f"caller saw {type(error).__name__}: {error}")
+    check(elapsed < RETRY_AFTER_SECONDS * (attempts + 1),
+          f"gave up after {elapsed:.2f}s (Retry-After {RETRY_AFTER_SECONDS}s, {attempts} attempts)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
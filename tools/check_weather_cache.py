@@ -0,0 +1,114 @@
+"""
+Check the weather cache against tools/fake_weather_server.py.
+
+Starts the fake OpenWeather server in-process with the provider offline, then
+drives it through /set and /offline while polling api/weather.py, checking that:
+polls don't wait on a provider that was down at boot, the refresher picks the
+weather up once it is back, polls are answered from memory, unchanged weather
+is revalidated with a 304, new conditions replace the cached ones, and an
+outage keeps the last good value flagged as stale.
+
+Usage:
+    python tools/check_weather_cache.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+
+import fake_weather_server  # noqa: E402
+
+RETRY_SECONDS = 0.5
+
+failures = []
+
+def check(name, ok, detail):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name:<44} {detail}")
+    if not ok:
+        failures.append(name)
+
+def control(base_url, path, data):
+    request = urllib.request.Request(f"{base_url}{path}", data=json.dumps(data).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.load(response)
+
+def timed_polls(weather, count=20):
+    """Poll `count` times; returns (last result, slowest poll in seconds)."""
+    slowest, result = 0.0, None
+    for _ in range(count):
+        started = time.perf_counter()
+        result = weather.get_weather()
+        slowest = max(slowest, time.perf_counter() - started)
+    return result, slowest
+
+def main():
+    server, state = fake_weather_server.serve(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # weather.py reads its configuration at import time
+    os.environ.update(OPENWEATHER_API_KEY="test", OPENWEATHER_BASE_URL=base_url,
+                      WEATHER_REFRESH_SECONDS="3600", WEATHER_RETRY_SECONDS=str(RETRY_SECONDS))
+    sys.path.insert(0, os.path.join(REPO_ROOT, "api"))
+    import weather
+
+    print(f"Weather cache against the fake server at {base_url}")
+    control(base_url, "/offline", {"offline": True})
+    first = weather.get_weather()
+    result, slowest = timed_polls(weather)
+    served = control(base_url, "/stats", {})["requests"]
+    check("Provider down at boot: no weather", first is None and result is None, repr(result))
+    check("Later polls don't wait on the provider", slowest < 0.05, f"slowest poll {slowest * 1000:.1f}ms")
+    check("Only the refresher retries", served <= 2, f"{served} provider requests")
+
+    control(base_url, "/offline", {"offline": False})
+    deadline = time.monotonic() + RETRY_SECONDS * 6
+    while weather.get_weather() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    result = weather.get_weather()
+    check("Refresher fills the cache when it's back", bool(result) and result["condition"] == "Cloudy",
+          repr(result and result["condition"]))
+
+    before = control(base_url, "/stats", {})["requests"]
+    result, slowest = timed_polls(weather)
+    after = control(base_url, "/stats", {})["requests"]
+    check("Warm polls are answered from memory", after == before, f"{after - before} provider requests")
+
+    fetched_at = result["fetched_at"]
+    refreshed = weather.refresh()
+    server_stats = control(base_url, "/stats", {})
+    result = weather.get_weather()
+    check("Unchanged weather revalidates with a 304", refreshed and server_stats["not_modified"] == 1
+          and weather.stats["not_modified"] == 1, f"{server_stats['not_modified']} not modified")
+    check("A 304 keeps the value and renews it", result["condition"] == "Cloudy"
+          and result["fetched_at"] > fetched_at, result["condition"])
+
+    control(base_url, "/set", {"condition": "Rain", "temperature": 9.6})
+    weather.refresh()
+    result = weather.get_weather()
+    check("New conditions replace the cached ones", result["condition"] == "Rainy"
+          and result["temperature"] == 10, f"{result['condition']} {result['temperature']}°C")
+
+    control(base_url, "/offline", {"offline": True})
+    refreshed = weather.refresh()
+    result, slowest = timed_polls(weather)
+    check("An outage keeps the last value, stale", not refreshed and result["condition"] == "Rainy"
+          and result["stale"], f"stale={result['stale']}, slowest poll {slowest * 1000:.1f}ms")
+
+    control(base_url, "/offline", {"offline": False})
+    weather.refresh()
+    result = weather.get_weather()
+    check("Recovery clears the stale flag", not result["stale"], f"stale={result['stale']}")
+
+    server.shutdown()
+    print("\nWeather cache behaves" if not failures else f"\n{len(failures)} checks failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
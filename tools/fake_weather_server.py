@@ -0,0 +1,106 @@
+"""
+Local stand-in for the OpenWeather current-weather API.
+
+Serves /weather with an ETag and answers conditional requests with 304, so the
+API's weather cache can be exercised without a network connection or an API
+key. POST /set changes the conditions, POST /offline makes /weather fail.
+
+Usage:
+    python tools/fake_weather_server.py --port 8090
+    OPENWEATHER_API_KEY=test OPENWEATHER_BASE_URL=http://localhost:8090 python api/index.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeWeather:
+    """Mutable weather state shared by the handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.offline = False
+        self.requests = 0
+        self.not_modified = 0
+        self.set(condition="Clouds", temperature=18.4, humidity=71)
+
+    def set(self, condition=None, temperature=None, humidity=None):
+        with self.lock:
+            current = getattr(self, "payload", {"weather": [{}], "main": {}})
+            self.payload = {
+                "weather": [{"main": condition or current["weather"][0].get("main", "Clear"),
+                             "description": (condition or "clear").lower()}],
+                "main": {
+                    "temp": temperature if temperature is not None else current["main"].get("temp", 20),
+                    "humidity": humidity if humidity is not None else current["main"].get("humidity", 50),
+                },
+                "name": "Fakeville",
+            }
+            self.body = json.dumps(self.payload).encode("utf-8")
+            self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            if not self.path.startswith("/weather"):
+                self._send(404)
+                return
+            with state.lock:
+                state.requests += 1
+                if state.offline:
+                    self._send(503, b'{"message": "offline"}', {"Content-Type": "application/json"})
+                    return
+                if self.headers.get("If-None-Match") == state.etag:
+                    state.not_modified += 1
+                    self._send(304, headers={"ETag": state.etag})
+                    return
+                body, etag = state.body, state.etag
+            self._send(200, body, {"Content-Type": "application/json", "ETag": etag})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            data = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/set":
+                state.set(data.get("condition"), data.get("temperature"), data.get("humidity"))
+            elif self.path == "/offline":
+                state.offline = bool(data.get("offline", True))
+            elif self.path != "/stats":
+                self._send(404)
+                return
+            with state.lock:
+                stats = {"requests": state.requests, "not_modified": state.not_modified,
+                         "offline": state.offline}
+            self._send(200, json.dumps(stats).encode("utf-8"), {"Content-Type": "application/json"})
+
+    return Handler
+
+def serve(port=8090, host="127.0.0.1"):
+    """Create (but don't start) a fake weather server. Returns (server, state)."""
+    state = FakeWeather()
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenWeather server for local testing.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.host)
+    print(f"Fake weather server on http://{args.host}:{args.port}/weather")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
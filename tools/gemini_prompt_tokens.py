@@ -0,0 +1,120 @@
+"""
+Token counts per Gemini prompt type, before and after moving the fixed
+preambles into model-level system instructions (api/prompts.py).
+
+For each prompt type it shows the tokens of the system instruction (built once
+per process), the tokens the old inline prompt sent as prompt text on every
+call, and the tokens the variable part sends now. The "before" prompt is an
+estimate: the instruction and the variable part joined, as the old builders
+did, not a capture of their output. Billed input per call (instruction plus
+variable part) is shown next to it, since that is what each call costs. With GOOGLE_API_KEY set and
+--live, the counts come from Gemini's count_tokens; otherwise they are
+estimated offline (words and punctuation marks, which tracks Gemini's
+tokenizer closely enough for comparisons).
+
+Gemini still bills system-instruction tokens as input on each call; only a
+cached context avoids that, and Gemini only caches contexts of at least
+--cache-min-tokens, which the report flags.
+
+Usage:
+    python tools/gemini_prompt_tokens.py
+    python tools/gemini_prompt_tokens.py --live --json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+import prompts  # noqa: E402
+
+# Typical variable parts, one call's worth per prompt type
+SAMPLES = {
+    "assistant": {"history": "User: what's the time\nAssistant: It is a quarter past eight, the morning is young.",
+                  "query": "what should I wear today"},
+    "music_intent": {"query": "play shape of you by ed sheeran"},
+    "mood": {"query": "I had a long day and I'm exhausted"},
+    "similar_songs": {"limit": 5, "song": "Blinding Lights", "artist": "The Weeknd"},
+    "song_suggestions": {"count": 5, "context": " that match the mood: relaxing"},
+    "suggestion_request": {"query": "suggest me some songs like Shape of You"},
+    "music_request": {"query": "play the third one"},
+    "request_intent": {"query": "play something to help me focus"},
+    "mood_fallback": {"query": "I have a date tonight, help me get ready"},
+    "music_question": {"query": "who wrote bohemian rhapsody"},
+}
+
+# Smallest context Gemini 1.5 will cache
+CACHE_MIN_TOKENS = 32768
+
+def estimate_tokens(text):
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def live_counter():
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+    model = genai.GenerativeModel(os.environ.get("GEMINI_MODEL", "gemini-1.5-flash"))
+    return lambda text: model.count_tokens(text).total_tokens
+
+def report(count_tokens, cache_min_tokens=CACHE_MIN_TOKENS):
+    rows = []
+    for kind, instruction in prompts.SYSTEM_INSTRUCTIONS.items():
+        user_part = prompts.user_prompt(kind, **SAMPLES[kind])
+        instruction_tokens = count_tokens(instruction)
+        after = count_tokens(user_part)
+        # The old builders inlined the same instruction text around the variable part
+        before = count_tokens(f"{instruction}\n{user_part}")
+        rows.append({
+            "kind": kind,
+            "instruction_tokens": instruction_tokens,
+            "prompt_tokens_before_estimate": before,
+            "prompt_tokens_after": after,
+            "prompt_text_saved_percent": round(100 * (before - after) / before, 1),
+            # System instructions are billed as input on every call
+            "billed_tokens_before_estimate": before,
+            "billed_tokens_after": instruction_tokens + after,
+            "cacheable": instruction_tokens >= cache_min_tokens,
+        })
+    return rows
+
+def print_report(rows, source):
+    print(f"Tokens per call ({source}; 'before' is estimated from the instruction and variable part)\n")
+    print(f"{'':<20}{'':>12}{'prompt text':^27}{'billed input':^20}")
+    print(f"{'prompt type':<20}{'instruction':>12}{'before~':>9}{'after':>8}{'less':>9}"
+          f"{'before~':>10}{'after':>8}  cacheable")
+    for row in rows:
+        print(f"{row['kind']:<20}{row['instruction_tokens']:>12}{row['prompt_tokens_before_estimate']:>9}"
+              f"{row['prompt_tokens_after']:>8}{row['prompt_text_saved_percent']:>8.1f}%"
+              f"{row['billed_tokens_before_estimate']:>10}{row['billed_tokens_after']:>8}"
+              f"  {'yes' if row['cacheable'] else 'no'}")
+    before = sum(row["prompt_tokens_before_estimate"] for row in rows)
+    after = sum(row["prompt_tokens_after"] for row in rows)
+    billed_before = sum(row["billed_tokens_before_estimate"] for row in rows)
+    billed_after = sum(row["billed_tokens_after"] for row in rows)
+    print(f"\nOne call of each type: ~{before} prompt-text tokens before, {after} after "
+          f"({100 * (before - after) / before:.1f}% less prompt text built and sent per call)")
+    print(f"Billed input per call: ~{billed_before} tokens before, {billed_after} after "
+          f"({100 * (billed_before - billed_after) / billed_before:+.1f}%); system instructions "
+          f"are still billed on every call unless cached")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report Gemini prompt tokens per prompt type.")
+    parser.add_argument("--live", action="store_true", help="count with Gemini's count_tokens (needs GOOGLE_API_KEY)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--cache-min-tokens", type=int, default=CACHE_MIN_TOKENS)
+    args = parser.parse_args()
+
+    if args.live:
+        count_tokens, source = live_counter(), "Gemini count_tokens"
+    else:
+        count_tokens, source = estimate_tokens, "offline estimate"
+    rows = report(count_tokens, args.cache_min_tokens)
+    if args.json:
+        print(json.dumps({"source": source, "prompts": rows}, indent=2))
+    else:
+        print_report(rows, source)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Load generator for the API and hardware servers.
+
+Drives /ask, /get-spotify-token, /devices, /api/data, /dht, /distance and
+/screen with a weighted mix at a fixed concurrency (closed loop) or a fixed
+request rate (open loop, latency measured from the scheduled send time).
+Prints throughput, latency percentiles, error rate and server thread counts
+every interval, then a per-endpoint summary.
+
+With --spawn both servers are started locally through serve.py, with the API
+wired to the stand-ins in tools/standins.py (no Gemini key or Spotify account
+needed) and the hardware server in its mock sensor mode.
+
+Usage:
+    python tools/loadtest.py run --spawn --concurrency 8 --duration 30
+    python tools/loadtest.py run --spawn --rate 40 --threads 16 --json results.json
+    python tools/loadtest.py run --api http://mirror.local:5000 --hardware http://mirror.local:5001
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ASK_QUERIES = [
+    "play shape of you", "pause the music", "next song", "what's playing",
+    "suggest some relaxing music", "what time is it", "tell me a joke", "how are you today",
+]
+
+# name -> (server, method, path, body factory)
+ENDPOINTS = {
+    "ask": ("api", "POST", "/ask", lambda: {"query": random.choice(ASK_QUERIES)}),
+    "spotify_token": ("api", "GET", "/get-spotify-token", None),
+    "devices": ("api", "GET", "/devices", None),
+    "api_data": ("api", "GET", "/api/data", None),
+    "dht": ("hardware", "GET", "/dht", None),
+    "distance": ("hardware", "GET", "/distance", None),
+    "screen": ("hardware", "POST", "/screen", lambda: {"action": random.choice(["sleep", "wake"])}),
+}
+DEFAULT_MIX = "ask=2,spotify_token=1,devices=1,api_data=2,dht=2,distance=4,screen=1"
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def summarize(samples, seconds):
+    """samples: [(finished_at, endpoint, latency, ok)] -> throughput, percentiles (ms) and error rate."""
+    latencies = sorted(sample[2] * 1000 for sample in samples)
+    errors = sum(not sample[3] for sample in samples)
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / seconds if seconds > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "error_rate": errors / len(samples) if samples else 0.0,
+    }
+
+def process_tree_threads(pid):
+    """Total thread count of a process and its children (Linux only; None elsewhere)."""
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as stat_file:
+                        # The parent pid is the field after the ")" that closes the command name
+                        parent = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+                    children.setdefault(parent, []).append(int(entry))
+                except (OSError, ValueError, IndexError):
+                    continue
+        total, pending = 0, [pid]
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("Threads:"):
+                        total += int(line.split()[1])
+            pending.extend(children.get(current, []))
+        return total
+    except OSError:
+        return None
+
+class LoadTest:
+    def __init__(self, targets, mix, concurrency, rate, duration, interval, server_pids):
+        self.targets = targets
+        self.names = [name for name in mix if targets.get(ENDPOINTS[name][0])]
+        self.weights = [mix[name] for name in self.names]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.interval = interval
+        self.server_pids = server_pids
+        self.samples = []
+        self.timeline = []
+        self.lock = threading.Lock()
+        self.stop_at = 0.0
+        self.schedule = queue.Queue()
+
+    def request(self, connections, name):
+        server, method, path, body_factory = ENDPOINTS[name]
+        base = urlparse(self.targets[server])
+        body = json.dumps(body_factory()) if body_factory else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2):
+            connection = connections.get(server)
+            if connection is None:
+                connection = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=30)
+                connections[server] = connection
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status < 500
+            except (OSError, http.client.HTTPException):
+                # Stale keep-alive connection: reconnect once
+                connection.close()
+                connections.pop(server, None)
+                if attempt:
+                    return False
+        return False
+
+    def worker(self):
+        connections = {}
+        while True:
+            if self.rate:
+                item = self.schedule.get()
+                if item is None:
+                    return
+                scheduled_at, name = item
+            else:
+                if time.monotonic() >= self.stop_at:
+                    return
+                scheduled_at, name = time.monotonic(), random.choices(self.names, self.weights)[0]
+            ok = self.request(connections, name)
+            finished = time.monotonic()
+            with self.lock:
+                self.samples.append((finished, name, finished - scheduled_at, ok))
+
+    def scheduler(self):
+        """Open loop: issue requests at a fixed rate whether or not earlier ones finished."""
+        next_send = time.monotonic()
+        while next_send < self.stop_at:
+            time.sleep(max(0.0, next_send - time.monotonic()))
+            self.schedule.put((next_send, random.choices(self.names, self.weights)[0]))
+            next_send += 1.0 / self.rate
+        for _ in range(self.concurrency):
+            self.schedule.put(None)
+
+    def report(self, started):
+        window_start = started
+        print(f"{'time':>6} {'rps':>7} {'p50ms':>7} {'p90ms':>7} {'p99ms':>7} {'err%':>6} {'backlog':>8} {'threads':>8}")
+        while time.monotonic() < self.stop_at:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self.lock:
+                window = [sample for sample in self.samples if window_start <= sample[0] < now]
+            stats = summarize(window, now - window_start)
+            threads = [process_tree_threads(pid) for pid in self.server_pids]
+            stats.update(t=round(now - started, 1), backlog=self.schedule.qsize(),
+                         server_threads=sum(t for t in threads if t) if any(threads) else None)
+            self.timeline.append(stats)
+            print(f"{stats['t']:>6.1f} {stats['rps']:>7.1f} {stats['p50_ms']:>7.1f} {stats['p90_ms']:>7.1f} "
+                  f"{stats['p99_ms']:>7.1f} {stats['error_rate'] * 100:>6.1f} {stats['backlog']:>8} "
+                  f"{stats['server_threads'] if stats['server_threads'] is not None else '-':>8}")
+            window_start = now
+
+    def run(self):
+        started = time.monotonic()
+        self.stop_at = started + self.duration
+        workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(self.concurrency)]
+        if self.rate:
+            workers.append(threading.Thread(target=self.scheduler, daemon=True))
+        for thread in workers:
+            thread.start()
+        self.report(started)
+        for thread in workers:
+            thread.join(timeout=60)
+        elapsed = time.monotonic() - started
+        return {
+            "overall": summarize(self.samples, elapsed),
+            "endpoints": {name: summarize([s for s in self.samples if s[1] == name], elapsed)
+                          for name in self.names},
+            "timeline": self.timeline,
+        }
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def wait_until_up(url, timeout=60):
+    base = urlparse(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((base.hostname, base.port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def spawn_servers(args):
+    """Start both servers locally; returns (targets, processes)."""
+    # A scratch home keeps the test away from real tokens, logs and indexes
+    home = tempfile.mkdtemp(prefix="mirror-loadtest-")
+    api_port, hardware_port = free_port(), free_port()
+    env = {**os.environ, "HOME": home, "PYTHONUNBUFFERED": "1",
+           "HARDWARE_SERVER_URL": f"http://127.0.0.1:{hardware_port}"}
+    log = open(os.path.join(home, "servers.log"), "w")
+    processes = [
+        subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "hardware",
+                          "--host", "127.0.0.1", "--port", str(hardware_port)] +
+                         (["--threads", str(args.threads)] if args.threads else []),
+                         env=env, stdout=log, stderr=subprocess.STDOUT),
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--port", str(api_port),
+                          "--gemini-latency", str(args.gemini_latency),
+                          "--spotify-latency", str(args.spotify_latency)] +
+                         (["--threads", str(args.threads)] if args.threads else []),
+                         env=env, stdout=log, stderr=subprocess.STDOUT),
+    ]
+    targets = {"api": f"http://127.0.0.1:{api_port}", "hardware": f"http://127.0.0.1:{hardware_port}"}
+    for url in targets.values():
+        if not wait_until_up(url):
+            for process in processes:
+                process.terminate()
+            raise SystemExit(f"Server at {url} did not start; see {log.name}")
+    print(f"Spawned servers (logs in {log.name})")
+    return targets, processes
+
+def run(args):
+    processes = []
+    if args.spawn:
+        targets, processes = spawn_servers(args)
+    else:
+        targets = {"api": args.api, "hardware": args.hardware}
+    try:
+        test = LoadTest(targets, parse_mix(args.mix), args.concurrency, args.rate, args.duration,
+                        args.interval, [process.pid for process in processes] or args.server_pid)
+        mode = f"{args.rate} req/s open loop" if args.rate else "closed loop"
+        print(f"{args.concurrency} clients, {mode}, {args.duration}s\n")
+        results = test.run()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=15)
+
+    print(f"\n{'endpoint':<14} {'requests':>9} {'rps':>7} {'p50ms':>7} {'p90ms':>7} {'p99ms':>7} {'maxms':>7} {'err%':>6}")
+    for name, stats in list(results["endpoints"].items()) + [("overall", results["overall"])]:
+        print(f"{name:<14} {stats['requests']:>9} {stats['rps']:>7.1f} {stats['p50_ms']:>7.1f} "
+              f"{stats['p90_ms']:>7.1f} {stats['p99_ms']:>7.1f} {stats['max_ms']:>7.1f} {stats['error_rate'] * 100:>6.1f}")
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump({"settings": vars(args), **results}, results_file, indent=2)
+
+def serve(args):
+    """Run the API under serve.py with Gemini and Spotify replaced by stand-ins."""
+    sys.path.insert(0, ROOT)
+    import serve as launcher
+    import standins
+
+    def load_api():
+        app, warm_up = launcher.load_api()
+        from api import index
+        standins.install(index, args.gemini_latency, args.spotify_latency)
+        return app, warm_up
+
+    launcher.SERVERS["api"] = {**launcher.SERVERS["api"], "load": load_api}
+    workers, threads = launcher.size_server("api")
+    options = {
+        "bind": f"127.0.0.1:{args.port}", "workers": workers, "threads": args.threads or threads,
+        "worker_class": "gthread", "preload_app": True, "timeout": 120, "loglevel": "warning",
+    }
+    launcher.build_application("api", options).run()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Magic Mirror API and hardware servers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Generate load and report latency")
+    run_parser.add_argument("--api", default="http://127.0.0.1:5000")
+    run_parser.add_argument("--hardware", default="http://127.0.0.1:5001")
+    run_parser.add_argument("--spawn", action="store_true", help="Start local servers with stand-ins")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    run_parser.add_argument("--rate", type=float, default=0, help="Requests per second (0 = as fast as possible)")
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--interval", type=float, default=5, help="Seconds between progress lines")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default {DEFAULT_MIX})")
+    run_parser.add_argument("--threads", type=int, help="Server threads for --spawn (default: serve.py sizing)")
+    run_parser.add_argument("--gemini-latency", type=float, default=0.4, help="Stand-in Gemini delay (s)")
+    run_parser.add_argument("--spotify-latency", type=float, default=0.15, help="Stand-in Spotify delay (s)")
+    run_parser.add_argument("--server-pid", type=int, action="append", default=[],
+                            help="Server pid to sample thread counts from when not using --spawn")
+    run_parser.add_argument("--json", help="Also write the results to this file")
+
+    serve_parser = commands.add_parser("serve", help="Run the API with stand-ins (used by --spawn)")
+    serve_parser.add_argument("--port", type=int, default=5000)
+    serve_parser.add_argument("--threads", type=int)
+    serve_parser.add_argument("--gemini-latency", type=float, default=0.4)
+    serve_parser.add_argument("--spotify-latency", type=float, default=0.15)
+
+    args = parser.parse_args()
+    run(args) if args.command == "run" else serve(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cold-start profiler for the API server.
+
+Imports api/index.py in a fresh interpreter with ``-X importtime`` and reports
+how long the import took, the first request latency, peak RSS, the slowest
+modules and whether any heavy SDK was imported eagerly.
+
+Usage:
+    python tools/profile_imports.py
+    python tools/profile_imports.py --json
+    python tools/profile_imports.py --append tools/cold_start_history.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(REPO_ROOT, "api")
+
+# Modules that should only be imported when a request actually needs them
+HEAVY_MODULES = ["google.generativeai", "spotipy", "requests", "dotenv"]
+
+# Runs inside the child interpreter and prints one JSON line on stdout
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import index
+import_ms = (time.perf_counter() - start) * 1000
+
+client = index.app.test_client()
+start = time.perf_counter()
+client.get("/api/data")
+first_request_ms = (time.perf_counter() - start) * 1000
+
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    rss_kb = max_rss // 1024 if sys.platform == "darwin" else max_rss
+except ImportError:
+    rss_kb = None
+
+print(json.dumps({
+    "import_ms": round(import_ms, 1),
+    "first_request_ms": round(first_request_ms, 1),
+    "max_rss_kb": rss_kb,
+    "heavy_loaded": [name for name in HEAVY if name in sys.modules],
+}))
+"""
+
+def git_revision():
+    """Return a short description of the checked out revision, if available."""
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--tags"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            rows.append((module.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+def profile(top=15):
+    """Import the API in a fresh interpreter and collect cold-start numbers."""
+    child = CHILD_SCRIPT.replace("HEAVY", repr(HEAVY_MODULES))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", child],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing the API failed:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(result.stderr)
+    rows.sort(key=lambda row: row[2], reverse=True)
+    report["slowest_modules"] = [
+        {"module": module, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(own / 1000, 1)}
+        for module, own, cumulative in rows[:top]
+    ]
+    report["module_count"] = len(rows)
+    report["revision"] = git_revision()
+    report["python"] = sys.version.split()[0]
+    report["timestamp"] = datetime.datetime.now().isoformat(timespec="seconds")
+    return report
+
+def print_report(report):
+    """Print a human readable cold-start report."""
+    print(f"Revision:          {report['revision']}")
+    print(f"Import time:       {report['import_ms']} ms ({report['module_count']} modules)")
+    print(f"First /api/data:   {report['first_request_ms']} ms")
+    print(f"Peak RSS:          {report['max_rss_kb']} KB")
+    heavy = ", ".join(report["heavy_loaded"]) or "none"
+    print(f"Heavy SDKs loaded: {heavy}")
+    print("\nSlowest imports (cumulative):")
+    for row in report["slowest_modules"]:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API cold-start import time and memory.")
+    parser.add_argument("--top", type=int, default=15, help="number of slow modules to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--append", metavar="PATH", help="append the report to a JSON lines history file")
+    args = parser.parse_args()
+
+    report = profile(top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.append:
+        with open(args.append, "a") as history:
+            history.write(json.dumps(report) + "\n")
+
+    # Non-zero exit lets CI flag a regression where an SDK is imported eagerly again
+    return 1 if report["heavy_loaded"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
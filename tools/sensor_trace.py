@@ -0,0 +1,210 @@
+"""
+Record, synthesize and replay hardware sensor traces (see hardware/sensor_backends.py).
+
+    record      on the Pi: sample the real sensors into a trace
+    synthesize  off the Pi: write a realistic trace (visits, sway, spurious
+                echoes and failed reads) for CI and tuning
+    bench       replay a trace as fast as possible through sensors.measure_distance(),
+                the /sensors feed and the frontend's presence rule (MotionSensor.js),
+                and report throughput and screen wake/sleep events for raw and
+                filtered distances (hardware/filters.py)
+
+Usage:
+    python tools/sensor_trace.py record --out ~/.magic_mirror/sensors.trace --minutes 60
+    python tools/sensor_trace.py synthesize --out /tmp/sensors.trace --minutes 120
+    python tools/sensor_trace.py bench /tmp/sensors.trace
+
+A server can also record while it runs (SENSOR_BACKEND=record) or serve a
+trace instead of the sensors (SENSOR_BACKEND=replay SENSOR_REPLAY_SPEED=10).
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "hardware"))
+
+import filters  # noqa: E402
+import sensor_backends  # noqa: E402
+
+# MotionSensor.js: present at or below 150 cm, asleep after two absent checks 5 s apart
+PRESENCE_THRESHOLD = 150
+REQUIRED_ABSENCE_COUNT = 2
+CHECK_INTERVAL_SECONDS = 5
+
+class PresenceModel:
+    """The frontend's wake/sleep rule, fed one distance per check."""
+
+    def __init__(self, threshold=PRESENCE_THRESHOLD, required_absences=REQUIRED_ABSENCE_COUNT):
+        self.threshold = threshold
+        self.required_absences = required_absences
+        self.present = True
+        self.absences = 0
+        self.wakes = 0
+        self.sleeps = 0
+
+    def check(self, distance):
+        if distance <= self.threshold:
+            self.absences = 0
+            if not self.present:
+                self.present = True
+                self.wakes += 1
+        else:
+            self.absences += 1
+            if self.absences >= self.required_absences and self.present:
+                self.present = False
+                self.sleeps += 1
+
+def record(args):
+    import sensors
+
+    writer = sensor_backends.TraceWriter(args.out)
+    source = sensors.create_backend("auto")
+    backend = sensor_backends.RecordingBackend(source, writer)
+    print(f"Recording {source.name} readings to {args.out} for {args.minutes} min")
+    ends = time.monotonic() + args.minutes * 60
+    next_dht = 0.0
+    while time.monotonic() < ends:
+        reads = [backend.distance]
+        if time.monotonic() >= next_dht:
+            next_dht = time.monotonic() + args.dht_interval
+            reads.append(backend.dht)
+        for read in reads:
+            try:
+                read()
+            except Exception as e:
+                print(f"[WARNING] Read failed: {e}")
+        time.sleep(args.interval)
+    writer.close()
+    print(f"Wrote {writer.records} records")
+
+def synthesize(args):
+    """A day in front of the mirror, compressed: idle stretches and visits, with sensor noise."""
+    rng = random.Random(args.seed)
+    if os.path.exists(args.out):
+        os.remove(args.out)
+    writer = sensor_backends.TraceWriter(args.out)
+    step = args.interval
+    clock = 1_700_000_000.0
+    ends = clock + args.minutes * 60
+    wall = rng.uniform(320, 380)
+    next_dht = clock
+
+    def write_distance(distance):
+        roll = rng.random()
+        if roll < args.error_rate:
+            writer.write(sensor_backends.DISTANCE_ERROR, timestamp=clock)
+        elif roll < args.error_rate + args.spurious_rate:
+            # Stray echo off something close, or a missed one reading as far away
+            writer.write(sensor_backends.DISTANCE, rng.choice([rng.uniform(15, 120), rng.uniform(400, 600)]),
+                         timestamp=clock)
+        else:
+            writer.write(sensor_backends.DISTANCE, max(2.0, rng.gauss(distance, 1.5)), timestamp=clock)
+
+    visits = 0
+    while clock < ends:
+        # Nobody in front of the mirror
+        idle_until = clock + rng.uniform(60, 600)
+        while clock < min(idle_until, ends):
+            write_distance(wall)
+            clock += step
+        if clock >= ends:
+            break
+        # Someone walks up, stays a while (swaying) and walks away
+        visits += 1
+        stand = rng.uniform(50, 110)
+        walk = rng.uniform(2, 4)
+        stay_until = clock + walk + rng.uniform(20, 300)
+        started = clock
+        while clock < stay_until:
+            progress = min((clock - started) / walk, 1.0)
+            write_distance(wall + (stand - wall) * progress + 5 * math.sin(clock / 1.7))
+            clock += step
+        left = clock
+        while clock < left + walk:
+            write_distance(stand + (wall - stand) * (clock - left) / walk)
+            clock += step
+
+        while next_dht < clock:
+            hours = (next_dht % 86400) / 3600
+            writer.write(sensor_backends.DHT, 22 + 1.5 * math.sin(hours / 24 * 2 * math.pi) + rng.gauss(0, 0.2),
+                         45 + rng.gauss(0, 1.5), timestamp=next_dht)
+            next_dht += args.dht_interval
+    writer.close()
+    print(f"Wrote {writer.records} records ({visits} visits) to {args.out}")
+
+def bench(args):
+    import sensors
+    import sensor_feed
+
+    backend = sensor_backends.ReplayBackend.from_file(args.trace, speed=0, loop=False)
+    sensors.set_backend(backend)
+    samples = backend.remaining()
+    # One frontend check per CHECK_INTERVAL_SECONDS of trace time
+    check_every = max(1, round(CHECK_INTERVAL_SECONDS / args.interval))
+    raw_presence = PresenceModel(args.threshold)
+    presence = PresenceModel(args.threshold)
+    raw = []
+    errors = 0
+
+    started = time.perf_counter()
+    for i in range(samples):
+        try:
+            reading = sensors.measure_distance()
+        except TimeoutError:
+            errors += 1
+            continue
+        raw.append(reading["raw"])
+        sensor_feed.publish({"distance": reading["distance"], "distance_raw": reading["raw"]})
+        if i % check_every == 0:
+            raw_presence.check(reading["raw"])
+            presence.check(reading["distance"])
+    elapsed = time.perf_counter() - started
+
+    # The same samples again, filtered in bursts the size of one frontend check
+    burst_filter = filters.DistanceFilter()
+    burst_started = time.perf_counter()
+    for start in range(0, len(raw), check_every):
+        burst_filter.add_many(raw[start:start + check_every])
+    burst_elapsed = time.perf_counter() - burst_started
+
+    filter_stats = sensors.distance_filter.get_stats()
+    print(f"{samples} samples in {elapsed:.2f}s ({samples / elapsed:,.0f} samples/s), {errors} failed reads")
+    print(f"filtered in bursts of {check_every}: {len(raw) / burst_elapsed:,.0f} samples/s")
+    print(f"outliers rejected: {filter_stats['rejected']} of {filter_stats['samples']}")
+    print(f"/sensors versions published: {sensor_feed.get_stats()['version']}")
+    print(f"presence checks every {check_every} samples: raw {raw_presence.wakes} wakes, "
+          f"{raw_presence.sleeps} sleeps; filtered {presence.wakes} wakes, {presence.sleeps} sleeps")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, synthesize and replay sensor traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Sample the real sensors into a trace")
+    record_parser.add_argument("--out", required=True)
+    record_parser.add_argument("--minutes", type=float, default=60)
+    record_parser.add_argument("--interval", type=float, default=0.1, help="Seconds between distance reads")
+    record_parser.add_argument("--dht-interval", type=float, default=5)
+
+    synth_parser = commands.add_parser("synthesize", help="Write a synthetic trace")
+    synth_parser.add_argument("--out", required=True)
+    synth_parser.add_argument("--minutes", type=float, default=120)
+    synth_parser.add_argument("--interval", type=float, default=0.1)
+    synth_parser.add_argument("--dht-interval", type=float, default=5)
+    synth_parser.add_argument("--spurious-rate", type=float, default=0.02, help="Share of stray echoes")
+    synth_parser.add_argument("--error-rate", type=float, default=0.005, help="Share of failed reads")
+    synth_parser.add_argument("--seed", type=int, default=7)
+
+    bench_parser = commands.add_parser("bench", help="Replay a trace as fast as possible")
+    bench_parser.add_argument("trace")
+    bench_parser.add_argument("--interval", type=float, default=0.1, help="Seconds between samples in the trace")
+    bench_parser.add_argument("--threshold", type=float, default=PRESENCE_THRESHOLD)
+
+    args = parser.parse_args()
+    {"record": record, "synthesize": synthesize, "bench": bench}[args.command](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+In-process stand-ins for Gemini and the Spotify Web API.
+
+They answer the prompts and calls api/index.py makes with plausible data after
+a configurable delay, so the API can be driven at load without network access,
+API keys or a Spotify account. `install()` plugs them into an imported API
+module; Spotify calls still go through the real rate governor, single-flight
+and circuit breaker.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+CATALOG = [
+    ("Shape of You", "Ed Sheeran"), ("Blinding Lights", "The Weeknd"), ("Bohemian Rhapsody", "Queen"),
+    ("Levitating", "Dua Lipa"), ("Hello", "Adele"), ("Numb", "Linkin Park"), ("Despacito", "Luis Fonsi"),
+    ("Wonderwall", "Oasis"), ("Billie Jean", "Michael Jackson"), ("Take On Me", "a-ha"),
+    ("Clair de Lune", "Claude Debussy"), ("Weightless", "Marconi Union"), ("Happy", "Pharrell Williams"),
+    ("Uptown Funk", "Mark Ronson"), ("Thunderstruck", "AC/DC"), ("Perfect", "Ed Sheeran"),
+    ("So What", "Miles Davis"), ("Take Five", "Dave Brubeck"), ("Hotel California", "Eagles"),
+    ("Smells Like Teen Spirit", "Nirvana"), ("Bad Guy", "Billie Eilish"), ("Shallow", "Lady Gaga"),
+]
+
+def _track(index):
+    name, artist = CATALOG[index % len(CATALOG)]
+    return {
+        "id": f"standin{index}", "uri": f"spotify:track:standin{index}", "name": name, "type": "track",
+        "artists": [{"name": artist, "id": f"artist{index}"}], "popularity": 50 + index % 50,
+        "duration_ms": 180000 + index * 1000, "album": {"name": f"{name} (Album)", "images": []},
+    }
+
+class Latency:
+    """Sleeps for a jittered delay around `mean` seconds."""
+
+    def __init__(self, mean, jitter=0.3):
+        self.mean = mean
+        self.jitter = jitter
+
+    def wait(self):
+        if self.mean > 0:
+            time.sleep(max(0.0, random.gauss(self.mean, self.mean * self.jitter)))
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+class StandInModel:
+    """One prompt type's model: the stand-in Gemini sees its system instruction and the prompt."""
+
+    def __init__(self, gemini, system_instruction=None):
+        self.gemini = gemini
+        self.system_instruction = system_instruction
+
+    def generate_content(self, prompt, request_options=None):
+        if self.system_instruction:
+            prompt = f"{self.system_instruction}\n{prompt}"
+        return self.gemini.generate_content(prompt, request_options)
+
+class StandInGemini:
+    """Answers the prompt shapes the API sends, in the formats it parses."""
+
+    def __init__(self, latency=0.4):
+        self.latency = Latency(latency)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None):
+        with self._lock:
+            self.calls += 1
+        self.latency.wait()
+        return _Response(self.answer(prompt))
+
+    def answer(self, prompt):
+        quoted = re.search(r'request: "([^"]*)"', prompt) or re.search(r'query: "([^"]*)"', prompt)
+        query = quoted.group(1).lower() if quoted else ""
+        if "JSON array" in prompt:
+            picks = random.sample(CATALOG, 5)
+            return json.dumps([{"name": name, "artist": artist, "reason": "stand-in"} for name, artist in picks])
+        if "Top-level intent" in prompt or "music playback" in prompt:
+            return json.dumps(self.analyze(query))
+        if "mood" in prompt and "search query" in prompt:
+            return json.dumps({"mood": "happy", "genre": "pop", "song_query": "happy pop"})
+        return "This is a stand-in answer from the load-test Gemini model."
+
+    @staticmethod
+    def analyze(query):
+        if query.startswith("play "):
+            return {"intent": "music", "sub_intent": "play", "song_name": query[5:], "is_selecting_option": False}
+        for action in ("pause", "next", "previous", "resume"):
+            if action in query:
+                return {"intent": "music", "sub_intent": "control", "action": action}
+        if "suggest" in query or "recommend" in query:
+            return {"intent": "music", "sub_intent": "suggest", "mood": "relaxing"}
+        if "playing" in query:
+            return {"intent": "music", "sub_intent": "query", "question_type": "current_song"}
+        return {"intent": "general", "query_type": "conversational"}
+
+class StandInSpotify:
+    """The subset of spotipy.Spotify the API uses, backed by a small fixed catalog."""
+
+    def __init__(self, latency=0.15, activation_delay=None):
+        self.latency = Latency(latency)
+        self._auth = "standin-token"
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.playing = 0
+        self.is_playing = True
+        # With a delay, the device only reports active that many seconds after a
+        # transfer (float("inf"): never, like a web player); None keeps it active
+        self.activation_delay = activation_delay
+        self.transferred_at = None
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        self.latency.wait()
+
+    def set_auth(self, token):
+        self._auth = token
+
+    def search(self, q, type="track", limit=10, **kwargs):
+        self._call("search")
+        words = set(q.lower().split())
+        matches = [i for i, (name, artist) in enumerate(CATALOG)
+                   if words & set(f"{name} {artist}".lower().split())]
+        indexes = (matches or list(range(len(CATALOG))))[:limit]
+        results = {"tracks": {"items": [_track(i) for i in indexes], "total": len(indexes)}}
+        if "playlist" in type:
+            results["playlists"] = {"items": [
+                {"id": f"standinlist{i}", "uri": f"spotify:playlist:standinlist{i}", "name": f"{q} mix {i}"}
+                for i in range(min(limit, 3))
+            ], "total": 3}
+        return results
+
+    def devices(self):
+        self._call("devices")
+        if self.activation_delay is None:
+            is_active = True
+        else:
+            is_active = (self.transferred_at is not None
+                         and time.monotonic() - self.transferred_at >= self.activation_delay)
+        return {"devices": [{"id": "standin-device", "name": "Magic Mirror", "is_active": is_active,
+                             "type": "Computer", "volume_percent": 50}]}
+
+    def current_playback(self, *args, **kwargs):
+        self._call("current_playback")
+        return {"is_playing": self.is_playing, "progress_ms": 30000, "item": _track(self.playing),
+                "device": {"id": "standin-device", "name": "Magic Mirror"}}
+
+    currently_playing = current_playback
+
+    def start_playback(self, *args, **kwargs):
+        self._call("start_playback")
+        self.is_playing = True
+
+    def pause_playback(self, *args, **kwargs):
+        self._call("pause_playback")
+        self.is_playing = False
+
+    def next_track(self, *args, **kwargs):
+        self._call("next_track")
+        self.playing += 1
+
+    def previous_track(self, *args, **kwargs):
+        self._call("previous_track")
+        self.playing = max(0, self.playing - 1)
+
+    def transfer_playback(self, *args, **kwargs):
+        self._call("transfer_playback")
+        self.transferred_at = time.monotonic()
+
+    def current_user(self):
+        self._call("current_user")
+        return {"id": "standin-user", "display_name": "Load Test"}
+
+    def recommendations(self, *args, limit=5, **kwargs):
+        self._call("recommendations")
+        return {"tracks": [_track(random.randrange(len(CATALOG))) for _ in range(limit)]}
+
+    def artist_top_tracks(self, *args, **kwargs):
+        self._call("artist_top_tracks")
+        return {"tracks": [_track(i) for i in range(5)]}
+
+    def current_user_saved_tracks(self, limit=20, offset=0, **kwargs):
+        self._call("current_user_saved_tracks")
+        items = [{"added_at": f"2024-01-{28 - i:02d}T00:00:00Z", "track": _track(i)}
+                 for i in range(len(CATALOG))][offset:offset + limit]
+        return {"items": items, "total": len(CATALOG), "next": None}
+
+    def current_user_playlists(self, limit=50, offset=0, **kwargs):
+        self._call("current_user_playlists")
+        return {"items": [], "total": 0, "next": None}
+
+    def current_user_top_tracks(self, limit=20, **kwargs):
+        self._call("current_user_top_tracks")
+        return {"items": [_track(i) for i in range(min(limit, 10))]}
+
+def install(index, gemini_latency=0.4, spotify_latency=0.15, activation_delay=None):
+    """Point an imported api.index module at the stand-ins. Returns (gemini, spotify)."""
+    gemini = StandInGemini(gemini_latency)
+    spotify = StandInSpotify(spotify_latency, activation_delay)
+    index.gemini_client._models[None] = StandInModel(gemini)
+    for kind, instruction in index.prompts.SYSTEM_INSTRUCTIONS.items():
+        index.gemini_client._models[kind] = StandInModel(gemini, instruction)
+    index.sp = index.spotify_governor.GovernedSpotify(
+        spotify, index.spotify_governor.governor, index.spotify_governor.flights
+    )
+    return gemini, spotify
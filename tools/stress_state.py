@@ -0,0 +1,191 @@
+"""
+Stress test for the shared state in api/state.py.
+
+First hammers the state primitives from many threads and checks that no
+update was lost: a read-modify-write counter, per-thread keys updated through
+whole-context swaps, history ids and compare-and-set. An unsynchronized dict
+doing the same counter increments is run alongside to show what a lost update
+looks like.
+
+Then drives /ask and /set-active-device in parallel through Flask's test
+client, with Gemini and Spotify replaced by the stand-ins in tools/standins.py,
+and checks that every /ask got its own history id, the history is contiguous
+and the context ends up holding values that some request actually wrote.
+Requests that fail because the stand-in load outruns the Spotify rate governor
+are counted but are not lost updates.
+
+Usage:
+    python tools/stress_state.py
+    python tools/stress_state.py --threads 32 --ops 5000 --requests 400
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+
+    def start(i):
+        barrier.wait()
+        target(i)
+
+    threads = [threading.Thread(target=start, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def check(name, ok, detail):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name:<34} {detail}")
+    return ok
+
+def stress_primitives(state, threads, ops):
+    print(f"State primitives: {threads} threads x {ops} operations")
+    total = threads * ops
+    results = []
+
+    unsafe = {"count": 0}
+
+    def unsafe_increment(i):
+        for _ in range(ops):
+            count = unsafe["count"]
+            time.sleep(0)  # Let another thread in between the read and the write
+            unsafe["count"] = count + 1
+
+    run_threads(threads, unsafe_increment)
+    print(f"  ref  {'unsynchronized dict counter':<34} {unsafe['count']}/{total} ({total - unsafe['count']} lost)")
+
+    context = state.Context(count=0)
+
+    def increment(i):
+        for _ in range(ops):
+            context.modify(lambda current: {"count": current["count"] + 1})
+            time.sleep(0)
+
+    elapsed = run_threads(threads, increment)
+    results.append(check("Context.modify counter", context["count"] == total,
+                         f"{context['count']}/{total} in {elapsed:.2f}s"))
+
+    def own_key(i):
+        for n in range(1, ops + 1):
+            context.update(**{f"thread{i}": n})
+
+    run_threads(threads, own_key)
+    snapshot = context.snapshot()
+    stale = [i for i in range(threads) if snapshot.get(f"thread{i}") != ops]
+    results.append(check("Context.update per-thread keys", not stale,
+                         f"{threads - len(stale)}/{threads} keys at their last value"))
+
+    history = state.History(maxlen=10)
+    ids = [[] for _ in range(threads)]
+
+    def append(i):
+        for n in range(ops):
+            ids[i].append(history.append(f"q{i}.{n}", "r")["id"])
+
+    run_threads(threads, append)
+    issued = sorted(entry_id for thread_ids in ids for entry_id in thread_ids)
+    results.append(check("History ids", issued == list(range(1, total + 1)),
+                         f"{len(set(issued))} unique of {total}"))
+    kept = [entry["id"] for entry in history.snapshot()]
+    results.append(check("History keeps the newest", kept == list(range(total - 9, total + 1)),
+                         f"{kept[0]}..{kept[-1]}"))
+
+    ref = state.Ref(0)
+
+    def compare_and_set(i):
+        for _ in range(ops):
+            while True:
+                current = ref.get()
+                if ref.compare_and_set(current, current + 1):
+                    break
+
+    run_threads(threads, compare_and_set)
+    results.append(check("Ref.compare_and_set counter", ref.get() == total, f"{ref.get()}/{total}"))
+    return all(results)
+
+ASK_QUERIES = [
+    "play shape of you", "suggest some relaxing music", "suggest some happy songs",
+    "what's playing", "next song", "tell me a joke",
+]
+
+def stress_api(threads, requests_per_thread):
+    print(f"\nAPI: {threads} clients x {requests_per_thread} requests (stand-ins, no network)")
+    # A scratch home keeps the run away from real tokens and indexes
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="mirror-stress-")
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "tools"))
+    import standins
+    from api import index
+
+    standins.install(index, gemini_latency=0.005, spotify_latency=0.002)
+    ids, devices, errors = [], [], []
+    lock = threading.Lock()
+
+    def client(i):
+        http = index.app.test_client()
+        for n in range(requests_per_thread):
+            if n % 10 == 9:
+                device = f"device-{i}-{n}"
+                response = http.post("/set-active-device", json={"device_id": device})
+                with lock:
+                    devices.append(device)
+            else:
+                query = ASK_QUERIES[(i + n) % len(ASK_QUERIES)]
+                response = http.post("/ask", json={"query": query, "history_cursor": 0})
+                if response.status_code == 200:
+                    with lock:
+                        ids.append(response.get_json()["history_cursor"])
+            if response.status_code != 200:
+                with lock:
+                    errors.append(f"{response.status_code} {response.get_data(as_text=True)[:80]}")
+
+    # The API logs every step; keep the report readable
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        elapsed = run_threads(threads, client)
+    asks = len(ids)
+    print(f"  {asks + len(devices)} requests in {elapsed:.2f}s ({(asks + len(devices)) / elapsed:.0f}/s)")
+
+    results = [check("Every request answered with 200", not errors,
+                     f"{len(errors)} failed (first: {errors[0].splitlines()[0]})" if errors else "0 failed")]
+    results.append(check("Every /ask got its own history id", sorted(ids) == list(range(1, asks + 1)),
+                         f"{len(set(ids))} unique of {asks}"))
+    history = index.app.test_client().get("/history?after=0&limit=50").get_json()["history"]
+    kept = [entry["id"] for entry in history]
+    results.append(check("History is contiguous", kept == list(range(asks - len(kept) + 1, asks + 1)),
+                         f"{kept[0]}..{kept[-1]}" if kept else "empty"))
+    # Playing picks the stand-in's own device when nothing else is active
+    device = index.active_device.get()
+    results.append(check("Active device was one that was set", device in devices + ["standin-device"], str(device)))
+    context = index.conversation_context.snapshot()
+    query = context.get("last_recommendation_query")
+    results.append(check("Context holds a written query", query in ASK_QUERIES, repr(query)))
+    return all(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the shared API state for lost updates under concurrency.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=2000, help="Operations per thread on the state primitives")
+    parser.add_argument("--requests", type=int, default=25, help="Requests per client thread against the API")
+    args = parser.parse_args()
+
+    # Switch threads often so races show up quickly
+    sys.setswitchinterval(1e-6)
+    sys.path.insert(0, os.path.join(ROOT, "api"))
+    import state
+
+    ok = stress_primitives(state, args.threads, args.ops)
+    ok = stress_api(args.threads, args.requests) and ok
+    print("\nNo lost updates or failed requests" if ok else "\nLost updates or failed requests found")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
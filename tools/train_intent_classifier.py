@@ -0,0 +1,133 @@
+"""
+Train and evaluate the on-device intent classifier (api/intent_classifier.py).
+
+Training data is JSON lines of {"query": ..., "label": ...}, as written by the
+API to INTENT_LOG_PATH whenever Gemini classifies a query. The seed set in
+api/data/intent_seed.jsonl is a starting point until enough traffic is logged.
+
+Usage:
+    python tools/train_intent_classifier.py train --data api/data/intent_seed.jsonl \\
+        --data ~/.magic_mirror/intent_log.jsonl
+    python tools/train_intent_classifier.py evaluate --data ~/.magic_mirror/intent_log.jsonl
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+import intent_classifier  # noqa: E402
+
+SWEEP_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+def load_all(paths):
+    examples = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if not os.path.exists(path):
+            print(f"Skipping missing data file: {path}")
+            continue
+        examples.extend(intent_classifier.load_examples(path))
+    # Deduplicate so repeated queries in the log don't dominate
+    return list(dict.fromkeys(examples))
+
+def split(examples, holdout=0.2, seed=13):
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
+
+def evaluate(model, examples, threshold):
+    """Return accuracy, share of Gemini calls avoided and accuracy of the avoided calls."""
+    correct = avoided = avoided_correct = 0
+    per_label = {}
+    for query, label in examples:
+        predicted, confidence = model.predict(query)
+        correct += predicted == label
+        totals = per_label.setdefault(label, [0, 0])
+        totals[0] += predicted == label
+        totals[1] += 1
+        if confidence >= threshold and intent_classifier.fill_slots(predicted, query) is not None:
+            avoided += 1
+            avoided_correct += predicted == label
+
+    count = len(examples) or 1
+    return {
+        "accuracy": correct / count,
+        "avoided": avoided / count,
+        "avoided_accuracy": avoided_correct / avoided if avoided else 0.0,
+        "per_label": {label: hits / total for label, (hits, total) in per_label.items()},
+    }
+
+def time_predictions(model, examples, repeat=5):
+    queries = [query for query, _ in examples] or ["play something"]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            model.predict(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+def report(model, examples, threshold):
+    result = evaluate(model, examples, threshold)
+    print(f"Examples:                 {len(examples)}")
+    print(f"Accuracy:                 {result['accuracy']:.1%}")
+    print(f"Gemini calls avoided:     {result['avoided']:.1%} (threshold {threshold})")
+    print(f"Accuracy when avoided:    {result['avoided_accuracy']:.1%}")
+    print(f"Mean prediction latency:  {time_predictions(model, examples):.0f} us")
+    print("Per-label accuracy:")
+    for label in intent_classifier.LABELS:
+        if label in result["per_label"]:
+            print(f"  {label:<15} {result['per_label'][label]:.1%}")
+    print("Threshold sweep (avoided / accuracy when avoided):")
+    for sweep in SWEEP_THRESHOLDS:
+        row = evaluate(model, examples, sweep)
+        print(f"  {sweep:<5} {row['avoided']:>6.1%} / {row['avoided_accuracy']:.1%}")
+
+def train_command(args):
+    examples = load_all(args.data)
+    if not examples:
+        print("No training examples found.")
+        return 1
+
+    train, holdout = split(examples)
+    print(f"Held-out evaluation ({len(train)} train / {len(holdout)} test):")
+    model = intent_classifier.IntentModel(dimensions=args.dimensions).fit(train, epochs=args.epochs)
+    report(model, holdout, args.threshold)
+
+    # Ship a model trained on everything
+    model = intent_classifier.IntentModel(dimensions=args.dimensions).fit(examples, epochs=args.epochs)
+    model.save(args.out)
+    print(f"\nSaved model trained on {len(examples)} examples to {args.out}")
+    return 0
+
+def evaluate_command(args):
+    examples = load_all(args.data)
+    model = intent_classifier.IntentModel.load(args.model)
+    report(model, examples, args.threshold)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local intent classifier.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train = subparsers.add_parser("train", help="train a model and report held-out accuracy")
+    train.add_argument("--out", default=intent_classifier.MODEL_PATH, help="where to write the model")
+    train.add_argument("--epochs", type=int, default=30)
+    train.add_argument("--dimensions", type=int, default=intent_classifier.DEFAULT_DIMENSIONS)
+    train.set_defaults(func=train_command)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="evaluate an existing model")
+    evaluate_parser.add_argument("--model", default=intent_classifier.MODEL_PATH)
+    evaluate_parser.set_defaults(func=evaluate_command)
+
+    for sub in (train, evaluate_parser):
+        sub.add_argument("--data", action="append", required=True, help="JSON lines file (repeatable)")
+        sub.add_argument("--threshold", type=float, default=intent_classifier.CONFIDENCE_THRESHOLD)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())